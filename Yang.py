@@ -1,7 +1,88 @@
 from abc import ABC, abstractmethod
 import pandas as pd
-from SPARQLWrapper import SPARQLWrapper, JSON
-from sqlalchemy import create_engine
+import os
+import json
+import sqlite3
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from baseHandler import isEndpointUrl, vocabularyIri, quartileRank
+from searchIndex import JournalSearchIndex
+from instrumentation import span
+
+# the backend libraries (rdflib, SQLAlchemy) are imported by the
+# methods that use them, so that importing the handlers is cheap and a handler
+# only loads the library of its own backend
+
+# local graph files already parsed, by path: (modification time, size, rdflib Graph)
+_local_graphs = {}
+# rdflib's SPARQL parser is not thread-safe: local graph queries run one at a
+# time (the server and the batch mode call the handlers from several threads)
+_local_lock = threading.Lock()
+
+# idle keep-alive HTTP connections to the SPARQL endpoints, by (scheme, host):
+# a query takes one (or opens a new one) and gives it back when it is answered,
+# so the blocks of getJournalsByIds and the next queries reuse the same sockets
+_endpoint_connections = {}
+_endpoint_lock = threading.Lock()
+
+def postSparqlQuery(url: str, query: str) -> bytes:
+    """POST the SPARQL `query` to the endpoint `url` on a pooled connection
+    and return the raw SPARQL JSON results."""
+    import http.client
+    from urllib.parse import urlsplit, urlencode
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    body = urlencode({"query": query}).encode("utf-8")
+    headers = {"Content-Type": "application/x-www-form-urlencoded",
+               "Accept": "application/sparql-results+json"}
+    for attempt in range(2):
+        with _endpoint_lock:
+            idle = _endpoint_connections.setdefault(key, [])
+            con = idle.pop() if idle else None
+        reused = con is not None
+        if con is None:
+            connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            con = connection_class(parts.netloc, timeout=300)
+        try:
+            con.request("POST", target, body, headers)
+            response = con.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            con.close()
+            if reused and not attempt:
+                continue  # the endpoint closed the idle connection: once more on a new one
+            raise
+        if response.will_close:
+            con.close()
+        else:
+            with _endpoint_lock:
+                _endpoint_connections[key].append(con)
+        if response.status >= 400:
+            raise RuntimeError(f"SPARQL endpoint error {response.status}: {data[:500].decode('utf-8', 'replace')}")
+        return data
+
+# area x category co-occurrence tables already read, by database path:
+# ((modification time, size), DataFrame or None)
+_cooccurrences = {}
+
+def loadLocalGraph(path: str):
+    """Return the rdflib Graph stored in the local file `path`, parsing it
+    again only when the file changed since the last call."""
+    from rdflib import Graph
+    from rdflib.util import guess_format
+    if not os.path.exists(path):
+        return Graph()
+    stat = os.stat(path)
+    cached = _local_graphs.get(path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    graph = Graph()
+    graph.parse(path, format=guess_format(path) or "nt")
+    _local_graphs[path] = (stat.st_mtime_ns, stat.st_size, graph)
+    return graph
 
 class QueryHandler(ABC):
     def __init__(self):
@@ -21,59 +102,130 @@ class QueryHandler(ABC):
         pass
 
 class JournalQueryHandler(QueryHandler):
+    # getJournalsByIds: identifiers per VALUES block, and blocks sent at the same time
+    idChunkSize = 500
+    idWorkers = 4
+
+    def __init__(self):
+        super().__init__()
+        self.searchIndexPath = ''
+
+    # when set, title/publisher searches are answered by the local
+    # full-text index (see searchIndex.py) instead of a SPARQL scan
+    def getSearchIndexPath(self) -> str:
+        return self.searchIndexPath
+
+    def setSearchIndexPath(self, path: str):
+        if not isinstance(path, str):
+            raise ValueError("The path of the search index must be a string")
+        self.searchIndexPath = path
+        return True
+
+    def _select(self, query: str) -> list:
+        """Run a SPARQL SELECT and return its bindings in the SPARQL JSON results
+        shape. An http(s) dbPathOrUrl is a SPARQL endpoint (Blazegraph); any other
+        value is a local graph file queried in-process with rdflib."""
+        if isEndpointUrl(self.getDbPathOrUrl()):
+            with span("sparql", backend="endpoint") as s:
+                raw = postSparqlQuery(self.getDbPathOrUrl(), query)
+                bindings = json.loads(raw)["results"]["bindings"]
+                s.set(rows=len(bindings), bytes=len(raw))
+            return bindings
+        with span("sparql", backend="local") as s, _local_lock:
+            result = loadLocalGraph(self.getDbPathOrUrl()).query(query)
+            names = [str(v) for v in result.vars]
+            bindings = [{name: {"value": str(row[i])} for i, name in enumerate(names) if row[i] is not None}
+                        for row in result]
+            s.set(rows=len(bindings))
+        return bindings
+
+    # order_by fields of the journal queries, and their SPARQL variables
+    ORDER_FIELDS = {"id": "?journal", "title": "?title", "publisher": "?publisher", "license": "?license"}
+
+    def _order(self, order_by: str = None, limit: int = None, offset: int = 0, columns=None):
+        """
+        (field, descending) of `order_by`: a column like "title", or "-title" for
+        the descending order. Ties are ordered by id, and only limit/offset order
+        the journals by id; None (no ORDER BY) when none of them is given.
+        """
+        if not order_by:
+            if limit is None and not offset:
+                return None
+            order_by = "id"
+        field = order_by.lstrip("-")
+        if field not in self.ORDER_FIELDS or (columns is not None and field not in columns):
+            raise ValueError(f"Cannot order these journals by {field}")
+        return field, order_by.startswith("-")
+
+    def _sparqlPage(self, columns, order_by=None, limit=None, offset=0) -> str:
+        # ORDER BY / LIMIT / OFFSET of a query returning `columns`
+        order = self._order(order_by, limit, offset, columns)
+        if order is None:
+            return ""
+        field, descending = order
+        keys = [self.ORDER_FIELDS[f] for f in dict.fromkeys([field, "id"])]
+        clause = "ORDER BY " + " ".join(f"DESC({k})" if descending else k for k in keys)
+        if limit is not None:
+            clause += f" LIMIT {int(limit)}"
+        if offset:
+            clause += f" OFFSET {int(offset)}"
+        return clause
+
+    def _searchPage(self, column: str, text: str, order_by=None, limit=None, offset=0) -> pd.DataFrame:
+        # the matches of the search index: without order_by they keep its ranking
+        # (prefix first, then bm25) and limit/offset cut that ranking in SQLite
+        order = self._order(order_by, columns=["id", "title", "publisher"])
+        return JournalSearchIndex(self.getSearchIndexPath()).search(column, text, limit, offset, order)
+
     def getById(self, journal_id: str) -> pd.DataFrame:
-        print("function getById by Yang started")
-        sparql = SPARQLWrapper(self.getDbPathOrUrl())
         query = f"""
-        PREFIX : <http://Brigata.github.org/journal/>
+        PREFIX : <https://brigata.github.org/>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         SELECT ?journal ?title ?publisher ?license ?apc
         WHERE {{
             ?journal a :Journal ;
                      :id "{journal_id}" ;
                      :title ?title ;
                      :publisher ?publisher ;
-                     :license ?license ;
+                     :license ?licenseIri ;
                      :apc ?apc .
+            ?licenseIri rdfs:label ?license .
         }}
         """
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        results = sparql.query().convert()
-        print("These are the results produced by Yang:\n", results)
+        bindings = self._select(query)
         data = [{
             "id": journal_id,
             "title": r["title"]["value"],
             "publisher": r["publisher"]["value"],
             "license": r["license"]["value"],
             "apc": r["apc"]["value"]
-        } for r in results["results"]["bindings"]]
-        
-        print ("query done!")
+        } for r in bindings]
+
 
         if not data:
-            print("I did not find any data!!!")
             return pd.DataFrame(columns=["id", "title", "publisher", "license", "apc"])
-        
-        print('\nThis is the dataframe Yang returns:\n', pd.DataFrame(data))
         return pd.DataFrame(data)
 
-    def getAllJournals(self) -> pd.DataFrame:
-        sparql = SPARQLWrapper(self.getDbPathOrUrl())
-        query = """
-        PREFIX : <http://Brigata.github.org/journal/>
+    def getAllJournals(self, order_by: str = None, limit: int = None, offset: int = 0) -> pd.DataFrame:
+        page = self._sparqlPage(["id", "title", "publisher", "license"], order_by, limit, offset)
+        query = f"""
+        PREFIX : <https://brigata.github.org/>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         SELECT ?journal ?title ?publisher ?apc ?seal ?license
-        WHERE {
+        WHERE {{
             ?journal a :Journal ;
                     :title ?title ;
                     :publisher ?publisher .
-            OPTIONAL { ?journal :apc ?apc }
-            OPTIONAL { ?journal :seal ?seal }
-            OPTIONAL { ?journal :license ?license }
-        }
+            OPTIONAL {{ ?journal :apc ?apc }}
+            OPTIONAL {{ ?journal :seal ?seal }}
+            OPTIONAL {{ ?journal :license ?licenseIri . ?licenseIri rdfs:label ?license }}
+        }}
+        {page}
         """
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        results = sparql.query().convert()
+        return self._journalFrame(self._select(query))
+
+    def _journalFrame(self, bindings: list) -> pd.DataFrame:
+        # rows of getAllJournals / getJournalsByIds
         data = [{
             "id": r["journal"]["value"].split("/")[-1],
             "title": r["title"]["value"],
@@ -81,39 +233,128 @@ class JournalQueryHandler(QueryHandler):
             "apc": r.get("apc", {}).get("value", "No"),
             "seal": r.get("seal", {}).get("value", "No"),
             "license": r.get("license", {}).get("value", "")
-        } for r in results["results"]["bindings"]]
-        
+        } for r in bindings]
+
         if not data:
             return pd.DataFrame(columns=["id", "title", "publisher", "apc", "seal", "license"])
         return pd.DataFrame(data)
 
-    def getJournalsWithTitle(self, partial_title: str) -> pd.DataFrame:
-        sparql = SPARQLWrapper(self.getDbPathOrUrl())
+    def getJournalsByIds(self, ids: set[str], chunkSize: int = None, workers: int = None) -> pd.DataFrame:
+        """
+        The journals (getAllJournals columns) having one of the ISSN/EISSN `ids`.
+        The ids are sent in VALUES blocks of `chunkSize` (idChunkSize), `workers`
+        (idWorkers) blocks at a time on an endpoint, so only the matching
+        journals are transferred instead of the whole graph.
+        """
+        values = sorted({v for i in (ids or set()) for v in (str(i).strip(), str(i).strip().upper()) if v})
+        if not values:
+            return self._journalFrame([])
+        size = max(1, chunkSize or self.idChunkSize)
+        chunks = [values[n:n + size] for n in range(0, len(values), size)]
+        workers = min(max(1, workers or self.idWorkers), len(chunks))
+        if workers > 1 and isEndpointUrl(self.getDbPathOrUrl()):
+            # every block in its own copy of the context, to keep the spans nested
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(contextvars.copy_context().run, self._journalsWithIdentifiers, c)
+                           for c in chunks]
+                frames = [f.result() for f in futures]
+        else:
+            # local graphs are queried one at a time anyway (_local_lock)
+            frames = [self._journalsWithIdentifiers(c) for c in chunks]
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return self._journalFrame([])
+        return pd.concat(frames, ignore_index=True).drop_duplicates(subset=["id"], ignore_index=True)
+
+    def _journalsWithIdentifiers(self, identifiers: list) -> pd.DataFrame:
+        # only journals have :id; without "?journal a :Journal" rdflib starts from
+        # the identifiers bound by VALUES instead of scanning every journal
+        values = " ".join(json.dumps(i) for i in identifiers)
         query = f"""
-        PREFIX : <http://Brigata.github.org/journal/>
+        PREFIX : <https://brigata.github.org/>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        SELECT DISTINCT ?journal ?title ?publisher ?apc ?seal ?license
+        WHERE {{
+            VALUES ?identifier {{ {values} }}
+            ?journal :id ?identifier ;
+                    :title ?title ;
+                    :publisher ?publisher .
+            OPTIONAL {{ ?journal :apc ?apc }}
+            OPTIONAL {{ ?journal :seal ?seal }}
+            OPTIONAL {{ ?journal :license ?licenseIri . ?licenseIri rdfs:label ?license }}
+        }}
+        """
+        return self._journalFrame(self._select(query))
+
+    def getAllIdentifiers(self) -> pd.DataFrame:
+        """All the (journal, ISSN/EISSN) pairs: columns id (journal) and identifier."""
+        query = """
+        PREFIX : <https://brigata.github.org/>
+        SELECT ?journal ?identifier
+        WHERE {
+            ?journal a :Journal ;
+                     :id ?identifier .
+        }
+        """
+        bindings = self._select(query)
+        data = [{
+            "id": r["journal"]["value"].split("/")[-1],
+            "identifier": r["identifier"]["value"]
+        } for r in bindings]
+        return pd.DataFrame(data) if data else pd.DataFrame(columns=["id", "identifier"])
+
+    def getContentHashes(self) -> pd.DataFrame:
+        """The manifest written by JournalUploadHandler: one row per (journal, identifier)
+        with the content hash of the journal (empty for journals uploaded without it)."""
+        query = """
+        PREFIX : <https://brigata.github.org/>
+        SELECT ?journal ?identifier ?hash
+        WHERE {
+            ?journal a :Journal .
+            OPTIONAL { ?journal :id ?identifier }
+            OPTIONAL { ?journal :contentHash ?hash }
+        }
+        """
+        bindings = self._select(query)
+        data = [{
+            "id": r["journal"]["value"].split("/")[-1],
+            "identifier": r.get("identifier", {}).get("value", ""),
+            "hash": r.get("hash", {}).get("value", "")
+        } for r in bindings]
+        return pd.DataFrame(data) if data else pd.DataFrame(columns=["id", "identifier", "hash"])
+
+    def getJournalsWithTitle(self, partial_title: str, order_by: str = None, limit: int = None,
+                             offset: int = 0) -> pd.DataFrame:
+        if self.getSearchIndexPath():
+            return self._searchPage("title", partial_title, order_by, limit, offset)
+        page = self._sparqlPage(["id", "title"], order_by, limit, offset)
+        query = f"""
+        PREFIX : <https://brigata.github.org/>
         SELECT ?journal ?title
         WHERE {{
             ?journal a :Journal ;
                      :title ?title .
             FILTER CONTAINS(LCASE(?title), "{partial_title.lower()}")
         }}
+        {page}
         """
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        results = sparql.query().convert()
+        bindings = self._select(query)
         data = [{
             "id": r["journal"]["value"].split("/")[-1],
             "title": r["title"]["value"]
-        } for r in results["results"]["bindings"]]
+        } for r in bindings]
         
         if not data:
             return pd.DataFrame(columns=["id", "title"])
         return pd.DataFrame(data)
 
-    def getJournalsPublishedBy(self, partial_name: str) -> pd.DataFrame:
-        sparql = SPARQLWrapper(self.getDbPathOrUrl())
+    def getJournalsPublishedBy(self, partial_name: str, order_by: str = None, limit: int = None,
+                               offset: int = 0) -> pd.DataFrame:
+        if self.getSearchIndexPath():
+            return self._searchPage("publisher", partial_name, order_by, limit, offset)
+        page = self._sparqlPage(["id", "title", "publisher"], order_by, limit, offset)
         query = f"""
-        PREFIX : <http://Brigata.github.org/journal/>
+        PREFIX : <https://brigata.github.org/>
         SELECT ?journal ?title ?publisher
         WHERE {{
             ?journal a :Journal ;
@@ -121,137 +362,365 @@ class JournalQueryHandler(QueryHandler):
                      :publisher ?publisher .
             FILTER CONTAINS(LCASE(?publisher), "{partial_name.lower()}")
         }}
+        {page}
         """
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        results = sparql.query().convert()
+        bindings = self._select(query)
         data = [{
             "id": r["journal"]["value"].split("/")[-1],
             "title": r["title"]["value"],
             "publisher": r["publisher"]["value"]
-        } for r in results["results"]["bindings"]]
+        } for r in bindings]
         
         if not data:
             return pd.DataFrame(columns=["id", "title", "publisher"])
         return pd.DataFrame(data)
 
-    def getJournalsWithLicense(self, licenses: set[str]) -> pd.DataFrame:
-        filter_clause = "FILTER BOUND(?license)" if not licenses else f"FILTER (?license IN ({', '.join(f'\"{l}\"' for l in licenses)}))"
-        sparql = SPARQLWrapper(self.getDbPathOrUrl())
+    def _licenseValues(self, variable: str, licenses) -> str:
+        # licenses are resources (see JournalUploadHandler): match their IRIs directly
+        iris = ' '.join(f"<{vocabularyIri('license', l)}>" for l in licenses)
+        return f"VALUES {variable} {{ {iris} }}"
+
+    def getJournalsWithLicense(self, licenses: set[str], order_by: str = None, limit: int = None,
+                               offset: int = 0) -> pd.DataFrame:
+        values_clause = self._licenseValues("?licenseIri", licenses) if licenses else ""
+        page = self._sparqlPage(["id", "title", "license"], order_by, limit, offset)
         query = f"""
-        PREFIX : <http://Brigata.github.org/journal/>
+        PREFIX : <https://brigata.github.org/>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         SELECT ?journal ?title ?license
         WHERE {{
+            {values_clause}
             ?journal a :Journal ;
                      :title ?title ;
-                     :license ?license .
-            {filter_clause}
+                     :license ?licenseIri .
+            ?licenseIri rdfs:label ?license .
         }}
+        {page}
         """
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        results = sparql.query().convert()
+        bindings = self._select(query)
         data = [{
             "id": r["journal"]["value"].split("/")[-1],
             "title": r["title"]["value"],
             "license": r["license"]["value"]
-        } for r in results["results"]["bindings"]]
+        } for r in bindings]
         
         if not data:
             return pd.DataFrame(columns=["id", "title", "license"])
         return pd.DataFrame(data)
 
-    def getJournalsWithAPC(self, apc: bool=True) -> pd.DataFrame:
-        sparql = SPARQLWrapper(self.getDbPathOrUrl())
-        if apc:
-            query = """
-            PREFIX : <http://Brigata.github.org/journal/>
-            SELECT DISTINCT ?journal ?title ?publisher ?apc
-            WHERE {
-                ?journal a :Journal ;
-                        :title ?title ;
-                        :publisher ?publisher .
-                OPTIONAL { ?journal :apc ?apc }
-                FILTER (
-                BOUND(?apc) &&
-                NOT (LCASE(STR(?apc)) IN ("none","no","false","0",""))
-                )
-            }
-            """
-        else:
-            query = """
-            PREFIX : <http://Brigata.github.org/journal/>
-            SELECT DISTINCT ?journal ?title ?publisher ?apc
-            WHERE {
-                ?journal a :Journal ;
-                        :title ?title ;
-                        :publisher ?publisher .
-                OPTIONAL { ?journal :apc ?apc }
-                FILTER (
-                !BOUND(?apc) ||
-                LCASE(STR(?apc)) IN ("none","no","false","0","")
-                )
-            }
-            """
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        results = sparql.query().convert()
+    def getJournalsWithAPC(self, apc: bool=True, order_by: str = None, limit: int = None,
+                            offset: int = 0) -> pd.DataFrame:
+        # apc is stored as a typed xsd:boolean: a plain triple pattern uses the indexes
+        page = self._sparqlPage(["id", "title", "publisher"], order_by, limit, offset)
+        query = f"""
+        PREFIX : <https://brigata.github.org/>
+        SELECT DISTINCT ?journal ?title ?publisher
+        WHERE {{
+            ?journal a :Journal ;
+                    :apc {"true" if apc else "false"} ;
+                    :title ?title ;
+                    :publisher ?publisher .
+        }}
+        {page}
+        """
+        bindings = self._select(query)
         data = [{
             "id": r["journal"]["value"].split("/")[-1],
             "title": r["title"]["value"],
             "publisher": r.get("publisher", {}).get("value", ""),
             "apc": apc
-        } for r in results["results"]["bindings"]]
+        } for r in bindings]
         return pd.DataFrame(data) if data else pd.DataFrame(columns=["id","title","publisher","apc"])
 
 
-    def getJournalsWithDOAJSeal(self, seal: bool=True) -> pd.DataFrame:
-        sparql = SPARQLWrapper(self.getDbPathOrUrl())
-        if seal:
-            query = """
-            PREFIX : <http://Brigata.github.org/journal/>
-            SELECT DISTINCT ?journal ?title ?publisher ?seal
-            WHERE {
-                ?journal a :Journal ;
-                        :title ?title ;
-                        :publisher ?publisher ;
-                        :seal ?seal .
-                FILTER (
-                (?seal = true) || (LCASE(STR(?seal)) = "true")
-                )
-            }
-            """
-        else:
-            query = """
-            PREFIX : <http://Brigata.github.org/journal/>
-            SELECT DISTINCT ?journal ?title ?publisher
-            WHERE {
-                ?journal a :Journal ;
-                        :title ?title ;
-                        :publisher ?publisher .
-                OPTIONAL { ?journal :seal ?seal }
-                FILTER (
-                !BOUND(?seal) || (?seal = false) || (LCASE(STR(?seal)) = "false")
-                )
-            }
-            """
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        results = sparql.query().convert()
+    def getJournalsWithDOAJSeal(self, seal: bool=True, order_by: str = None, limit: int = None,
+                                offset: int = 0) -> pd.DataFrame:
+        # seal is stored as a typed xsd:boolean: a plain triple pattern uses the indexes
+        page = self._sparqlPage(["id", "title", "publisher"], order_by, limit, offset)
+        query = f"""
+        PREFIX : <https://brigata.github.org/>
+        SELECT DISTINCT ?journal ?title ?publisher
+        WHERE {{
+            ?journal a :Journal ;
+                    :seal {"true" if seal else "false"} ;
+                    :title ?title ;
+                    :publisher ?publisher .
+        }}
+        {page}
+        """
+        bindings = self._select(query)
         data = [{
             "id": r["journal"]["value"].split("/")[-1],
             "title": r["title"]["value"],
             "publisher": r.get("publisher", {}).get("value", ""),
             "seal": seal
-        } for r in results["results"]["bindings"]]
+        } for r in bindings]
         return pd.DataFrame(data) if data else pd.DataFrame(columns=["id","title","publisher","seal"])
 
-class CategoryQueryHandler(QueryHandler):
+    def getJournalCounts(self, field: str, licenses: set[str] = None,
+                         apc: bool = None, seal: bool = None) -> pd.DataFrame:
+        """
+        Number of journals per value of `field` ("license", "publisher", "apc" or "seal"),
+        computed by Blazegraph with GROUP BY. The optional arguments restrict
+        the counted journals (licenses: any of them; apc/seal: True or False).
+        Returns a DataFrame with columns [field, "count"].
+        """
+        if field not in ("license", "publisher", "apc", "seal"):
+            raise ValueError(f"Cannot count journals by {field}")
+        filters = []
+        if licenses:
+            filters.append(self._licenseValues("?flicense", licenses) + " ?journal :license ?flicense .")
+        for name, value in (("apc", apc), ("seal", seal)):
+            if value is not None:
+                filters.append(f'?journal :{name} {"true" if value else "false"} .')
+        if field == "license":
+            filters.append("?licenseIri rdfs:label ?value .")
+        filter_clause = "\n            ".join(filters)
+        query = f"""
+        PREFIX : <https://brigata.github.org/>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        SELECT ?value (COUNT(DISTINCT ?journal) AS ?count)
+        WHERE {{
+            ?journal a :Journal ;
+                     :{field} {"?licenseIri" if field == "license" else "?value"} .
+            {filter_clause}
+        }}
+        GROUP BY ?value
+        ORDER BY DESC(?count)
+        """
+        bindings = self._select(query)
+        data = [{
+            field: r["value"]["value"],
+            "count": int(r["count"]["value"])
+        } for r in bindings]
+        return pd.DataFrame(data) if data else pd.DataFrame(columns=[field, "count"])
+
+    def hasAssignments(self) -> bool:
+        """True when the graph holds the :hasCategory/:hasArea edges copied from the
+        relational database by JournalUploadHandler.pushAssignmentsToDb."""
+        query = """
+        PREFIX : <https://brigata.github.org/>
+        SELECT ?journal WHERE { ?journal :hasCategory ?category } LIMIT 1
+        """
+        return len(self._select(query)) > 0
+
+    def getJournalsByAssignment(self, category_ids: set[str] = None, quartiles: set[str] = None,
+                                area_ids: set[str] = None, licenses: set[str] = None,
+                                apc: bool = None, seal: bool = None, order_by: str = None,
+                                limit: int = None, offset: int = 0) -> pd.DataFrame:
+        """
+        Journals matching the category/quartile/area filters (same meaning as in
+        CategoryQueryHandler.getAllAssignments) and the license/apc/seal filters,
+        answered by a single SPARQL query on the graph (requires hasAssignments()).
+        Only journals with at least one category are returned. Returns the same columns as getAllJournals.
+        """
+        from rdflib import Literal
+
+        def values(variable, items):
+            items = [(v or "").strip() for v in (items or set()) if (v or "").strip()]
+            return f"VALUES {variable} {{ {' '.join(Literal(v).n3() for v in items)} }}" if items else ""
+
+        # the VALUES come first and the most selective patterns next: in-process
+        # rdflib evaluates the patterns in the order they are written
+        patterns = []
+        if category_ids:
+            patterns.append(values("?categoryId", category_ids))
+        if quartiles:
+            patterns.append(values("?quartile", quartiles))
+        if area_ids:
+            area_iris = " ".join(f"<{vocabularyIri('area', a)}>" for a in area_ids if (a or "").strip())
+            patterns.append(f"VALUES ?area {{ {area_iris} }}")
+        if licenses:
+            patterns.append(self._licenseValues("?flicense", licenses))
+        if category_ids:
+            patterns.append("?category :categoryId ?categoryId .")
+        if quartiles:
+            patterns.append("?category :quartile ?quartile .")
+        if area_ids:
+            patterns.append("?journal :hasArea ?area .")
+        # like the relational side, only journals with at least one assignment
+        patterns.append("?journal :hasCategory ?category .")
+        if licenses:
+            patterns.append("?journal :license ?flicense .")
+        elif licenses is not None:
+            # an empty set means any license, like getJournalsWithLicense(set())
+            patterns.append('?journal :license ?flicense . ?flicense rdfs:label ?flabel . FILTER (STR(?flabel) != "")')
+        for name, value in (("apc", apc), ("seal", seal)):
+            if value is not None:
+                patterns.append(f'?journal :{name} {"true" if value else "false"} .')
+        pattern_clause = "\n            ".join(patterns)
+        page = self._sparqlPage(["id", "title", "publisher", "apc", "seal", "license"], order_by, limit, offset)
+        query = f"""
+        PREFIX : <https://brigata.github.org/>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        SELECT DISTINCT ?journal ?title ?publisher ?apc ?seal ?license
+        WHERE {{
+            {pattern_clause}
+            ?journal a :Journal ;
+                    :title ?title ;
+                    :publisher ?publisher .
+            OPTIONAL {{ ?journal :apc ?apc }}
+            OPTIONAL {{ ?journal :seal ?seal }}
+            OPTIONAL {{ ?journal :license ?licenseIri . ?licenseIri rdfs:label ?license }}
+        }}
+        {page}
+        """
+        bindings = self._select(query)
+        data = [{
+            "id": r["journal"]["value"].split("/")[-1],
+            "title": r["title"]["value"],
+            "publisher": r["publisher"]["value"],
+            "apc": r.get("apc", {}).get("value", "No"),
+            "seal": r.get("seal", {}).get("value", "No"),
+            "license": r.get("license", {}).get("value", "")
+        } for r in bindings]
+        if not data:
+            return pd.DataFrame(columns=["id", "title", "publisher", "apc", "seal", "license"])
+        return pd.DataFrame(data)
+
+class SQLiteQueryMixin:
+    """
+    Connection options and helpers of the handlers reading a SQLite database
+    (CategoryQueryHandler, JournalSQLQueryHandler): one SQLAlchemy engine per
+    handler, the read-only/in-memory replicas, the filters on large sets of
+    values and the Scimago assignments. Listed before the handler base class.
+    """
+    # sets of ids longer than this are not bound as IN (:a0, :a1, ...) lists (SQLite
+    # allows 32766 variables, and every length is a new statement to prepare):
+    # they are written to a temporary table of the connection, joined by the query
+    tempTableThreshold = 500
+
+    def __init__(self):
+        super().__init__()
+        self.readOnly = False
+        self.mmapSize = 0
+        self.inMemory = False
+        self.engine = None
+
+    def setDbPathOrUrl(self, url: str):
+        self.engine = None
+        return super().setDbPathOrUrl(url)
+
+    def setReadOnly(self, readOnly: bool = True, mmapSize: int = 256 * 1024 * 1024,
+                    inMemory: bool = False):
+        """
+        Options for read-only replicas. With readOnly the database file is opened
+        in immutable read-only URI mode (no file locking), with a shared page cache
+        and `mmapSize` bytes memory-mapped; with inMemory as well, the whole file is
+        copied into an in-memory database once, and every query is served from RAM.
+        The file must not be modified while a read-only handler uses it.
+        """
+        self.readOnly = readOnly
+        self.mmapSize = mmapSize
+        self.inMemory = inMemory
+        self.engine = None
+        return True
+
+    def _getEngine(self):
+        # one engine per handler, created on first use
+        if self.engine is not None:
+            return self.engine
+        from sqlalchemy import create_engine
+        from sqlalchemy.pool import QueuePool
+        path = self.getDbPathOrUrl()
+        if not self.readOnly:
+            self.engine = create_engine(f"sqlite:///{path}")
+            return self.engine
+
+        uri = f"file:{quote(os.path.abspath(path))}?mode=ro&immutable=1&cache=shared"
+        mmap_size = int(self.mmapSize)
+
+        def connectReadOnly():
+            # a pooled connection is used by one thread at a time, but not always the same one
+            con = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            con.execute(f"PRAGMA mmap_size = {mmap_size}")
+            return con
+
+        connect = connectReadOnly
+        if self.inMemory:
+            # a named in-memory database shared by the connections of this handler;
+            # it lives as long as self.memory is open
+            memory_uri = f"file:brigata_{id(self)}?mode=memory&cache=shared"
+            self.memory = sqlite3.connect(memory_uri, uri=True, check_same_thread=False)
+            source = connectReadOnly()
+            source.backup(self.memory)
+            source.close()
+
+            def connectInMemory():
+                con = sqlite3.connect(memory_uri, uri=True, check_same_thread=False)
+                con.execute("PRAGMA query_only = ON")
+                return con
+            connect = connectInMemory
+        # "sqlite://" alone would get a SingletonThreadPool, which closes the
+        # connections of other threads: every thread checks out its own connection
+        self.engine = create_engine("sqlite://", creator=connect, poolclass=QueuePool,
+                                    pool_size=5, max_overflow=20)
+        return self.engine
+
+    def _valuesFilter(self, con, column: str, prefix: str, values: list):
+        """
+        Condition "`column` is one of `values`" and its parameters, for a query
+        run on the connection `con`. Large sets go through the temporary table
+        filter_<prefix> (or, on the query_only in-memory replicas, which cannot
+        create it, a single JSON parameter read by json_each): the statement text
+        is the same whatever the number of values.
+        """
+        if len(values) <= self.tempTableThreshold:
+            placeholders = ",".join(f":{prefix}{i}" for i in range(len(values)))
+            return f"{column} IN ({placeholders})", {f"{prefix}{i}": values[i] for i in range(len(values))}
+        if self.readOnly and self.inMemory:
+            return f"{column} IN (SELECT value FROM json_each(:{prefix}))", {prefix: json.dumps(values)}
+        table = f"filter_{prefix}"
+        con.exec_driver_sql(f"CREATE TEMP TABLE IF NOT EXISTS {table} (value TEXT PRIMARY KEY)")
+        con.exec_driver_sql(f"DELETE FROM {table}")
+        con.exec_driver_sql(f"INSERT OR IGNORE INTO {table} (value) VALUES (?)", [(v,) for v in values])
+        return f"{column} IN (SELECT value FROM temp.{table})", {}
+
+    def _assignmentSource(self, engine) -> str:
+        # the Assignment table materialized by CategoryUploadHandler;
+        # databases built before it existed fall back to the join
+        with engine.connect() as con:
+            materialized = con.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='Assignment'").first()
+        if materialized:
+            return "Assignment"
+        return """(
+            SELECT
+                hc.journalId AS journalId,
+                j.id AS id,             -- journal external id
+                c.id AS category_id,    -- category name
+                c.quartile AS quartile, -- category quartile
+                a.id AS area_id         -- area name
+            FROM HasCategory hc
+            JOIN IdentifiableEntity c ON c.internalId = hc.categoryId
+            JOIN IdentifiableEntity j ON j.internalId = hc.journalId
+            JOIN HasArea ha           ON ha.journalId  = hc.journalId
+            JOIN IdentifiableEntity a ON a.internalId  = ha.areaId
+            )"""
+
+    def _hasColumn(self, con, table: str, column: str) -> bool:
+        return column in [r[1] for r in con.exec_driver_sql(f"PRAGMA table_info({table})")]
+
+    def _assignmentFilters(self, con, category_ids, quartiles, area_ids):
+        # WHERE clause (possibly empty) and its parameters for the assignment filters
+        conditions = []
+        params = {}
+        for column, prefix, values in [("category_id", "c", category_ids),
+                                       ("quartile", "q", quartiles),
+                                       ("area_id", "a", area_ids)]:
+            vals = [(v or "").strip() for v in (values or set()) if (v or "").strip()]
+            if vals:
+                condition, values_params = self._valuesFilter(con, column, prefix, vals)
+                conditions.append(condition)
+                params.update(values_params)
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        return where, params
+
+
+class CategoryQueryHandler(SQLiteQueryMixin, QueryHandler):
     # Yang you should search not just category but also those areas id toooooooo-------
     def getById(self, category_id: str) -> pd.DataFrame:
-        print("function getById by Yang started")
-        engine = create_engine(f"sqlite:///{self.getDbPathOrUrl()}")
-        print("engine created")
+        engine = self._getEngine()
         query = """
         SELECT i.id AS id, i.quartile AS quartile
         FROM IdentifiableEntity i
@@ -262,7 +731,7 @@ class CategoryQueryHandler(QueryHandler):
         return pd.read_sql(query, engine, params={"category_id": (category_id or "").strip()})
 
     def getAllCategories(self) -> pd.DataFrame:
-        engine = create_engine(f"sqlite:///{self.getDbPathOrUrl()}")
+        engine = self._getEngine()
         query = """
         SELECT DISTINCT i.id AS category_id, i.quartile AS quartile
         FROM IdentifiableEntity i
@@ -275,7 +744,7 @@ class CategoryQueryHandler(QueryHandler):
         return df if not df.empty else pd.DataFrame(columns=["category_id", "quartile"])
 
     def getAllAreas(self) -> pd.DataFrame:
-        engine = create_engine(f"sqlite:///{self.getDbPathOrUrl()}")
+        engine = self._getEngine()
         query = """
         SELECT DISTINCT i.id AS id
         FROM IdentifiableEntity i
@@ -285,66 +754,128 @@ class CategoryQueryHandler(QueryHandler):
         return pd.read_sql(query, engine)
 
     def getCategoriesWithQuartile(self, quartiles: set[str]) -> pd.DataFrame:
-        engine = create_engine(f"sqlite:///{self.getDbPathOrUrl()}")
+        engine = self._getEngine()
         qs = [(q or "").strip().upper() for q in (quartiles or set()) if (q or "").strip()]
         if not qs:
             return pd.DataFrame(columns=["category_id", "quartile"])
-        placeholders = ",".join(f":q{i}" for i in range(len(qs)))
-        params = {f"q{i}": qs[i] for i in range(len(qs))}
-        query = f"""
-        SELECT DISTINCT i.id AS category_id, i.quartile AS quartile
-        FROM IdentifiableEntity i
-        WHERE i.internalId LIKE 'category-%'
-        AND UPPER(i.quartile) IN ({placeholders})
-        ORDER BY category_id
-        """
-        df = pd.read_sql(query, engine, params=params)
+        ranks = [quartileRank(q) for q in qs]
+        with engine.connect() as con:
+            if None not in ranks and self._hasColumn(con, "IdentifiableEntity", "quartileRank"):
+                # integer ranks written by the uploader: an index seek
+                condition, params = self._valuesFilter(con, "i.quartileRank", "q", sorted(set(ranks)))
+            else:
+                condition, params = self._valuesFilter(con, "UPPER(i.quartile)", "q", qs)
+            query = f"""
+            SELECT DISTINCT i.id AS category_id, i.quartile AS quartile
+            FROM IdentifiableEntity i
+            WHERE i.internalId LIKE 'category-%'
+            AND {condition}
+            ORDER BY category_id, quartile
+            """
+            df = pd.read_sql(query, con, params=params)
         if "category_id" not in df.columns and "id" in df.columns:
             df = df.rename(columns={"id": "category_id"})
         return df if not df.empty else pd.DataFrame(columns=["category_id", "quartile"])
 
+    def _cooccurrence(self):
+        """
+        The AreaCategoryCooccurrence table (area_id, category_id, quartile, journals)
+        written by CategoryUploadHandler, read once per version of the database
+        file and then looked up in memory; None for databases built before it.
+        """
+        path = self.getDbPathOrUrl()
+        version = (os.stat(path).st_mtime_ns, os.stat(path).st_size) if os.path.exists(path) else None
+        cached = _cooccurrences.get(path)
+        if cached and cached[0] == version:
+            return cached[1]
+        with self._getEngine().connect() as con:
+            exists = con.exec_driver_sql("SELECT name FROM sqlite_master WHERE type='table' "
+                                         "AND name='AreaCategoryCooccurrence'").first()
+            df = pd.read_sql("SELECT area_id, category_id, quartile, journals FROM AreaCategoryCooccurrence",
+                             con) if exists else None
+        _cooccurrences[path] = (version, df)
+        return df
+
     def getCategoriesAssignedToAreas(self, area_ids: set[str]) -> pd.DataFrame:
-        engine = create_engine(f"sqlite:///{self.getDbPathOrUrl()}")
+        engine = self._getEngine()
         aids = [ (a or "").strip() for a in (area_ids or set()) if (a or "").strip() ]
         if not aids:
             return pd.DataFrame(columns=["id", "quartile"])
-        
-        placeholders = ",".join(f":a{i}" for i in range(len(aids)))
-        params = { f"a{i}": aids[i] for i in range(len(aids)) }
 
-        query = f"""
-        SELECT DISTINCT c.id AS id, c.quartile AS quartile
-        FROM HasCategory hc
-        JOIN IdentifiableEntity c ON c.internalId = hc.categoryId
-        JOIN HasArea ha           ON ha.journalId = hc.journalId
-        JOIN IdentifiableEntity a ON a.internalId = ha.areaId
-        WHERE a.id IN ({placeholders})
-        ORDER BY id
-        """
-        return pd.read_sql(query, engine, params=params)
+        cooccurrence = self._cooccurrence()
+        if cooccurrence is not None:
+            rows = cooccurrence[cooccurrence["area_id"].isin(aids)]
+            df = rows[["category_id", "quartile"]].drop_duplicates().rename(columns={"category_id": "id"})
+            return df.sort_values(["id", "quartile"], ignore_index=True)
+
+        with engine.connect() as con:
+            condition, params = self._valuesFilter(con, "a.id", "a", aids)
+            query = f"""
+            SELECT DISTINCT c.id AS id, c.quartile AS quartile
+            FROM HasCategory hc
+            JOIN IdentifiableEntity c ON c.internalId = hc.categoryId
+            JOIN HasArea ha           ON ha.journalId = hc.journalId
+            JOIN IdentifiableEntity a ON a.internalId = ha.areaId
+            WHERE {condition}
+            ORDER BY id
+            """
+            return pd.read_sql(query, con, params=params)
 
     def getAreasAssignedToCategories(self, category_ids: set[str]) -> pd.DataFrame:
-        engine = create_engine(f"sqlite:///{self.getDbPathOrUrl()}")
+        engine = self._getEngine()
         cids = [ (c or "").strip() for c in (category_ids or set()) if (c or "").strip() ]
         if not cids:
             return pd.DataFrame(columns=["area"])
 
-        placeholders = ",".join(f":c{i}" for i in range(len(cids)))
-        params = { f"c{i}": cids[i] for i in range(len(cids)) }
+        cooccurrence = self._cooccurrence()
+        if cooccurrence is not None:
+            rows = cooccurrence[cooccurrence["category_id"].isin(cids)]
+            df = rows[["area_id"]].drop_duplicates().rename(columns={"area_id": "area"})
+            return df.sort_values("area", ignore_index=True)
 
-        query = f"""
-        SELECT DISTINCT a.id AS area
-        FROM HasCategory hc
-        JOIN IdentifiableEntity c ON c.internalId = hc.categoryId
-        JOIN HasArea ha           ON ha.journalId = hc.journalId
-        JOIN IdentifiableEntity a ON a.internalId = ha.areaId
-        WHERE c.id IN ({placeholders})
-        ORDER BY area
+        with engine.connect() as con:
+            condition, params = self._valuesFilter(con, "c.id", "c", cids)
+            query = f"""
+            SELECT DISTINCT a.id AS area
+            FROM HasCategory hc
+            JOIN IdentifiableEntity c ON c.internalId = hc.categoryId
+            JOIN HasArea ha           ON ha.journalId = hc.journalId
+            JOIN IdentifiableEntity a ON a.internalId = ha.areaId
+            WHERE {condition}
+            ORDER BY area
+            """
+            return pd.read_sql(query, con, params=params)
+
+    def getAreaCategoryCounts(self, area_ids: set[str] = None) -> pd.DataFrame:
+        """
+        Number of journals of each category in each area (of `area_ids`, or all),
+        over all the quartiles. Columns: area_id, category_id, journals.
         """
-        return pd.read_sql(query, engine, params=params)
+        columns = ["area_id", "category_id", "journals"]
+        aids = [(a or "").strip() for a in (area_ids or set()) if (a or "").strip()]
+        cooccurrence = self._cooccurrence()
+        if cooccurrence is not None:
+            rows = cooccurrence[cooccurrence["area_id"].isin(aids)] if aids else cooccurrence
+            df = rows.groupby(["area_id", "category_id"], as_index=False)["journals"].sum()
+        else:
+            engine = self._getEngine()
+            source = self._assignmentSource(engine)
+            with engine.connect() as con:
+                where, params = self._assignmentFilters(con, None, None, aids)
+                query = f"""
+                SELECT area_id, category_id, COUNT(DISTINCT journalId) AS journals
+                FROM {source}
+                {where}
+                GROUP BY area_id, category_id
+                """
+                df = pd.read_sql(query, con, params=params)
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+        return df.sort_values(["area_id", "journals", "category_id"], ascending=[True, False, True],
+                              ignore_index=True)
 
     def getAllCategoryAssignments(self) -> pd.DataFrame:
-        engine = create_engine(f"sqlite:///{self.getDbPathOrUrl()}")
+        engine = self._getEngine()
         query = """
         SELECT
         c.id AS category,
@@ -359,7 +890,7 @@ class CategoryQueryHandler(QueryHandler):
         return df if not df.empty else pd.DataFrame(columns=["category","category_quartile","identifiers"])
 
     def getAllAreaAssignments(self) -> pd.DataFrame:
-        engine = create_engine(f"sqlite:///{self.getDbPathOrUrl()}")
+        engine = self._getEngine()
         query = """
         SELECT
         a.id AS area,
@@ -373,7 +904,56 @@ class CategoryQueryHandler(QueryHandler):
         return df if not df.empty else pd.DataFrame(columns=["area","identifiers"])
 
 # li 6.12
-    def getAllAssignments(self) -> pd.DataFrame:
+    def _bestQuartileSource(self, engine) -> str:
+        # the BestQuartile table maintained by CategoryUploadHandler; databases
+        # built before it existed compute it from the assignments
+        with engine.connect() as con:
+            materialized = con.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='BestQuartile'").first()
+        if materialized:
+            return "BestQuartile"
+        return f"""(
+            SELECT journalId, MIN(quartileRank) AS quartileRank, 'Q' || MIN(quartileRank) AS quartile
+            FROM (
+                SELECT journalId, CAST(SUBSTR(UPPER(TRIM(quartile)), 2) AS INTEGER) AS quartileRank
+                FROM {self._assignmentSource(engine)}
+                WHERE UPPER(TRIM(quartile)) IN ('Q1', 'Q2', 'Q3', 'Q4')
+            )
+            GROUP BY journalId
+            )"""
+
+    def getJournalsWithBestQuartile(self, quartiles: set[str], area_ids: set[str] = None) -> pd.DataFrame:
+        """
+        Identifiers of the journals whose best quartile (over all their categories)
+        is one of `quartiles`, optionally only the journals in one of `area_ids`.
+        Columns: id (ISSN/EISSN), journalId, best_quartile.
+        """
+        columns = ["id", "journalId", "best_quartile"]
+        ranks = sorted({r for r in (quartileRank(q) for q in (quartiles or set())) if r is not None})
+        if not ranks:
+            return pd.DataFrame(columns=columns)
+        engine = self._getEngine()
+        best = self._bestQuartileSource(engine)
+        source = self._assignmentSource(engine)
+        with engine.connect() as con:
+            condition, params = self._valuesFilter(con, "b.quartileRank", "r", ranks)
+            areas = [(a or "").strip() for a in (area_ids or set()) if (a or "").strip()]
+            if areas:
+                area_condition, area_params = self._valuesFilter(con, "a.area_id", "a", areas)
+                condition += " AND " + area_condition
+                params.update(area_params)
+            query = f"""
+            SELECT DISTINCT a.id AS id, b.journalId AS journalId, b.quartile AS best_quartile
+            FROM {best} AS b
+            JOIN {source} AS a ON a.journalId = b.journalId
+            WHERE {condition}
+            ORDER BY id
+            """
+            df = pd.read_sql(query, con, params=params)
+        return df if not df.empty else pd.DataFrame(columns=columns)
+
+    def getAllAssignments(self, category_ids: set[str] = None, quartiles: set[str] = None,
+                          area_ids: set[str] = None) -> pd.DataFrame:
         """
         Return a DataFrame where each row is a (journal, category, area) assignment.
         Required columns (for laura.py):
@@ -381,20 +961,230 @@ class CategoryQueryHandler(QueryHandler):
           - category_id  : category name
           - quartile     : quartile of that category for that journal
           - area_id      : area name
+          - journalId    : internal journal id (the same for all identifiers of a journal)
+        The optional sets restrict the rows to the given categories, quartiles
+        and areas (an empty or missing set means no restriction).
+        """
+        engine = self._getEngine()
+        source = self._assignmentSource(engine)
+        with engine.connect() as con:
+            where, params = self._assignmentFilters(con, category_ids, quartiles, area_ids)
+            query = f"""
+            SELECT id, category_id, quartile, area_id, journalId
+            FROM {source}
+            {where}
+            """
+            return pd.read_sql(query, con, params=params)
+
+    def getJournalCounts(self, field: str, category_ids: set[str] = None, quartiles: set[str] = None,
+                         area_ids: set[str] = None) -> pd.DataFrame:
+        """
+        Number of journals per value of `field` ("area", "category" or "quartile"),
+        computed by SQLite with GROUP BY, optionally restricted with the same
+        filters as getAllAssignments. Returns a DataFrame with columns [field, "count"].
+        """
+        columns = {"area": "area_id", "category": "category_id", "quartile": "quartile"}
+        if field not in columns:
+            raise ValueError(f"Cannot count journals by {field}")
+        engine = self._getEngine()
+        source = self._assignmentSource(engine)
+        with engine.connect() as con:
+            where, params = self._assignmentFilters(con, category_ids, quartiles, area_ids)
+            query = f"""
+            SELECT {columns[field]} AS "{field}", COUNT(DISTINCT journalId) AS count
+            FROM {source}
+            {where}
+            GROUP BY {columns[field]}
+            ORDER BY count DESC, {columns[field]}
+            """
+            df = pd.read_sql(query, con, params=params)
+        return df if not df.empty else pd.DataFrame(columns=[field, "count"])
+
+
+class JournalSQLQueryHandler(SQLiteQueryMixin, JournalQueryHandler):
+    """
+    JournalQueryHandler answering from the relational mirror written by
+    JournalUploadHandler.setRelationalMirrorPath (tables Journal, JournalIdentifier
+    and JournalLanguage): dbPathOrUrl is that SQLite file. When it is also the
+    database of CategoryUploadHandler, getJournalsByAssignment (and so every
+    composite query of FullQueryEngine) is a single SQL statement.
+    """
+
+    # apc/seal are stored as 0/1 and returned as "true"/"false", like the graph
+    COLUMNS = """j.id AS id, j.title AS title, j.publisher AS publisher,
+                 CASE WHEN j.apc THEN 'true' ELSE 'false' END AS apc,
+                 CASE WHEN j.seal THEN 'true' ELSE 'false' END AS seal,
+                 j.license AS license"""
+
+    def _read(self, query: str, params: dict = None, columns: list = None, con=None) -> pd.DataFrame:
+        # `con`: the connection holding the temporary tables of _valuesFilter
+        with span("sql", backend="sqlite") as s:
+            df = pd.read_sql(query, con if con is not None else self._getEngine(), params=params or {})
+            s.set(rows=len(df))
+        return df if not df.empty or columns is None else pd.DataFrame(columns=columns)
+
+    def _containsPattern(self, text: str) -> str:
+        # LIKE pattern of a substring: % _ and \\ are characters, as in the SPARQL CONTAINS filter
+        escaped = (text or "").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return "%" + escaped + "%"
+
+    def _journalFilters(self, con, licenses=None, apc=None, seal=None):
+        # conditions (to be joined with AND) and parameters for the journal filters
+        conditions = []
+        params = {}
+        licenses = [l for l in (licenses or set()) if l]
+        if licenses:
+            condition, params = self._valuesFilter(con, "j.license", "l", licenses)
+            conditions.append(condition)
+        for name, value in (("apc", apc), ("seal", seal)):
+            if value is not None:
+                conditions.append(f"j.{name} = {1 if value else 0}")
+        return conditions, params
+
+    def _sqlPage(self, columns, order_by=None, limit=None, offset=0) -> str:
+        # ORDER BY / LIMIT / OFFSET of a query returning `columns` (see _order)
+        order = self._order(order_by, limit, offset, columns)
+        if order is None:
+            return ""
+        field, descending = order
+        clause = "ORDER BY " + ", ".join(f"{f} DESC" if descending else f for f in dict.fromkeys([field, "id"]))
+        if limit is not None or offset:
+            clause += f" LIMIT {-1 if limit is None else int(limit)} OFFSET {int(offset)}"
+        return clause
+
+    def getById(self, journal_id: str) -> pd.DataFrame:
+        query = """
+        SELECT :journal_id AS id, j.title, j.publisher, j.license,
+               CASE WHEN j.apc THEN 'true' ELSE 'false' END AS apc
+        FROM Journal j
+        JOIN JournalIdentifier ji ON ji.id = j.id
+        WHERE ji.identifier = :identifier
         """
-        db_path = self.getDbPathOrUrl()
-        engine = create_engine(f"sqlite:///{db_path}")
+        return self._read(query, {"journal_id": journal_id, "identifier": journal_id.strip().upper()},
+                          ["id", "title", "publisher", "license", "apc"])
 
+    def getAllJournals(self, order_by: str = None, limit: int = None, offset: int = 0) -> pd.DataFrame:
+        columns = ["id", "title", "publisher", "apc", "seal", "license"]
+        page = self._sqlPage(columns, order_by, limit, offset)
+        return self._read(f"SELECT {self.COLUMNS} FROM Journal j {page}", columns=columns)
+
+    def getAllIdentifiers(self) -> pd.DataFrame:
+        return self._read("SELECT id, identifier FROM JournalIdentifier", columns=["id", "identifier"])
+
+    def getJournalsByIds(self, ids: set[str], chunkSize: int = None, workers: int = None) -> pd.DataFrame:
+        # a single statement: large sets are joined through a temporary table (_valuesFilter),
+        # so chunkSize and workers are not needed
+        values = sorted({str(i).strip().upper() for i in (ids or set()) if str(i).strip()})
+        columns = ["id", "title", "publisher", "apc", "seal", "license"]
+        if not values:
+            return pd.DataFrame(columns=columns)
+        with self._getEngine().connect() as con:
+            condition, params = self._valuesFilter(con, "ji.identifier", "i", values)
+            query = f"""
+            SELECT {self.COLUMNS}
+            FROM Journal j
+            WHERE j.id IN (SELECT ji.id FROM JournalIdentifier ji WHERE {condition})
+            """
+            return self._read(query, params, columns, con)
+
+    def getContentHashes(self) -> pd.DataFrame:
         query = """
-        SELECT
-            j.id AS id,             -- journal external id
-            c.id AS category_id,    -- category name
-            c.quartile AS quartile, -- category quartile
-            a.id AS area_id         -- area name
-        FROM HasCategory hc
-        JOIN IdentifiableEntity c ON c.internalId = hc.categoryId
-        JOIN IdentifiableEntity j ON j.internalId = hc.journalId
-        JOIN HasArea ha           ON ha.journalId  = hc.journalId
-        JOIN IdentifiableEntity a ON a.internalId  = ha.areaId
+        SELECT j.id AS id, COALESCE(ji.identifier, '') AS identifier, j.contentHash AS hash
+        FROM Journal j
+        LEFT JOIN JournalIdentifier ji ON ji.id = j.id
         """
-        return pd.read_sql(query, engine)
\ No newline at end of file
+        return self._read(query, columns=["id", "identifier", "hash"])
+
+    def getJournalsWithTitle(self, partial_title: str, order_by: str = None, limit: int = None,
+                             offset: int = 0) -> pd.DataFrame:
+        if self.getSearchIndexPath():
+            return self._searchPage("title", partial_title, order_by, limit, offset)
+        page = self._sqlPage(["id", "title"], order_by, limit, offset)
+        query = f"SELECT id, title FROM Journal WHERE title LIKE :text ESCAPE '\\' {page}"
+        return self._read(query, {"text": self._containsPattern(partial_title)}, ["id", "title"])
+
+    def getJournalsPublishedBy(self, partial_name: str, order_by: str = None, limit: int = None,
+                               offset: int = 0) -> pd.DataFrame:
+        if self.getSearchIndexPath():
+            return self._searchPage("publisher", partial_name, order_by, limit, offset)
+        page = self._sqlPage(["id", "title", "publisher"], order_by, limit, offset)
+        query = f"SELECT id, title, publisher FROM Journal WHERE publisher LIKE :text ESCAPE '\\' {page}"
+        return self._read(query, {"text": self._containsPattern(partial_name)}, ["id", "title", "publisher"])
+
+    def getJournalsWithLicense(self, licenses: set[str], order_by: str = None, limit: int = None,
+                               offset: int = 0) -> pd.DataFrame:
+        page = self._sqlPage(["id", "title", "license"], order_by, limit, offset)
+        with self._getEngine().connect() as con:
+            conditions, params = self._journalFilters(con, licenses=licenses)
+            where = "WHERE " + conditions[0] if conditions else "WHERE j.license != ''"
+            return self._read(f"SELECT j.id, j.title, j.license FROM Journal j {where} {page}", params,
+                              ["id", "title", "license"], con)
+
+    def getJournalsWithAPC(self, apc: bool=True, order_by: str = None, limit: int = None,
+                           offset: int = 0) -> pd.DataFrame:
+        page = self._sqlPage(["id", "title", "publisher"], order_by, limit, offset)
+        df = self._read(f"SELECT id, title, publisher FROM Journal WHERE apc = {1 if apc else 0} {page}",
+                        columns=["id", "title", "publisher"])
+        df["apc"] = apc
+        return df
+
+    def getJournalsWithDOAJSeal(self, seal: bool=True, order_by: str = None, limit: int = None,
+                                offset: int = 0) -> pd.DataFrame:
+        page = self._sqlPage(["id", "title", "publisher"], order_by, limit, offset)
+        df = self._read(f"SELECT id, title, publisher FROM Journal WHERE seal = {1 if seal else 0} {page}",
+                        columns=["id", "title", "publisher"])
+        df["seal"] = seal
+        return df
+
+    def getJournalCounts(self, field: str, licenses: set[str] = None,
+                         apc: bool = None, seal: bool = None) -> pd.DataFrame:
+        if field not in ("license", "publisher", "apc", "seal"):
+            raise ValueError(f"Cannot count journals by {field}")
+        value = f"CASE WHEN j.{field} THEN 'true' ELSE 'false' END" if field in ("apc", "seal") else f"j.{field}"
+        with self._getEngine().connect() as con:
+            conditions, params = self._journalFilters(con, licenses, apc, seal)
+            if field == "license":
+                conditions.append("j.license != ''")
+            where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+            query = f"""
+            SELECT {value} AS "{field}", COUNT(*) AS count
+            FROM Journal j
+            {where}
+            GROUP BY 1
+            ORDER BY count DESC
+            """
+            return self._read(query, params, [field, "count"], con)
+
+    def hasAssignments(self) -> bool:
+        # the assignments are in the same file when it is also the category database
+        with self._getEngine().connect() as con:
+            return con.exec_driver_sql("SELECT name FROM sqlite_master WHERE type='table' "
+                                       "AND name IN ('Assignment', 'HasCategory')").first() is not None
+
+    def getJournalsByAssignment(self, category_ids: set[str] = None, quartiles: set[str] = None,
+                                area_ids: set[str] = None, licenses: set[str] = None,
+                                apc: bool = None, seal: bool = None, order_by: str = None,
+                                limit: int = None, offset: int = 0) -> pd.DataFrame:
+        engine = self._getEngine()
+        source = self._assignmentSource(engine)
+        columns = ["id", "title", "publisher", "apc", "seal", "license"]
+        with engine.connect() as con:
+            where, params = self._assignmentFilters(con, category_ids, quartiles, area_ids)
+            conditions, journal_params = self._journalFilters(con, licenses, apc, seal)
+            if licenses is not None and not any(licenses):
+                # an empty set means any license, like getJournalsWithLicense(set())
+                conditions.append("j.license != ''")
+            params.update(journal_params)
+            query = f"""
+            SELECT {self.COLUMNS}
+            FROM Journal j
+            WHERE j.id IN (
+                SELECT ji.id
+                FROM JournalIdentifier ji
+                JOIN {source} AS a ON a.id = ji.identifier
+                {where}
+            )
+            {"".join(" AND " + c for c in conditions)}
+            {self._sqlPage(columns, order_by, limit, offset)}
+            """
+            return self._read(query, params, columns, con)
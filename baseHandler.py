@@ -1,6 +1,46 @@
 import pandas as pd
 import json
 import csv
+import copy
+import glob
+import os
+import time
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+def isEndpointUrl(pathOrUrl):
+    # http(s) addresses are SPARQL endpoints, anything else is a local file
+    return str(pathOrUrl).lower().startswith(("http://", "https://"))
+
+def isSqliteFile(path):
+    # a SQLite database: by its header when the file exists, otherwise by its extension
+    path = str(path)
+    if os.path.isfile(path) and os.path.getsize(path) > 0:
+        with open(path, "rb") as f:
+            return f.read(16) == b"SQLite format 3\x00"
+    return path.lower().endswith((".db", ".sqlite", ".sqlite3"))
+
+# extensions of the local graph files (see JournalUploadHandler._pushToLocalGraph)
+GRAPH_EXTENSIONS = (".nt", ".ttl", ".n3", ".rdf", ".xml", ".owl", ".jsonld", ".nq", ".trig")
+
+BASE_URL = "https://brigata.github.org/"
+
+def vocabularyIri(kind, label):
+    # IRI of a controlled value of the graph, e.g. https://brigata.github.org/license/CC%20BY
+    return BASE_URL + kind + "/" + quote(str(label).strip(), safe="")
+
+QUARTILES = ["Q1", "Q2", "Q3", "Q4"]
+
+def quartileRank(quartile):
+    # 1 for "Q1" (the best) ... 4 for "Q4"; None for a missing or unknown quartile
+    value = str(quartile or "").strip().upper()
+    return QUARTILES.index(value) + 1 if value in QUARTILES else None
+
+def _parseTimed(reader, path):
+    # runs in a worker process: parse one file and measure how long it took
+    start = time.perf_counter()
+    data = reader(path)
+    return data, time.perf_counter() - start
 
 class Handler:
     def __init__(self):
@@ -12,26 +52,145 @@ class Handler:
         return True
 
 #goal of UploadHandler is to recognize the format of the file
-class UploadHandler(Handler): 
+class UploadHandler(Handler):
+    fileExtension = ''  # set by the subclasses that handle one format
+
     def __init__(self):
         super().__init__()  # I am not sure about params here
         # something about setDbPathOrUrl(path)
-        
+
+    def _handlerFor(self, path, handlers=None):
+        # the handler that uploads `path`: self if it handles that format, otherwise
+        # a JournalUploadHandler/CategoryUploadHandler on the same database
+        if self.fileExtension:
+            return self if path.endswith(self.fileExtension) else None
+        from li import JournalUploadHandler
+        from daniele import CategoryUploadHandler
+        handlers = {} if handlers is None else handlers
+        for handler_class in (JournalUploadHandler, CategoryUploadHandler):
+            if path.endswith(handler_class.fileExtension):
+                if handler_class not in handlers:
+                    handler = handler_class()
+                    handler.setDbPathOrUrl(self.getDbPathOrUrl())
+                    handlers[handler_class] = handler
+                return handlers[handler_class]
+        return None
+
+    def _targetError(self, handler):
+        # why the database of this generic handler cannot take the files of `handler`
+        # (None when it can): journals go to a graph, a SPARQL endpoint or a graph
+        # file, and categories to a SQLite database
+        if handler is self:
+            return None
+        from li import JournalUploadHandler
+        target = self.getDbPathOrUrl()
+        if isinstance(handler, JournalUploadHandler):
+            if not isEndpointUrl(target) and isSqliteFile(target):
+                return f"{target} is a SQLite database: {handler.fileExtension} files need a graph (endpoint or graph file)"
+        elif isEndpointUrl(target) or str(target).lower().endswith(GRAPH_EXTENSIONS) or \
+                os.path.isfile(target) and os.path.getsize(target) > 0 and not isSqliteFile(target):
+            return f"{target} is not a SQLite database: {handler.fileExtension} files need one"
+        return None
+
+    def _supportsConcurrentWrites(self):
+        # SQLite and local files accept one writer at a time
+        return False
+
     def pushDataToDb(self, path):
         db_path = self.getDbPathOrUrl()
         if not db_path:
             print("Error: No database path or URL provided. Please call setDbPathOrUrl() first.")
             return False
-        if path.endswith('.csv'):
-            journal_handler = JournalUploadHandler()
-            journal_handler.setDbPathOrUrl(db_path)
-            result = journal_handler.pushDataToDb(path)
-            return result
-        elif path.endswith('.json'):
-            category_handler = CategoryUploadHandler()
-            category_handler.setDbPathOrUrl(db_path)
-            result = category_handler.pushDataToDb(path)
-            return result
-        else:
-            print("Error: Unsupported file format: {path}")
-            return False
\ No newline at end of file
+        handler = self._handlerFor(path)
+        if handler is None:
+            print(f"Error: Unsupported file format: {path}")
+            return False
+        error = self._targetError(handler)
+        if error:
+            print(f"Error: {error}")
+            return False
+        return handler.pushDataToDb(path)
+
+    def pushDirectoryToDb(self, directory, pattern="*", workers=None, writers=4):
+        """
+        Upload all the files of `directory` matching `pattern` (e.g. "*.csv").
+        Files are parsed in parallel in a pool of `workers` processes; the parsed
+        data of each database goes to a single writer (SQLite and local graph files),
+        or to up to `writers` concurrent batches when the database is a SPARQL endpoint.
+        Files of unsupported formats are skipped. On a generic UploadHandler, files
+        whose format the database cannot hold (e.g. DOAJ CSV files on a SQLite
+        file) are not uploaded, and neither are files that fail to parse or write.
+        Returns a DataFrame with one row per file: file, records, parse_seconds,
+        write_seconds, records_per_second, uploaded (True/False) and error ("" if none).
+        """
+        columns = ["file", "records", "parse_seconds", "write_seconds", "records_per_second",
+                   "uploaded", "error"]
+        if not self.getDbPathOrUrl():
+            print("Error: No database path or URL provided. Please call setDbPathOrUrl() first.")
+            return pd.DataFrame(columns=columns)
+        handlers = {}
+        jobs = []
+        report = []
+
+        def failed(path, error, records=0, parse_seconds=0.0):
+            report.append({"file": path, "records": records, "parse_seconds": parse_seconds,
+                           "write_seconds": 0.0, "records_per_second": 0.0, "uploaded": False,
+                           "error": error})
+
+        for path in sorted(glob.glob(os.path.join(directory, pattern))):
+            handler = self._handlerFor(path, handlers)
+            if handler is None:
+                continue
+            error = self._targetError(handler)
+            if error:
+                failed(path, error)
+            else:
+                jobs.append((path, handler))
+
+        # one writer pool per handler (i.e. per database)
+        write_pools = {}
+        for _, handler in jobs:
+            if id(handler) not in write_pools:
+                size = writers if handler._supportsConcurrentWrites() else 1
+                write_pools[id(handler)] = ThreadPoolExecutor(max_workers=size)
+
+        def write(handler, data):
+            # concurrent writers must not share the graph built by the handler
+            writer = copy.copy(handler) if handler._supportsConcurrentWrites() else handler
+            start = time.perf_counter()
+            uploaded = writer._pushRecords(data)
+            return uploaded, time.perf_counter() - start
+
+        with ProcessPoolExecutor(max_workers=workers) as parsers:
+            parsing = {parsers.submit(_parseTimed, handler._readFile, path): (path, handler)
+                       for path, handler in jobs}
+            writing = []
+            for future in as_completed(parsing):
+                path, handler = parsing[future]
+                try:
+                    data, parse_seconds = future.result()
+                except Exception as e:
+                    failed(path, f"{type(e).__name__}: {e}")
+                    continue
+                writing.append((path, len(data), parse_seconds,
+                                write_pools[id(handler)].submit(write, handler, data)))
+            for path, records, parse_seconds, future in writing:
+                try:
+                    uploaded, write_seconds = future.result()
+                except Exception as e:
+                    failed(path, f"{type(e).__name__}: {e}", records, parse_seconds)
+                    continue
+                total = parse_seconds + write_seconds
+                report.append({
+                    "file": path,
+                    "records": records,
+                    "parse_seconds": parse_seconds,
+                    "write_seconds": write_seconds,
+                    "records_per_second": records / total if total else 0.0,
+                    "uploaded": bool(uploaded),
+                    "error": "",
+                })
+        for pool in write_pools.values():
+            pool.shutdown()
+        report.sort(key=lambda row: row["file"])
+        return pd.DataFrame(report, columns=columns)
@@ -0,0 +1,121 @@
+import json
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queryService import QueryService, buildEngine
+
+# Batch mode: runs a file of query specs against one FullQueryEngine and writes
+# the results as JSON Lines, e.g. for the nightly reports.
+#
+#   python batch.py specs.jsonl --graph journals.nt --relational my_journals.db > results.jsonl
+#   cat specs.jsonl | python batch.py - --graph http://127.0.0.1:9999/blazegraph/sparql --relational my_journals.db
+#
+# One spec per line, with the same format as the requests of server.py:
+#   {"method": "getJournalsWithTitle", "params": {"title": "science"}}
+#   {"method": "getJournalsWithLicense", "params": {"licenses": ["CC BY"]}, "id": "cc-by"}
+# Identical specs (same method and arguments, whatever the order of the keys and
+# of the list items) are run once. Every unique spec answers one line, in the
+# order of the file:
+#   {"lines": [1, 7], "id": ..., "method": ..., "params": ..., "result": ..., "seconds": ...}
+# or {"lines": [...], ..., "error": "..."}; "lines" are the line numbers of the spec
+# in the file. At most `workers` specs run at the same time, and a result is
+# written (and dropped) as soon as it is its turn, so the memory used does not
+# grow with the number of specs.
+
+
+def _canonical(value):
+    """Version of the params that does not depend on the order of keys and list items."""
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in sorted(value.items())}
+    if isinstance(value, list):
+        return sorted((_canonical(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True))
+    return value
+
+
+def readSpecs(lines):
+    """
+    Parse and deduplicate the specs: a list of (spec, line numbers) in the
+    order of their first line. Lines that are not valid specs are kept with
+    an "error" instead, so they are reported in the output.
+    """
+    unique = {}
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            spec = json.loads(line)
+        except ValueError as e:
+            unique[("invalid", number)] = ({"error": f"Invalid JSON: {e}"}, [number])
+            continue
+        if not isinstance(spec, dict):
+            unique[("invalid", number)] = ({"error": "A spec must be an object with method and params"}, [number])
+            continue
+        key = json.dumps([spec.get("method"), _canonical(spec.get("params") or {})], sort_keys=True)
+        if key in unique:
+            unique[key][1].append(number)
+        else:
+            unique[key] = (spec, [number])
+    return list(unique.values())
+
+
+def runBatch(service: QueryService, specs, out=sys.stdout, workers: int = 4) -> dict:
+    """
+    Run the (spec, line numbers) pairs of readSpecs with at most `workers`
+    threads and write one JSON line per spec to `out`, in order.
+    Returns counts of the specs that succeeded and failed.
+    """
+    counts = {"ok": 0, "error": 0}
+
+    def answer(spec):
+        if "error" in spec and "method" not in spec:
+            return dict(spec)
+        return service.request(spec)
+
+    def write(spec, lines, response):
+        record = {"lines": lines}
+        for k in ("id", "method", "params"):
+            if k in spec:
+                record[k] = spec[k]
+        record.update(response)
+        counts["error" if "error" in response else "ok"] += 1
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for spec, lines in specs:
+            # wait for the oldest spec before submitting more than `workers` of them
+            if len(pending) >= max(1, workers):
+                done_spec, done_lines, future = pending.popleft()
+                write(done_spec, done_lines, future.result())
+            pending.append((spec, lines, executor.submit(answer, spec)))
+        while pending:
+            done_spec, done_lines, future = pending.popleft()
+            write(done_spec, done_lines, future.result())
+    return counts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a JSON Lines file of FullQueryEngine queries")
+    parser.add_argument("specs", help="JSON Lines file of query specs, or - for stdin")
+    parser.add_argument("--graph", default="", help="SPARQL endpoint URL or local graph file of the journals")
+    parser.add_argument("--relational", default="", help="SQLite database of the categories and areas")
+    parser.add_argument("--search-index", default="", help="local search index of titles/publishers")
+    parser.add_argument("--sql-journals", action="store_true",
+                        help="--graph is the SQLite relational mirror of the journals")
+    parser.add_argument("--workers", type=int, default=4, help="specs run at the same time")
+    args = parser.parse_args()
+
+    if args.specs == "-":
+        specs = readSpecs(sys.stdin)
+    else:
+        with open(args.specs, encoding="utf-8") as f:
+            specs = readSpecs(f)
+    service = QueryService(buildEngine(args.graph, args.relational, args.search_index, args.sql_journals,
+                                       readOnly=True))
+    counts = runBatch(service, specs, sys.stdout, args.workers)
+    print(f"{counts['ok']} queries answered, {counts['error']} failed", file=sys.stderr)
+    sys.exit(1 if counts["error"] else 0)
@@ -0,0 +1,135 @@
+# Synthetic DOAJ CSV and Scimago JSON files of any size, for the benchmarks.
+#
+#   python benchmarks/generators.py --size 10000 --out data/synthetic/
+#
+# Both files are generated from the same pool of journals, so they overlap like
+# the real dumps: about 60% of the DOAJ journals are also in Scimago, and Scimago
+# also has journals that are not open access. Files are reproducible for a
+# given size and seed.
+
+import argparse
+import csv
+import json
+import os
+import random
+
+DOAJ_HEADER = ["Journal title", "Journal ISSN (print version)", "Journal EISSN (online version)",
+               "Languages in which the journal accepts manuscripts", "Publisher", "DOAJ Seal",
+               "Journal license", "APC"]
+
+TITLE_WORDS = ["Journal", "Science", "Review", "Studies", "Medicine", "History", "Applied", "International",
+               "Research", "Engineering", "Letters", "Annals", "Education", "Law", "Economics", "Physics",
+               "Linguistics", "Philosophy", "Chemistry", "Computing", "Social", "Environmental", "Revista",
+               "Advances", "Frontiers", "Archives", "Bulletin", "Quarterly", "Clinical", "Agricultural"]
+PUBLISHERS = ["Elsevier", "Springer", "MDPI", "Universidade Federal da Paraíba", "University of Huelva",
+              "Wiley", "Frontiers Media", "De Gruyter", "Hindawi", "Taylor & Francis", "SciELO",
+              "Universidad Nacional de La Plata", "Yaroslav Mudryi National Law University", "PAGEPress"]
+LANGUAGES = ["English", "Spanish", "Portuguese", "French", "German", "Italian", "Russian", "Ukrainian",
+             "Indonesian", "Turkish", "Polish", "Chinese"]
+# weights roughly follow the DOAJ license distribution
+LICENSES = [("CC BY", 55), ("CC BY-NC", 12), ("CC BY-NC-SA", 10), ("CC BY-NC-ND", 10), ("CC BY-SA", 5),
+            ("CC0", 2), ("Publisher's own license", 6)]
+# Scimago subject areas and some of their categories
+AREAS = {
+    "Medicine": ["Cardiology and Cardiovascular Medicine", "Oncology", "Pharmacology (medical)",
+                 "Medicine (miscellaneous)", "Public Health, Environmental and Occupational Health"],
+    "Computer Science": ["Artificial Intelligence", "Computer Networks and Communications", "Software",
+                         "Computer Science Applications", "Information Systems"],
+    "Social Sciences": ["Law", "Education", "Sociology and Political Science", "Linguistics and Language",
+                        "Cultural Studies"],
+    "Arts and Humanities": ["History", "Philosophy", "Literature and Literary Theory", "Music",
+                            "Arts and Humanities (miscellaneous)"],
+    "Engineering": ["Mechanical Engineering", "Civil and Structural Engineering", "Ocean Engineering",
+                    "Electrical and Electronic Engineering", "Safety, Risk, Reliability and Quality"],
+    "Agricultural and Biological Sciences": ["Agronomy and Crop Science", "Animal Science and Zoology",
+                                             "Food Science", "Plant Science", "Soil Science"],
+    "Business, Management and Accounting": ["Tourism, Leisure and Hospitality Management", "Marketing",
+                                            "Strategy and Management", "Accounting"],
+    "Physics and Astronomy": ["Astronomy and Astrophysics", "Condensed Matter Physics", "Nuclear and High Energy Physics"],
+}
+QUARTILES = ["Q1", "Q2", "Q3", "Q4"]
+
+
+def issn(number: int) -> str:
+    # a valid ISSN (with its check digit) for every number below 10^7
+    digits = f"{number % 10 ** 7:07d}"
+    total = sum(int(d) * w for d, w in zip(digits, range(8, 1, -1)))
+    check = (11 - total % 11) % 11
+    return digits[:4] + "-" + digits[4:] + ("X" if check == 10 else str(check))
+
+
+def journalPool(size: int, seed: int = 0) -> list:
+    """`size` journals with the fields of both dumps; `doaj`/`scimago` say in which dump each one is."""
+    rnd = random.Random(seed)
+    licenses, weights = zip(*LICENSES)
+    journals = []
+    for n in range(size):
+        has_print = rnd.random() < 0.6
+        area_names = rnd.sample(list(AREAS), k=rnd.choice([1, 1, 1, 2, 2, 3]))
+        categories = []
+        for area in area_names:
+            for category in rnd.sample(AREAS[area], k=rnd.randint(1, 2)):
+                categories.append({"id": category, "quartile": rnd.choice(QUARTILES)} if rnd.random() < 0.95
+                                  else {"id": category})
+        doaj = rnd.random() < 0.8
+        journals.append({
+            "title": " ".join(rnd.choices(TITLE_WORDS, k=rnd.randint(2, 6))) + f" {n}",
+            "issn": issn(2 * n) if has_print else "",
+            "eissn": issn(2 * n + 1) if not has_print or rnd.random() < 0.7 else "",
+            "languages": ", ".join(rnd.sample(LANGUAGES, k=rnd.choice([1, 1, 1, 2, 3]))),
+            "publisher": rnd.choice(PUBLISHERS),
+            "seal": "Yes" if rnd.random() < 0.1 else "No",
+            "license": rnd.choices(licenses, weights)[0],
+            "apc": "Yes" if rnd.random() < 0.35 else "No",
+            "categories": categories,
+            "areas": area_names,
+            "doaj": doaj,
+            "scimago": rnd.random() < (0.6 if doaj else 1.0),
+        })
+    return journals
+
+
+def writeDoajCsv(path: str, journals: list) -> int:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(DOAJ_HEADER)
+        rows = 0
+        for j in journals:
+            if j["doaj"]:
+                writer.writerow([j["title"], j["issn"], j["eissn"], j["languages"], j["publisher"],
+                                 j["seal"], j["license"], j["apc"]])
+                rows += 1
+    return rows
+
+
+def writeScimagoJson(path: str, journals: list) -> int:
+    records = [{
+        "identifiers": [i for i in (j["issn"], j["eissn"]) if i],
+        "categories": j["categories"],
+        "areas": j["areas"],
+    } for j in journals if j["scimago"]]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False)
+    return len(records)
+
+
+def generate(directory: str, size: int, seed: int = 0) -> tuple:
+    """Write doaj.csv and scimago.json for a pool of `size` journals into
+    `directory` and return their paths."""
+    os.makedirs(directory, exist_ok=True)
+    journals = journalPool(size, seed)
+    doaj = os.path.join(directory, "doaj.csv")
+    scimago = os.path.join(directory, "scimago.json")
+    writeDoajCsv(doaj, journals)
+    writeScimagoJson(scimago, journals)
+    return doaj, scimago
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic DOAJ and Scimago dumps")
+    parser.add_argument("--size", type=int, default=10000, help="number of journals of the pool")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="output directory")
+    args = parser.parse_args()
+    for path in generate(args.out, args.size, args.seed):
+        print("written", path)
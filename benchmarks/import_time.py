@@ -0,0 +1,89 @@
+# Import time of the project modules, measured with `python -X importtime` in fresh interpreters.
+#
+#   python benchmarks/import_time.py                  # report, and check the budgets
+#   python benchmarks/import_time.py --budget-ms 600  # stricter budget for the query side
+#
+# Every target is imported 5 times (best time kept) in a new process. The query
+# side (laura, impl with the engine only) must stay under the budget and must not
+# load the upload/backend stack; the script exits with status 1 otherwise, so it
+# can run as a check before merging.
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BACKEND_MODULES = ["rdflib", "SPARQLWrapper", "sqlalchemy"]
+PROJECT_MODULES = {"laura", "impl", "Yang", "li", "daniele", "baseHandler", "facetIndex", "searchIndex",
+                   "instrumentation", "snapshot"}
+
+# (statement, checked against the budget and the backend modules)
+TARGETS = [
+    ("import laura", True),
+    ("from impl import FullQueryEngine, JournalQueryHandler, CategoryQueryHandler", True),
+    ("import Yang", True),
+    ("import impl", True),
+    ("import li", False),
+    ("from impl import *", False),
+]
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(statement):
+    """Return (seconds, {package: seconds}, backend modules loaded) for one fresh import:
+    the total time, the cumulative time of every third-party/stdlib package imported
+    (at any depth) and the backend modules that ended up loaded."""
+    code = (statement + "\nimport sys\nprint(','.join(m for m in %r if m in sys.modules))" % BACKEND_MODULES)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    total = 0.0
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        cumulative, name = int(match.group(2)) / 1e6, match.group(4)
+        if len(match.group(3)) == 1:  # top-level import (not nested in another one)
+            total += cumulative
+        if "." not in name and name not in PROJECT_MODULES:
+            packages[name] = max(packages.get(name, 0.0), cumulative)
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return total, packages, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=1000.0,
+                        help="maximum import time of the query-side targets")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="heaviest packages shown per target")
+    args = parser.parse_args()
+
+    failures = []
+    for statement, checked in TARGETS:
+        runs = [measure(statement) for _ in range(args.repeat)]
+        seconds, modules, loaded = min(runs, key=lambda run: run[0])
+        slowest = sorted(modules.items(), key=lambda item: -item[1])[:args.top]
+        print(f"{statement:<80} {seconds * 1000:>8.1f} ms")
+        print("    " + ", ".join(f"{name} {s * 1000:.0f}ms" for name, s in slowest))
+        if loaded:
+            print("    backend modules loaded: " + ", ".join(loaded))
+        if checked and seconds * 1000 > args.budget_ms:
+            failures.append(f"{statement}: {seconds * 1000:.0f} ms > {args.budget_ms:.0f} ms")
+        if checked and loaded:
+            failures.append(f"{statement}: loads {', '.join(loaded)}")
+
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nall query-side imports within budget")
+
+
+if __name__ == "__main__":
+    main()
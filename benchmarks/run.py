@@ -0,0 +1,220 @@
+# Benchmark suite: uploads and every query engine method on synthetic data, local backends only.
+#
+#   python benchmarks/run.py                                  # 1k and 10k journals, all backends
+#   python benchmarks/run.py --sizes 1000,10000,100000,1000000 --backends sql --out results.json
+#   python benchmarks/run.py --compare old.json new.json      # relative change per operation
+#
+# Backends:
+#   graph        journals in a local N-Triples file (rdflib), categories in SQLite
+#   graph-edges  the same, plus the category/area edges of pushAssignmentsToDb
+#   sql          journals mirrored into the same SQLite file as the categories
+# The rdflib backends are slow to load above ~100k journals; use "sql" for the
+# large sizes. Results are written as JSON (one record per size, backend and
+# operation, with the best time of --repeat runs), to compare versions.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generators import generate, issn, AREAS
+
+BACKENDS = ["graph", "graph-edges", "sql"]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def rows(result):
+    if result is None:
+        return 0
+    if isinstance(result, bool):
+        return int(result)
+    try:
+        return len(result)
+    except TypeError:
+        return 1
+
+
+def upload(backend, doaj, scimago, directory):
+    from li import JournalUploadHandler
+    from daniele import CategoryUploadHandler
+
+    relational = os.path.join(directory, backend + ".db")
+    graph = os.path.join(directory, backend + ".nt")
+    journal_uploader = JournalUploadHandler()
+    if backend == "sql":
+        journal_uploader.setRelationalMirrorPath(relational)
+    else:
+        journal_uploader.setDbPathOrUrl(graph)
+    category_uploader = CategoryUploadHandler()
+    category_uploader.setDbPathOrUrl(relational)
+
+    timings = [
+        ("upload.journals", lambda: journal_uploader.pushDataToDb(doaj)),
+        ("upload.categories", lambda: category_uploader.pushDataToDb(scimago)),
+    ]
+    if backend == "graph-edges":
+        timings.append(("upload.assignments", lambda: journal_uploader.pushAssignmentsToDb(relational)))
+    results = []
+    for name, fn in timings:
+        start = time.perf_counter()
+        fn()
+        results.append((name, time.perf_counter() - start, 0))
+    return results, (relational if backend == "sql" else graph), relational
+
+
+def engineFor(backend, journal_db, relational):
+    from Yang import JournalQueryHandler, JournalSQLQueryHandler, CategoryQueryHandler
+    from laura import FullQueryEngine
+
+    journal_handler = JournalSQLQueryHandler() if backend == "sql" else JournalQueryHandler()
+    journal_handler.setDbPathOrUrl(journal_db)
+    category_handler = CategoryQueryHandler()
+    category_handler.setDbPathOrUrl(relational)
+    engine = FullQueryEngine()
+    engine.addJournalHandler(journal_handler)
+    engine.addCategoryHandler(category_handler)
+    return engine
+
+
+def operations(engine):
+    # every public method of the engines, with arguments that match part of the data
+    area = sorted(AREAS)[0]
+    category = AREAS[area][0]
+    return [
+        ("getAllJournals", lambda: engine.getAllJournals()),
+        ("getAllJournals first page", lambda: engine.getAllJournals(order_by="title", limit=10)),
+        ("getJournalsWithTitle", lambda: engine.getJournalsWithTitle("review")),
+        ("getJournalsPublishedBy", lambda: engine.getJournalsPublishedBy("univ")),
+        ("getJournalsWithLicense", lambda: engine.getJournalsWithLicense({"CC BY", "CC BY-SA"})),
+        ("getJournalsWithAPC", lambda: engine.getJournalsWithAPC()),
+        ("getJournalsWithDOAJSeal", lambda: engine.getJournalsWithDOAJSeal()),
+        ("getAllCategories", lambda: engine.getAllCategories()),
+        ("getCategoriesWithQuartile", lambda: engine.getCategoriesWithQuartile({"Q1"})),
+        ("getAllAreas", lambda: engine.getAllAreas()),
+        ("getEntityById", lambda: engine.getEntityById(category)),
+        ("getCategoriesAssignedToAreas", lambda: engine.getCategoriesAssignedToAreas({area})),
+        ("getAreasAssignedToCategories", lambda: engine.getAreasAssignedToCategories({category})),
+        ("getTopCategoriesInAreas", lambda: engine.getTopCategoriesInAreas({area}, limit=5)),
+        ("getJournalCountsByLicense", lambda: engine.getJournalCountsByLicense()),
+        ("getJournalCountsByPublisher", lambda: engine.getJournalCountsByPublisher(apc=False)),
+        ("getJournalCountsByArea", lambda: engine.getJournalCountsByArea(quartiles={"Q1"})),
+        ("getJournalCountsByQuartile", lambda: engine.getJournalCountsByQuartile()),
+        ("getJournalsInCategoriesWithQuartile",
+         lambda: engine.getJournalsInCategoriesWithQuartile({category}, {"Q1", "Q2"})),
+        ("getJournalsInAreasWithLicense", lambda: engine.getJournalsInAreasWithLicense({area}, {"CC BY"})),
+        ("getJournalsWithBestQuartile", lambda: engine.getJournalsWithBestQuartile({"Q1"}, {area})),
+        ("getDiamondJournalsInAreasAndCategoriesWithQuartile",
+         lambda: engine.getDiamondJournalsInAreasAndCategoriesWithQuartile({area}, {category}, {"Q1"})),
+        ("refreshFacetIndex", lambda: engine.refreshFacetIndex()),
+        ("getJournalsWithFacets",
+         lambda: engine.getJournalsWithFacets(areas={area}, quartiles={"Q1"}, licenses={"CC BY"}, apc=False)),
+        ("getFacetCounts", lambda: engine.getFacetCounts("area", apc=False)),
+        ("getSimilarJournals", lambda: engine.getSimilarJournals(issn(1), k=10)),
+    ]
+
+
+def gitRevision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run(sizes, backends, repeat, directory):
+    results = []
+    for size in sizes:
+        data_dir = os.path.join(directory, f"data-{size}")
+        start = time.perf_counter()
+        doaj, scimago = generate(data_dir, size)
+        print(f"[{size}] generated in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        for backend in backends:
+            db_dir = os.path.join(directory, f"db-{size}-{backend}")
+            os.makedirs(db_dir, exist_ok=True)
+            uploads, journal_db, relational = upload(backend, doaj, scimago, db_dir)
+            engine = engineFor(backend, journal_db, relational)
+            measured = [(name, seconds, n, None) for name, seconds, n in uploads]
+            for name, fn in operations(engine):
+                # a failing method is recorded, not fatal, so the other ones are still measured
+                try:
+                    seconds, result = timed(fn, repeat)
+                    measured.append((name, seconds, rows(result), None))
+                except Exception as e:
+                    measured.append((name, None, 0, repr(e)))
+            for name, seconds, n, error in measured:
+                record = {"size": size, "backend": backend, "operation": name,
+                          "seconds": round(seconds, 6) if seconds is not None else None, "rows": n}
+                if error:
+                    record["error"] = error
+                results.append(record)
+                shown = f"{seconds * 1000:>10.1f} ms" if seconds is not None else f"{'error':>13}"
+                print(f"[{size}] {backend:<12} {name:<52} {shown} {n:>8}", file=sys.stderr)
+    return results
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = {(r["size"], r["backend"], r["operation"]): r["seconds"] for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    print(f"{'size':>8} {'backend':<12} {'operation':<52} {'old ms':>10} {'new ms':>10} {'change':>8}")
+    for r in new:
+        before = old.get((r["size"], r["backend"], r["operation"]))
+        if before:
+            change = (r["seconds"] - before) / before * 100
+            print(f"{r['size']:>8} {r['backend']:<12} {r['operation']:<52} {before * 1000:>10.1f} "
+                  f"{r['seconds'] * 1000:>10.1f} {change:>+7.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the upload handlers and the query engines")
+    parser.add_argument("--sizes", default="1000,10000", help="comma separated numbers of journals")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma separated: " + ", ".join(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dir", default="", help="working directory (default: a temporary one)")
+    parser.add_argument("--out", default="", help="JSON results file (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    backends = [b for b in args.backends.split(",") if b]
+    for backend in backends:
+        if backend not in BACKENDS:
+            parser.error(f"unknown backend {backend}")
+    directory = args.dir or tempfile.mkdtemp(prefix="brigata-bench-")
+    report = {
+        "revision": gitRevision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": run(sizes, backends, args.repeat, directory),
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Latency of title/publisher search: local full-text index vs. a full scan.
+#
+#   python benchmarks/search_index.py                 # synthetic catalogue, in-process scan as baseline
+#   python benchmarks/search_index.py --endpoint http://127.0.0.1:9999/blazegraph/sparql
+#
+# With --endpoint the baseline is the real SPARQL FILTER CONTAINS scan of
+# JournalQueryHandler (the endpoint must already contain the journals).
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from searchIndex import JournalSearchIndex
+
+WORDS = ["Journal", "Science", "Review", "Studies", "Medicine", "History", "Applied", "International",
+         "Research", "Engineering", "Letters", "Annals", "Education", "Law", "Economics", "Physics",
+         "Linguistics", "Philosophy", "Chemistry", "Computing", "Social", "Environmental", "Revista"]
+PUBLISHERS = ["Elsevier", "Springer", "MDPI", "Universidade Federal", "University of Huelva",
+              "Wiley", "Frontiers Media", "De Gruyter", "Hindawi", "Taylor & Francis"]
+QUERIES = ["science", "rev", "international journal", "Elsevier", "univ", "zzz-no-match"]
+
+
+def synthetic_catalogue(n, seed=0):
+    rnd = random.Random(seed)
+    return pd.DataFrame({
+        "id": [f"journal_{i}" for i in range(n)],
+        "title": [" ".join(rnd.choices(WORDS, k=rnd.randint(2, 6))) for _ in range(n)],
+        "publisher": [rnd.choice(PUBLISHERS) for _ in range(n)],
+    })
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--endpoint", default="")
+    args = parser.parse_args()
+
+    catalogue = synthetic_catalogue(args.size)
+    index_path = os.path.join(tempfile.mkdtemp(), "search.db")
+    start = time.perf_counter()
+    index = JournalSearchIndex(index_path)
+    index.build(catalogue)
+    print(f"index build: {args.size} journals in {time.perf_counter() - start:.2f}s")
+
+    if args.endpoint:
+        from Yang import JournalQueryHandler
+        handler = JournalQueryHandler()
+        handler.setDbPathOrUrl(args.endpoint)
+        baseline_name = "sparql scan"
+        baseline = {"title": handler.getJournalsWithTitle, "publisher": handler.getJournalsPublishedBy}
+    else:
+        baseline_name = "pandas scan"
+        baseline = {
+            column: (lambda text, column=column:
+                     catalogue[catalogue[column].str.lower().str.contains(text.lower(), regex=False)])
+            for column in ("title", "publisher")
+        }
+
+    print(f"{'column':<10} {'query':<22} {'index ms':>10} {baseline_name + ' ms':>16} {'rows':>7}")
+    for column in ("title", "publisher"):
+        for text in QUERIES:
+            t_index, rows = timed(lambda: index.search(column, text), args.repeat)
+            t_scan, _ = timed(lambda: baseline[column](text), args.repeat)
+            print(f"{column:<10} {text:<22} {t_index * 1000:>10.2f} {t_scan * 1000:>16.2f} {rows:>7}")
+
+
+if __name__ == "__main__":
+    main()
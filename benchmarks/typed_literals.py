@@ -0,0 +1,111 @@
+# APC/seal/license queries: string literals + FILTER vs. typed literals/IRIs + triple patterns.
+#
+#   python benchmarks/typed_literals.py               # two synthetic in-process rdflib graphs
+#   python benchmarks/typed_literals.py --endpoint http://127.0.0.1:9999/blazegraph/sparql
+#
+# Without --endpoint the same synthetic catalogue is stored twice, once as the old
+# loader wrote it (every value a plain string) and once as it is written now
+# (xsd:boolean apc/seal, license IRIs), and each graph is queried the way it has
+# to be. With --endpoint only the queries change: the endpoint must already
+# contain journals uploaded by the current JournalUploadHandler.
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rdflib import Graph, URIRef, Literal
+from rdflib.namespace import RDF, RDFS, XSD
+from baseHandler import BASE_URL, vocabularyIri
+
+LICENSES = ["CC BY", "CC BY-SA", "CC BY-NC", "CC BY-NC-SA", "CC BY-NC-ND", "CC0"]
+
+PREFIXES = """
+PREFIX : <https://brigata.github.org/>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+"""
+
+FILTER_QUERIES = {
+    "apc=false": """SELECT ?journal WHERE { ?journal a :Journal .
+        OPTIONAL { ?journal :apc ?apc }
+        FILTER (!BOUND(?apc) || LCASE(STR(?apc)) IN ("none","no","false","0","")) }""",
+    "seal=true": """SELECT ?journal WHERE { ?journal a :Journal ; :seal ?seal .
+        FILTER ((?seal = true) || (LCASE(STR(?seal)) = "true")) }""",
+    "license=CC BY": """SELECT ?journal WHERE { ?journal a :Journal ; :license ?license .
+        FILTER (?license IN ("CC BY")) }""",
+    "apc=false & seal=true": """SELECT ?journal WHERE { ?journal a :Journal ; :seal ?seal .
+        OPTIONAL { ?journal :apc ?apc }
+        FILTER (!BOUND(?apc) || LCASE(STR(?apc)) IN ("none","no","false","0",""))
+        FILTER (LCASE(STR(?seal)) = "true") }""",
+}
+
+PATTERN_QUERIES = {
+    "apc=false": "SELECT ?journal WHERE { ?journal a :Journal ; :apc false }",
+    "seal=true": "SELECT ?journal WHERE { ?journal a :Journal ; :seal true }",
+    "license=CC BY": f"SELECT ?journal WHERE {{ ?journal a :Journal ; :license <{vocabularyIri('license', 'CC BY')}> }}",
+    "apc=false & seal=true": "SELECT ?journal WHERE { ?journal a :Journal ; :apc false ; :seal true }",
+}
+
+
+def synthetic_graphs(n, seed=0):
+    rnd = random.Random(seed)
+    old, new = Graph(), Graph()
+    journal_class = URIRef(BASE_URL + "Journal")
+    apc_p, seal_p, license_p = URIRef(BASE_URL + "apc"), URIRef(BASE_URL + "seal"), URIRef(BASE_URL + "license")
+    for license in LICENSES:
+        new.add((URIRef(vocabularyIri("license", license)), RDFS.label, Literal(license)))
+    for i in range(n):
+        subject = URIRef(BASE_URL + f"journal-{i}")
+        apc, seal, license = rnd.random() < 0.3, rnd.random() < 0.1, rnd.choice(LICENSES)
+        for g in (old, new):
+            g.add((subject, RDF.type, journal_class))
+        old.add((subject, apc_p, Literal("true" if apc else "false")))
+        old.add((subject, seal_p, Literal("true" if seal else "false")))
+        old.add((subject, license_p, Literal(license)))
+        new.add((subject, apc_p, Literal(apc, datatype=XSD.boolean)))
+        new.add((subject, seal_p, Literal(seal, datatype=XSD.boolean)))
+        new.add((subject, license_p, URIRef(vocabularyIri("license", license))))
+    return old, new
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--endpoint", default="")
+    args = parser.parse_args()
+
+    if args.endpoint:
+        from Yang import JournalQueryHandler
+        handler = JournalQueryHandler()
+        handler.setDbPathOrUrl(args.endpoint)
+        run_filter = run_pattern = lambda query: handler._select(PREFIXES + query)
+    else:
+        start = time.perf_counter()
+        old, new = synthetic_graphs(args.size)
+        print(f"graphs built: {args.size} journals in {time.perf_counter() - start:.2f}s")
+        run_filter = lambda query: list(old.query(PREFIXES + query))
+        run_pattern = lambda query: list(new.query(PREFIXES + query))
+
+    print(f"{'query':<24} {'filter ms':>11} {'pattern ms':>11} {'rows':>8}")
+    for name in FILTER_QUERIES:
+        t_filter, rows_filter = timed(lambda: run_filter(FILTER_QUERIES[name]), args.repeat)
+        t_pattern, rows = timed(lambda: run_pattern(PATTERN_QUERIES[name]), args.repeat)
+        mismatch = "" if args.endpoint or rows == rows_filter else f"  (filter: {rows_filter} rows)"
+        print(f"{name:<24} {t_filter * 1000:>11.1f} {t_pattern * 1000:>11.1f} {rows:>8}{mismatch}")
+
+
+if __name__ == "__main__":
+    main()
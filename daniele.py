@@ -1,16 +1,130 @@
 from pandas import *
-from json import load
+from json import load, dumps
+from hashlib import sha1
 from sqlite3 import connect
-from baseHandler import UploadHandler
+from baseHandler import UploadHandler, quartileRank
 
 #I created an image of the relational database and I uploaded on GitHub: yangish_database.png
 
+#reading the file is separated from writing it, so that UploadHandler.pushDirectoryToDb
+#can parse many files in parallel processes and write them one by one
+def readScimagoFile(path):
+    with open(path, mode="r", encoding="UTF-8") as f:
+        json_content = load(f)
+        #print('Number of journals in the dataset:', len(json_content))     #the json file contains len(json_content) journals
+    return json_content
+
+#each journal of a dump is recognized by its identifiers (ISSN/EISSN) and its content
+#is summarized by a hash: they are kept in the JournalManifest table, so that a new
+#dump can be compared with what is already in the database (see pushDeltaToDb)
+def journalKey(record):
+    return ','.join(sorted(i.strip().upper() for i in record['identifiers']))
+
+def journalHash(record):
+    content = {
+        'identifiers': sorted(i.strip().upper() for i in record['identifiers']),
+        'categories': sorted((c['id'], c.get('quartile', '')) for c in record['categories']),
+        'areas': sorted(record['areas']),
+    }
+    return sha1(dumps(content, ensure_ascii=False).encode('utf-8')).hexdigest()
+
 class CategoryUploadHandler(UploadHandler):
+    fileExtension = '.json'
+    _readFile = staticmethod(readScimagoFile)
+
+    def __init__(self):
+        super().__init__()
+        self.lastDelta = {}
+
     def pushDataToDb(self, path):
-        with open(path, mode="r", encoding="UTF-8") as f:
-            json_content = load(f)
-            #print('Number of journals in the dataset:', len(json_content))     #the json file contains len(json_content) journals
+        return self._pushRecords(readScimagoFile(path))
+
+    def getLastDelta(self):
+        # number of inserted/updated/deleted journals of the last pushDeltaToDb
+        return self.lastDelta
+
+    def pushDeltaToDb(self, path):
+        """
+        Apply a new full Scimago dump as a delta: journals that are not in the
+        database are inserted, journals whose content changed are replaced and
+        journals missing from the dump are deleted; unchanged journals are not touched.
+        """
+        json_content = readScimagoFile(path)
+        new = {}
+        for record in json_content:
+            new[journalKey(record)] = (journalHash(record), record)
+
+        with connect(self.dbPathOrUrl) as con:
+            self._createManifest(con)
+            self._fillManifest(con)
+            con.commit()
+            manifest = read_sql("SELECT journalKey, journalId, hash FROM JournalManifest", con)
+        old = {r['journalKey']: (r['hash'], r['journalId']) for r in manifest.to_dict('records')}
+
+        inserted = [key for key in new if key not in old]
+        updated = [key for key in new if key in old and old[key][0] != new[key][0]]
+        deleted = [key for key in old if key not in new]
+
+    #updated journals are deleted and uploaded again (with a new internal id)
+        removed = [(old[key][1],) for key in updated + deleted]
+        if removed:
+            with connect(self.dbPathOrUrl) as con:
+                for table, column in [('IdentifiableEntity', 'internalId'), ('HasCategory', 'journalId'),
+                                      ('HasArea', 'journalId'), ('Assignment', 'journalId'),
+                                      ('BestQuartile', 'journalId'), ('JournalManifest', 'journalId')]:
+                    if con.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone():
+                        con.executemany(f"DELETE FROM {table} WHERE {column} = ?", removed)
+                #areas and categories that no journal uses anymore
+                con.execute("""DELETE FROM IdentifiableEntity WHERE internalId LIKE 'category-%'
+                               AND internalId NOT IN (SELECT categoryId FROM HasCategory)""")
+                con.execute("""DELETE FROM IdentifiableEntity WHERE internalId LIKE 'area-%'
+                               AND internalId NOT IN (SELECT areaId FROM HasArea)""")
+                self._updateCooccurrences(con)
+                con.commit()
 
+        changed = [new[key][1] for key in inserted + updated]
+        if changed:
+            self._pushRecords(changed)
+
+        self.lastDelta = {'inserted': len(inserted), 'updated': len(updated), 'deleted': len(deleted)}
+        return True
+
+    def _createManifest(self, con):
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS JournalManifest (
+                journalKey TEXT PRIMARY KEY, journalId TEXT, hash TEXT
+            )""")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_manifest_journalId ON JournalManifest (journalId)")
+        #the deletes of pushDeltaToDb look journals up by internal id
+        for table in ['HasCategory', 'HasArea', 'Assignment']:
+            if con.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone():
+                con.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_journalId ON {table} (journalId)")
+
+    def _fillManifest(self, con):
+        #journals uploaded before the manifest existed have no entry: their records
+        #(identifiers, categories with quartile, areas) are rebuilt from the tables,
+        #so that the delta does not insert them a second time
+        if not con.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='IdentifiableEntity'").fetchone():
+            return
+        missing = """SELECT internalId FROM IdentifiableEntity WHERE internalId LIKE 'journal-%'
+                     AND internalId NOT IN (SELECT journalId FROM JournalManifest)"""
+        records = {}
+        for journalId, identifier in con.execute(f"SELECT internalId, id FROM IdentifiableEntity WHERE internalId IN ({missing})"):
+            records.setdefault(journalId, {'identifiers': [], 'categories': [], 'areas': []})['identifiers'].append(identifier)
+        if not records:
+            return
+        for journalId, category, quartile in con.execute(f"""
+                SELECT hc.journalId, c.id, COALESCE(c.quartile, '') FROM HasCategory hc
+                JOIN IdentifiableEntity c ON c.internalId = hc.categoryId WHERE hc.journalId IN ({missing})"""):
+            records[journalId]['categories'].append({'id': category, 'quartile': quartile})
+        for journalId, area in con.execute(f"""
+                SELECT ha.journalId, a.id FROM HasArea ha
+                JOIN IdentifiableEntity a ON a.internalId = ha.areaId WHERE ha.journalId IN ({missing})"""):
+            records[journalId]['areas'].append(area)
+        con.executemany("INSERT OR REPLACE INTO JournalManifest (journalKey, journalId, hash) VALUES (?, ?, ?)",
+                        [(journalKey(r), journalId, journalHash(r)) for journalId, r in records.items()])
+
+    def _pushRecords(self, json_content):
         # let's see if there are already tables in the database. In case, let's 
         # understand what are the last internal ids used, so we continue from them
         with connect(self.dbPathOrUrl) as con:
@@ -82,6 +196,9 @@ class CategoryUploadHandler(UploadHandler):
         category.insert(0, 'internalId', Series(category_internal_id, dtype="string"))
         category.insert(1, 'id', Series(category_id, dtype="string"))
         category.insert(2, 'quartile', Series(quartile, dtype="string"))
+        #the quartile as an integer (1 for Q1 ... 4 for Q4, NULL when missing): it can be
+        #indexed and compared, unlike UPPER(quartile)
+        category.insert(3, 'quartileRank', Series([quartileRank(q) for q in quartile], dtype="Int64"))
 
 
     #let's create the TABLES for the relational database operating on the dataframes
@@ -125,12 +242,103 @@ class CategoryUploadHandler(UploadHandler):
         has_area=merge(identifiable_entity, has_area, left_on="id", right_on="areaName")[['journalId',"internalId"]]
         has_area=has_area.rename(columns={"internalId":"areaId"})
 
+    #Now I materialize the assignments (journal x category x area) of the new journals,
+    #so that the query side does not have to recompute the five-table join every time
+
+        journal_ids=journal[['internalId','id']].rename(columns={'internalId':'journalId'})
+        categories=has_category.merge(category, left_on='categoryId', right_on='internalId')[['journalId','id','quartile','quartileRank']]
+        categories=categories.rename(columns={'id':'category_id'})
+        areas=has_area.merge(area, left_on='areaId', right_on='internalId')[['journalId','id']]
+        areas=areas.rename(columns={'id':'area_id'})
+        assignment=journal_ids.merge(categories, on='journalId').merge(areas, on='journalId')
+        assignment=assignment[['journalId','id','category_id','quartile','quartileRank','area_id']]
+
     #I upload the tables in the relational database:
 
         with connect(self.dbPathOrUrl) as con:  
+            self._addQuartileRanks(con)
             identifiable_entity.to_sql("IdentifiableEntity", con, if_exists="append", index=False)
+            con.execute("CREATE INDEX IF NOT EXISTS idx_entity_quartileRank ON IdentifiableEntity (quartileRank)")
             has_category.to_sql("HasCategory", con, if_exists="append", index=False)
             has_area.to_sql("HasArea", con, if_exists="append", index=False)
+            self._updateAssignments(con, assignment)
+            self._createManifest(con)
+            con.executemany("INSERT OR REPLACE INTO JournalManifest (journalKey, journalId, hash) VALUES (?, ?, ?)",
+                            [(journalKey(json_content[n]), f'journal-{n+last_journal}', journalHash(json_content[n]))
+                             for n in range(len(json_content))])
+            self._updateBestQuartiles(con)
+            self._updateCooccurrences(con)
             con.commit()            
 
-        return True
\ No newline at end of file
+        return True
+
+    def _updateAssignments(self, con, assignment):
+        # the table is created (and filled from the existing data, in case the
+        # database was built before it existed) the first time; after that only
+        # the rows of the newly uploaded journals are appended
+        exists=con.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='Assignment'").fetchone()
+        if exists:
+            assignment.to_sql("Assignment", con, if_exists="append", index=False)
+        else:
+            con.execute("""
+                CREATE TABLE Assignment (
+                    journalId TEXT, id TEXT, category_id TEXT, quartile TEXT, quartileRank INTEGER, area_id TEXT
+                )""")
+            con.execute("""
+                INSERT INTO Assignment (journalId, id, category_id, quartile, quartileRank, area_id)
+                SELECT hc.journalId, j.id, c.id, c.quartile, c.quartileRank, a.id
+                FROM HasCategory hc
+                JOIN IdentifiableEntity c ON c.internalId = hc.categoryId
+                JOIN IdentifiableEntity j ON j.internalId = hc.journalId
+                JOIN HasArea ha           ON ha.journalId  = hc.journalId
+                JOIN IdentifiableEntity a ON a.internalId  = ha.areaId""")
+        for column in ['id', 'category_id', 'quartile', 'area_id']:
+            con.execute(f"CREATE INDEX IF NOT EXISTS idx_assignment_{column} ON Assignment ({column})")
+
+    def _addQuartileRanks(self, con):
+        # databases built before the quartileRank column: it is added and filled
+        # from the quartile strings, once
+        for table in ['IdentifiableEntity', 'Assignment']:
+            if not con.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone():
+                continue
+            if 'quartileRank' in [r[1] for r in con.execute(f"PRAGMA table_info({table})")]:
+                continue
+            con.execute(f"ALTER TABLE {table} ADD COLUMN quartileRank INTEGER")
+            con.execute(f"""UPDATE {table} SET quartileRank = CAST(SUBSTR(UPPER(TRIM(quartile)), 2) AS INTEGER)
+                            WHERE UPPER(TRIM(quartile)) IN ('Q1', 'Q2', 'Q3', 'Q4')""")
+
+    def _updateBestQuartiles(self, con):
+        # BestQuartile: the best (lowest) quartile of each journal over all its
+        # categories, for "journals whose best quartile is Q1"; journals without
+        # a row (the new ones, or all of them the first time) are added
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS BestQuartile (
+                journalId TEXT PRIMARY KEY, quartileRank INTEGER, quartile TEXT
+            )""")
+        con.execute("""
+            INSERT INTO BestQuartile (journalId, quartileRank, quartile)
+            SELECT journalId, MIN(quartileRank), 'Q' || MIN(quartileRank)
+            FROM Assignment
+            WHERE quartileRank IS NOT NULL
+              AND journalId NOT IN (SELECT journalId FROM BestQuartile)
+            GROUP BY journalId""")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_bestquartile_quartileRank ON BestQuartile (quartileRank)")
+
+    def _updateCooccurrences(self, con):
+        # AreaCategoryCooccurrence: the sparse area x category matrix, one row per
+        # (area, category, quartile) that share journals, with their number. The
+        # query side answers getCategoriesAssignedToAreas/getAreasAssignedToCategories
+        # from it instead of joining through the journals; it is rebuilt from the
+        # Assignment table after every upload
+        if not con.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='Assignment'").fetchone():
+            return
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS AreaCategoryCooccurrence (
+                area_id TEXT, category_id TEXT, quartile TEXT, journals INTEGER
+            )""")
+        con.execute("DELETE FROM AreaCategoryCooccurrence")
+        con.execute("""
+            INSERT INTO AreaCategoryCooccurrence (area_id, category_id, quartile, journals)
+            SELECT area_id, category_id, quartile, COUNT(DISTINCT journalId)
+            FROM Assignment
+            GROUP BY area_id, category_id, quartile""")
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+# In-process facet index over the journals of both databases.
+# Every journal gets a dense integer number and, for every facet value
+# (an area, a category, a license, ...), the index keeps a bitmap whose bit n
+# is set when journal n has that value. Bitmaps are plain Python ints, so a
+# combination of filters is a handful of AND/OR operations done in C, and the
+# count of a facet value under a filter is a popcount.
+
+TRUE_VALUES = ["true", "yes", "1", "y", "t"]  # same as BasicQueryEngine._makeJournals
+
+
+class FacetIndex:
+    FACETS = ("area", "category", "quartile", "category_quartile", "license", "apc", "seal")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.keys = []          # journal number -> journal id
+        self.numbers = {}       # journal id -> journal number
+        self.postings = {facet: {} for facet in self.FACETS}  # facet -> value -> journal numbers
+        self.bitmaps = None     # facet -> value -> bitmap, built from the postings on first query
+        self.journals = []      # journal number -> row of the journal handler (or None)
+        return True
+
+    def _number(self, key) -> int:
+        n = self.numbers.get(key)
+        if n is None:
+            n = len(self.keys)
+            self.numbers[key] = n
+            self.keys.append(key)
+            self.journals.append(None)
+        return n
+
+    def add(self, key, facet: str, value) -> None:
+        self.postings[facet].setdefault(value, []).append(self._number(key))
+        self.bitmaps = None
+
+    def _toBitmap(self, numbers) -> int:
+        bits = np.zeros(len(self.keys), dtype=bool)
+        bits[numbers] = True
+        return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+    def _getBitmaps(self) -> dict:
+        if self.bitmaps is None:
+            self.bitmaps = {
+                facet: {value: self._toBitmap(numbers) for value, numbers in values.items()}
+                for facet, values in self.postings.items()
+            }
+        return self.bitmaps
+
+    # ---- Building ----
+
+    def addJournals(self, df: pd.DataFrame) -> None:
+        """Index a DataFrame returned by JournalQueryHandler.getAllJournals."""
+        for r in df.to_dict("records"):
+            n = self._number(r["id"])
+            self.journals[n] = r
+            if r.get("license"):
+                self.add(r["id"], "license", r["license"])
+            self.add(r["id"], "apc", str(r.get("apc", "")).lower() in TRUE_VALUES)
+            self.add(r["id"], "seal", str(r.get("seal", "")).lower() in TRUE_VALUES)
+
+    def _alias(self, keys) -> None:
+        # all the identifiers of one journal share the number of the first one already known
+        known = [self.numbers[k] for k in keys if k in self.numbers]
+        n = known[0] if known else self._number(keys[0])
+        for k in keys:
+            self.numbers.setdefault(k, n)
+
+    def addAssignments(self, df: pd.DataFrame) -> None:
+        """Index a DataFrame returned by CategoryQueryHandler.getAllAssignments."""
+        if "journalId" in df.columns:
+            for identifiers in df.groupby("journalId")["id"].unique():
+                self._alias(list(identifiers))
+        for r in df.to_dict("records"):
+            self.add(r["id"], "area", r["area_id"])
+            self.add(r["id"], "category", r["category_id"])
+            if r.get("quartile"):
+                self.add(r["id"], "quartile", r["quartile"])
+                self.add(r["id"], "category_quartile", (r["category_id"], r["quartile"]))
+
+    # ---- Querying ----
+
+    def all(self) -> int:
+        return (1 << len(self.keys)) - 1
+
+    def bitmap(self, facet: str, values) -> int:
+        """OR of the bitmaps of the given values of one facet. `values` is a
+        set/list of values or a single value (a tuple counts as a single value,
+        as used by the category_quartile facet)."""
+        if facet not in self.postings:
+            raise ValueError(f"Unknown facet: {facet}")
+        if not isinstance(values, (set, list, frozenset)):
+            values = [values]
+        bitmaps = self._getBitmaps()[facet]
+        result = 0
+        for value in values:
+            result |= bitmaps.get(value, 0)
+        return result
+
+    def match(self, **filters) -> int:
+        """AND across facets of the OR within each facet, e.g.
+        match(apc=False, quartile={"Q1"}, area={"Computer Science"}, license={"CC BY"}).
+        A filter set to None (or an empty set) does not restrict the result."""
+        result = self.all()
+        for facet, values in filters.items():
+            if values is None or isinstance(values, (set, list, frozenset)) and not values:
+                continue
+            result &= self.bitmap(facet, values)
+        return result
+
+    def members(self, bitmap: int) -> list:
+        """Journal numbers whose bit is set in `bitmap`."""
+        if not bitmap:
+            return []
+        raw = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(raw, bitorder="little")).tolist()
+
+    def ids(self, bitmap: int) -> list:
+        return [self.keys[n] for n in self.members(bitmap)]
+
+    def rows(self, bitmap: int) -> pd.DataFrame:
+        """Journal handler rows of the journals in `bitmap` (journals known only
+        from the relational side are skipped)."""
+        rows = [self.journals[n] for n in self.members(bitmap) if self.journals[n] is not None]
+        return pd.DataFrame(rows)
+
+    def count(self, bitmap: int) -> int:
+        return bin(bitmap).count("1")
+
+    def counts(self, facet: str, bitmap: int = None) -> pd.DataFrame:
+        """Number of journals per value of `facet`, restricted to `bitmap` if given."""
+        if facet not in self.postings:
+            raise ValueError(f"Unknown facet: {facet}")
+        within = self.all() if bitmap is None else bitmap
+        data = [{facet: value, "count": self.count(b & within)} for value, b in self._getBitmaps()[facet].items()]
+        data = [d for d in data if d["count"]]
+        if not data:
+            return pd.DataFrame(columns=[facet, "count"])
+        return pd.DataFrame(data).sort_values("count", ascending=False, ignore_index=True)
@@ -1,13 +1,37 @@
-from baseHandler import Handler, UploadHandler
-from daniele import CategoryUploadHandler
-from li import JournalUploadHandler
-from Yang import QueryHandler, JournalQueryHandler, CategoryQueryHandler
-from laura import IdentifiableEntity, Area, Category, Journal, BasicQueryEngine, FullQueryEngine
+import importlib
+
+# The public names of the project, each imported from its module on first use,
+# so that `from impl import FullQueryEngine` does not load the upload stack
+# (rdflib, SPARQLWrapper, SQLAlchemy) of the other classes.
+_MODULES = {
+    "Handler": "baseHandler", "UploadHandler": "baseHandler",
+    "CategoryUploadHandler": "daniele",
+    "JournalUploadHandler": "li",
+    "QueryHandler": "Yang", "JournalQueryHandler": "Yang", "CategoryQueryHandler": "Yang",
+    "JournalSQLQueryHandler": "Yang",
+    "IdentifiableEntity": "laura", "Area": "laura", "Category": "laura", "Journal": "laura",
+    "BasicQueryEngine": "laura", "FullQueryEngine": "laura",
+    "JournalResultSet": "laura", "CategoryResultSet": "laura", "AreaResultSet": "laura",
+    "exportSnapshot": "snapshot", "JournalSnapshotQueryHandler": "snapshot",
+    "CategorySnapshotQueryHandler": "snapshot",
+}
 
 __all__ = [
     "Handler", "UploadHandler", "JournalUploadHandler", "CategoryUploadHandler",
-    "QueryHandler", "JournalQueryHandler", "CategoryQueryHandler",
-    "IdentifiableEntity", "Area", "Category", "Journal", "BasicQueryEngine", "FullQueryEngine"
+    "QueryHandler", "JournalQueryHandler", "CategoryQueryHandler", "JournalSQLQueryHandler",
+    "IdentifiableEntity", "Area", "Category", "Journal", "BasicQueryEngine", "FullQueryEngine",
+    "JournalResultSet", "CategoryResultSet", "AreaResultSet",
+    "exportSnapshot", "JournalSnapshotQueryHandler", "CategorySnapshotQueryHandler"
     ]
 
 
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_MODULES[name]), name)
+    globals()[name] = value  # next accesses do not go through __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,186 @@
+import time
+import logging
+from contextvars import ContextVar
+from functools import wraps
+
+# Timing spans for the query engine and the query handlers.
+#
+# Code that wants to be measured opens a span:
+#
+#     with span("sparql", backend="endpoint") as s:
+#         ...
+#         s.set(rows=len(bindings), bytes=len(raw))
+#
+# Nothing is measured until a hook is installed with setInstrumentationHook, so
+# the default costs one global lookup per span. A hook is either a callable,
+# called with every finished Span, or an object with onStart(span)/onEnd(span)
+# methods (see LoggingHook and OpenTelemetryHook). Spans opened inside another
+# span have it as `parent`, e.g.
+#
+#     engine.FullQueryEngine.getJournalsInAreasWithLicense   (total time)
+#       handler.CategoryQueryHandler.getAllAssignments       rows
+#       handler.JournalQueryHandler.getJournalsByIds         rows, bytes
+#         sparql                                             rows, bytes received
+#                                                            (sql for JournalSQLQueryHandler)
+#       convert.makeJournals                                 rows
+#
+# and the time of a span not covered by its children is the DataFrame filtering
+# done by the engine itself.
+
+_hook = None
+_current = ContextVar("brigata_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, attributes: dict, parent=None):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.end = None
+        self.error = None
+
+    @property
+    def duration(self) -> float:
+        # seconds (up to now for a span still open)
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        if hasattr(_hook, "onStart"):
+            _hook.onStart(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        if exc is not None:
+            self.error = repr(exc)
+        _current.reset(self._token)
+        hook = _hook
+        if hook is not None:
+            hook.onEnd(self) if hasattr(hook, "onEnd") else hook(self)
+        return False
+
+
+class _NoopSpan:
+    # returned when no hook is installed
+    def set(self, **attributes):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """Context manager measuring the block it wraps (a no-op without a hook)."""
+    if _hook is None:
+        return _NOOP
+    return Span(name, attributes, _current.get())
+
+
+def isEnabled() -> bool:
+    # lets callers skip measurements that cost something (e.g. DataFrame sizes)
+    return _hook is not None
+
+
+def setInstrumentationHook(hook):
+    """Install `hook` (None removes it and goes back to the no-op default)."""
+    global _hook
+    _hook = hook
+    return True
+
+
+def getInstrumentationHook():
+    return _hook
+
+
+def traced(name: str):
+    """Decorator opening a span named `name` + the qualified method name
+    (e.g. engine.FullQueryEngine.getJournalsWithLicense) around each call."""
+    def decorator(function):
+        label = name + "." + function.__qualname__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if _hook is None:
+                return function(*args, **kwargs)
+            with span(label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def frameBytes(df) -> int:
+    # memory used by a DataFrame returned by a handler
+    return int(df.memory_usage(deep=True).sum())
+
+
+class LoggingHook:
+    """Writes one log line per finished span, indented by nesting depth."""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger("brigata.instrumentation")
+        self.level = level
+
+    def onEnd(self, span: Span):
+        depth = 0
+        parent = span.parent
+        while parent is not None:
+            depth += 1
+            parent = parent.parent
+        attributes = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+        error = f" error={span.error}" if span.error else ""
+        self.logger.log(self.level, "%s%s %.2fms %s%s", "  " * depth, span.name,
+                        span.duration * 1000, attributes, error)
+
+
+class RecordingHook:
+    """Keeps the finished spans in memory (list of dicts), e.g. for a notebook or a test."""
+
+    def __init__(self):
+        self.spans = []
+
+    def onEnd(self, span: Span):
+        self.spans.append({
+            "name": span.name,
+            "parent": span.parent.name if span.parent is not None else None,
+            "seconds": span.duration,
+            "error": span.error,
+            **span.attributes,
+        })
+
+    def clear(self):
+        self.spans = []
+
+
+class OpenTelemetryHook:
+    """Forwards the spans to OpenTelemetry (pip install opentelemetry-api), keeping
+    their nesting. `tracer` defaults to the global tracer provider's."""
+
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+        self.trace = trace
+        self.tracer = tracer or trace.get_tracer("brigata")
+
+    def onStart(self, span: Span):
+        parent = getattr(span.parent, "otelSpan", None)
+        context = self.trace.set_span_in_context(parent) if parent is not None else None
+        span.otelSpan = self.tracer.start_span(span.name, context=context)
+
+    def onEnd(self, span: Span):
+        otel = span.otelSpan
+        for key, value in span.attributes.items():
+            otel.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+        if span.error:
+            otel.set_status(self.trace.Status(self.trace.StatusCode.ERROR, span.error))
+        otel.end()
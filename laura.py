@@ -1,10 +1,26 @@
+import heapq
+from itertools import islice
 from typing import List, Set, Optional, Union
-from daniele import *
-from li import *
-from Yang import *
-from baseHandler import *
+from facetIndex import FacetIndex
+from similarityIndex import SimilarityIndex
+from instrumentation import span, traced, isEnabled, frameBytes
 import pandas as pd
 
+# The engines only talk to the handlers they are given, so this module does not
+# import the handler modules (and their rdflib/SPARQLWrapper/SQLAlchemy stack).
+# Names that used to come from them through `from laura import ...` are still
+# resolved, on first access.
+_HANDLER_MODULES = ["Yang", "li", "daniele", "baseHandler"]
+
+
+def __getattr__(name):
+    import importlib
+    for module_name in _HANDLER_MODULES:
+        module = importlib.import_module(module_name)
+        if hasattr(module, name) and not name.startswith("_"):
+            return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # ============================
 # DATA MODEL
@@ -92,6 +108,132 @@ class Journal(IdentifiableEntity):
         return self.hasArea
 
 
+TRUE_VALUES = ["true", "yes", "1", "y", "t"]
+
+
+def _journalFromRow(r) -> Journal:
+    """Journal object of one handler row (a dict or a DataFrame row)."""
+    identifiers = r["id"] if isinstance(r["id"], list) else [r["id"]]
+    return Journal(
+        id=identifiers,
+        title=r.get("title", ""),
+        languages=r.get("languages", []),
+        publisher=r.get("publisher"),
+        seal=str(r.get("seal", "")).lower() in TRUE_VALUES,
+        license=r.get("license"),
+        apc=str(r.get("apc", "")).lower() in TRUE_VALUES,
+        hasCategory=r.get("hasCategory", []),
+        hasArea=r.get("hasArea", []),
+    )
+
+
+# ============================
+# RESULT SETS
+# ============================
+
+
+class ResultSet:
+    """
+    Columnar result of an engine method (resultSet=True): the rows returned by
+    the handlers, kept in one DataFrame. Counting, slicing, filtering and
+    exporting work on the columns; Journal/Category/Area objects are only
+    built for the rows that are actually read (indexing or iterating).
+    """
+    COLUMNS: List[str] = []
+
+    def __init__(self, frame: Optional[pd.DataFrame] = None):
+        if frame is None:
+            frame = pd.DataFrame(columns=self.COLUMNS)
+        self.frame = frame.reset_index(drop=True)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __bool__(self) -> bool:
+        return len(self.frame) > 0
+
+    def __getitem__(self, key):
+        # an int gives one object, a slice a smaller result set
+        if isinstance(key, slice):
+            return type(self)(self.frame.iloc[key])
+        return self._entity(self.frame.iloc[key].to_dict())
+
+    def __iter__(self):
+        columns = list(self.frame.columns)
+        for values in zip(*(self.frame[c] for c in columns)):
+            yield self._entity(dict(zip(columns, values)))
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} of {len(self)} rows>"
+
+    def _entity(self, row: dict):
+        raise NotImplementedError
+
+    def getIds(self) -> List[str]:
+        return self.frame[self.COLUMNS[0]].tolist() if len(self.frame) else []
+
+    def filter(self, mask=None, **values) -> "ResultSet":
+        """
+        Rows matching `mask` (a boolean Series/list, or a function from the
+        DataFrame to one) and, for every keyword, whose column has that value
+        (or one of the values of a set/list), e.g.
+            journals.filter(license={"CC BY", "CC BY-SA"}, apc=False)
+            journals.filter(lambda df: df["title"].str.contains("Review"))
+        """
+        keep = pd.Series(True, index=self.frame.index)
+        if mask is not None:
+            keep &= pd.Series(list(mask(self.frame) if callable(mask) else mask), index=self.frame.index)
+        for column, value in values.items():
+            if column not in self.frame.columns:
+                raise ValueError(f"Unknown column: {column}")
+            if isinstance(value, (set, frozenset, list, tuple)):
+                keep &= self.frame[column].isin(value)
+            else:
+                keep &= self.frame[column] == value
+        return type(self)(self.frame[keep])
+
+    def toPandas(self) -> pd.DataFrame:
+        return self.frame.copy()
+
+    to_pandas = toPandas  # name used by pyarrow/polars
+
+    def toArrow(self):
+        """The rows as a pyarrow Table (pip install pyarrow)."""
+        import pyarrow
+        return pyarrow.Table.from_pandas(self.frame, preserve_index=False)
+
+    def toList(self) -> list:
+        return list(self)
+
+
+class JournalResultSet(ResultSet):
+    # the apc/seal columns are booleans, whatever the handler returned
+    COLUMNS = ["id", "title", "publisher", "license", "apc", "seal"]
+
+    def __init__(self, frame: Optional[pd.DataFrame] = None):
+        super().__init__(frame)
+        for column in ("apc", "seal"):
+            if column in self.frame.columns and self.frame[column].dtype != bool:
+                self.frame[column] = self.frame[column].astype(str).str.lower().isin(TRUE_VALUES)
+
+    def _entity(self, row: dict) -> Journal:
+        return _journalFromRow(row)
+
+
+class CategoryResultSet(ResultSet):
+    COLUMNS = ["category_id", "quartile"]
+
+    def _entity(self, row: dict) -> Category:
+        return Category(row["category_id"], row.get("quartile"))
+
+
+class AreaResultSet(ResultSet):
+    COLUMNS = ["area_id"]
+
+    def _entity(self, row: dict) -> Area:
+        return Area(row["area_id"])
+
+
 # ============================
 # BASIC QUERY ENGINE
 # ============================
@@ -127,110 +269,130 @@ class BasicQueryEngine:
 
     # ---- Journal queries ----
 
-    def getAllJournals(self) -> List[Journal]:
-        result: List[Journal] = []
-        for h in self.journalHandlers:
-            df = h.getAllJournals()
-            if not df.empty:
-                result.extend(self._makeJournals(df))
-        return result
-
-    def getJournalsWithTitle(self, title: str) -> List[Journal]:
-        result: List[Journal] = []
-        for h in self.journalHandlers:
-            df = h.getJournalsWithTitle(title)
-            if not df.empty:
-                result.extend(self._makeJournals(df))
-        return result
-
-    def getJournalsPublishedBy(self, publisher: str) -> List[Journal]:
-        result: List[Journal] = []
-        for h in self.journalHandlers:
-            df = h.getJournalsPublishedBy(publisher)
-            if not df.empty:
-                result.extend(self._makeJournals(df))
-        return result
-
-    def getJournalsWithLicense(self, licenses: Set[str]) -> List[Journal]:
-        result: List[Journal] = []
-        for h in self.journalHandlers:
-            df = h.getJournalsWithLicense(licenses)
-            if not df.empty:
-                result.extend(self._makeJournals(df))
-        return result
+    # The journal queries take optional order_by ("title", or "-title" for the
+    # descending order; "id", "title", "publisher" or "license" when the handler
+    # returns that column), limit and offset. They are pushed down to the handlers
+    # (ORDER BY/LIMIT in SPARQL and SQL) and the pages are merged (_pagedJournals),
+    # so the first page does not cost a scan of the whole catalogue.
+
+    @traced("engine")
+    def getAllJournals(self, resultSet: bool = False, order_by: str = None, limit: int = None,
+                       offset: int = 0) -> Union[List[Journal], JournalResultSet]:
+        return self._pagedJournals("getAllJournals", (), resultSet, order_by, limit, offset)
+
+    @traced("engine")
+    def getJournalsWithTitle(self, title: str, resultSet: bool = False, order_by: str = None,
+                             limit: int = None, offset: int = 0) -> Union[List[Journal], JournalResultSet]:
+        return self._pagedJournals("getJournalsWithTitle", (title,), resultSet, order_by, limit, offset)
+
+    @traced("engine")
+    def getJournalsPublishedBy(self, publisher: str, resultSet: bool = False, order_by: str = None,
+                               limit: int = None, offset: int = 0) -> Union[List[Journal], JournalResultSet]:
+        return self._pagedJournals("getJournalsPublishedBy", (publisher,), resultSet, order_by, limit, offset)
+
+    @traced("engine")
+    def getJournalsWithLicense(self, licenses: Set[str], resultSet: bool = False, order_by: str = None,
+                               limit: int = None, offset: int = 0) -> Union[List[Journal], JournalResultSet]:
+        return self._pagedJournals("getJournalsWithLicense", (licenses,), resultSet, order_by, limit, offset)
+
+    @traced("engine")
+    def getJournalsWithAPC(self, resultSet: bool = False, order_by: str = None, limit: int = None,
+                           offset: int = 0) -> Union[List[Journal], JournalResultSet]:
+        return self._pagedJournals("getJournalsWithAPC", (), resultSet, order_by, limit, offset)
+
+    @traced("engine")
+    def getJournalsWithDOAJSeal(self, resultSet: bool = False, order_by: str = None, limit: int = None,
+                                offset: int = 0) -> Union[List[Journal], JournalResultSet]:
+        return self._pagedJournals("getJournalsWithDOAJSeal", (), resultSet, order_by, limit, offset)
 
-    def getJournalsWithAPC(self) -> List[Journal]:
-        result: List[Journal] = []
-        for h in self.journalHandlers:
-            df = h.getJournalsWithAPC()
-            if not df.empty:
-                result.extend(self._makeJournals(df))
-        return result
+    # ---- Category and Area queries ----
 
-    def getJournalsWithDOAJSeal(self) -> List[Journal]:
-        result: List[Journal] = []
-        for h in self.journalHandlers:
-            df = h.getJournalsWithDOAJSeal()
-            if not df.empty:
-                result.extend(self._makeJournals(df))
-        return result
+    @traced("engine")
+    def getAllCategories(self, resultSet: bool = False) -> Union[List[Category], CategoryResultSet]:
+        frames = [self._query(h, "getAllCategories") for h in self.categoryHandlers]
+        return self._categories([df.drop_duplicates(subset=["category_id"]) for df in frames], resultSet)
 
-    # ---- Category and Area queries ----
+    @traced("engine")
+    def getCategoriesWithQuartile(self, quartiles: Set[str],
+                                  resultSet: bool = False) -> Union[List[Category], CategoryResultSet]:
+        # il DF può avere solo category_id oppure anche quartile
+        return self._categories([self._query(h, "getCategoriesWithQuartile", quartiles)
+                                 for h in self.categoryHandlers], resultSet)
 
-    def getAllCategories(self) -> List[Category]:
-        result: List[Category] = []
-        for h in self.categoryHandlers:
-            df = h.getAllCategories()
-            if not df.empty:
-                df = df.drop_duplicates(subset=["category_id"])
-                for _, r in df.iterrows():
-                    result.append(Category(r["category_id"], r.get("quartile")))
-        return result
+    @traced("engine")
+    def getAllAreas(self, resultSet: bool = False) -> Union[List[Area], AreaResultSet]:
+        frames = [self._query(h, "getAllAreas") for h in self.categoryHandlers]
+        return self._areas([df.drop_duplicates() for df in frames], resultSet)
 
-    def getCategoriesWithQuartile(self, quartiles: Set[str]) -> List[Category]:
-        result: List[Category] = []
-        for h in self.categoryHandlers:
-            df = h.getCategoriesWithQuartile(quartiles)
-            if not df.empty:
-                # il DF può avere solo category_id oppure anche quartile:
-                for _, r in df.iterrows():
-                    result.append(Category(r["category_id"], r.get("quartile")))
-        return result
+    # ---- Aggregations ----
 
-    def getAllAreas(self) -> List[Area]:
-        result: List[Area] = []
-        for h in self.categoryHandlers:
-            df = h.getAllAreas()
-            if not df.empty:
-                df = df.drop_duplicates(subset=["area_id"])
-                for _, r in df.iterrows():
-                    result.append(Area(r["area_id"]))
-        return result
+    @traced("engine")
+    def getJournalCounts(self, field: str, **filters) -> pd.DataFrame:
+        """
+        Number of journals per value of `field`, computed by the databases
+        (GROUP BY) instead of materializing Journal objects.
+        "license", "publisher", "apc" and "seal" are counted by the journal
+        handlers (filters: licenses, apc, seal); "area", "category" and
+        "quartile" by the category handlers (filters: category_ids, quartiles, area_ids).
+        Returns a DataFrame with columns [field, "count"].
+        """
+        handlers = self.journalHandlers if field in ("license", "publisher", "apc", "seal") else self.categoryHandlers
+        frames = [self._query(h, "getJournalCounts", field, **filters) for h in handlers]
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame(columns=[field, "count"])
+        df = pd.concat(frames).groupby(field, as_index=False)["count"].sum()
+        return df.sort_values(["count", field], ascending=[False, True], ignore_index=True)
+
+    @traced("engine")
+    def getTopCategoriesInAreas(self, area_ids: Set[str] = None, limit: int = 10) -> pd.DataFrame:
+        """
+        The `limit` categories with the most journals in each of the given areas
+        (every area when none is given), from the area x category co-occurrence
+        counts kept by the category database. Columns: area_id, category_id, journals.
+        """
+        frames = [self._query(h, "getAreaCategoryCounts", area_ids) for h in self.categoryHandlers]
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame(columns=["area_id", "category_id", "journals"])
+        df = pd.concat(frames).groupby(["area_id", "category_id"], as_index=False)["journals"].sum()
+        df = df.sort_values(["area_id", "journals", "category_id"], ascending=[True, False, True])
+        return df.groupby("area_id").head(limit).reset_index(drop=True)
+
+    @traced("engine")
+    def getJournalCountsByLicense(self, **filters) -> pd.DataFrame:
+        return self.getJournalCounts("license", **filters)
+
+    @traced("engine")
+    def getJournalCountsByPublisher(self, **filters) -> pd.DataFrame:
+        return self.getJournalCounts("publisher", **filters)
+
+    @traced("engine")
+    def getJournalCountsByArea(self, **filters) -> pd.DataFrame:
+        return self.getJournalCounts("area", **filters)
+
+    @traced("engine")
+    def getJournalCountsByQuartile(self, **filters) -> pd.DataFrame:
+        return self.getJournalCounts("quartile", **filters)
 
     # ---- “Base but richer” queries (come da UML) ----
 
+    @traced("engine")
     def getEntityById(self, id: str) -> Optional[Union[Journal, Category, Area]]:
         """
         Look up an entity by id across all handlers.
         Returns a Journal, Category, Area, or None.
         """
-        print("\n\nGetEntityById function STARTED!!!")
-        print("journalhandlers:", self.journalHandlers)
         # Search among Journals
         # for h in self.journalHandlers:
-        #     print("I am searching in the graph database...")
         #     df = h.getById(id)
-        #     print("This is the dataframe I get:", df)
         #     if not df.empty:
         #         # assume unique id → one row
         #         return self._makeJournals(df)[0]
 
         # Search among ategories and Areas
         for h in self.categoryHandlers:
-            print("I am searching in the relational database...") 
-            print("I am using this category query handler:", h)
-            df = h.getById(id)
-            print("\nThis is the dataframe Laura gets:\n", df)
+            df = self._query(h, "getById", id)
             if df.empty:
                 continue
 
@@ -241,67 +403,130 @@ class BasicQueryEngine:
             if "area_id" in df.columns:
                 row = df.iloc[0]
                 return Area(row["area_id"])
-            
-        print("I didn't get inside any for loop, so I will obviously return None")
         return None
 
-    def getCategoriesAssignedToAreas(self, areas: Set[str]) -> List[Category]:
+    @traced("engine")
+    def getCategoriesAssignedToAreas(self, areas: Set[str],
+                                     resultSet: bool = False) -> Union[List[Category], CategoryResultSet]:
         """
         Delegates to CategoryDataQueryHandler.getCategoriesAssignedToAreas
         and wraps the result into Category objects.
         """
-        result: List[Category] = []
-        for h in self.categoryHandlers:
-            df = h.getCategoriesAssignedToAreas(areas)
-            if not df.empty:
-                for _, r in df.iterrows():
-                    result.append(Category(r["category_id"], r.get("quartile")))
-        return result
+        return self._categories([self._query(h, "getCategoriesAssignedToAreas", areas)
+                                 for h in self.categoryHandlers], resultSet)
 
-    def getAreasAssignedToCategories(self, categories: Set[str]) -> List[Area]:
+    @traced("engine")
+    def getAreasAssignedToCategories(self, categories: Set[str],
+                                     resultSet: bool = False) -> Union[List[Area], AreaResultSet]:
         """
         Delegates to CategoryDataQueryHandler.getAreasAssignedToCategories
         and wraps the result into Area objects.
         """
-        result: List[Area] = []
-        for h in self.categoryHandlers:
-            df = h.getAreasAssignedToCategories(categories)
-            if not df.empty:
-                for _, r in df.iterrows():
-                    result.append(Area(r["area_id"]))
-        return result
+        return self._areas([self._query(h, "getAreasAssignedToCategories", categories)
+                            for h in self.categoryHandlers], resultSet)
 
     # ---- Helper ----
 
+    def _query(self, handler, method: str, *args, **kwargs) -> pd.DataFrame:
+        """Call `method` of a handler inside an instrumentation span (see instrumentation.py)."""
+        if not isEnabled():
+            return getattr(handler, method)(*args, **kwargs)
+        with span(f"handler.{type(handler).__name__}.{method}") as s:
+            df = getattr(handler, method)(*args, **kwargs)
+            s.set(rows=len(df), frame_bytes=frameBytes(df))
+        return df
+
+    def _pagedJournals(self, method: str, args: tuple, resultSet: bool = False, order_by: str = None,
+                       limit: int = None, offset: int = 0, **filters):
+        """
+        The journals of `method` of every journal handler, ordered and paged.
+        Each handler returns its first offset + limit rows in the order (ties by
+        id), and the sorted frames are merged with a k-way heap merge before the
+        page is cut, so at most offset + limit rows per handler are transferred.
+        A single handler pages its own order, e.g. the ranking of its search
+        index when no order_by is given; several handlers are merged by id then.
+        """
+        if order_by is None and limit is None and not offset:
+            return self._journals([self._query(h, method, *args, **filters) for h in self.journalHandlers],
+                                  resultSet)
+        if limit is not None and limit < 0 or offset < 0:
+            raise ValueError("limit and offset cannot be negative")
+        if len(self.journalHandlers) == 1:
+            frame = self._query(self.journalHandlers[0], method, *args, **filters, order_by=order_by, limit=limit,
+                                offset=offset)
+            return self._journals([frame], resultSet)
+        end = None if limit is None else offset + limit
+        frames = [self._query(h, method, *args, **filters, order_by=order_by or "id", limit=end)
+                  for h in self.journalHandlers]
+        field = (order_by or "id").lstrip("-")
+
+        def key(row):
+            value = row.get(field)
+            return ("" if pd.isna(value) else str(value), str(row["id"]))
+
+        with span("merge.journals", handlers=len(frames)):
+            rows = heapq.merge(*(df.to_dict("records") for df in frames if not df.empty),
+                               key=key, reverse=bool(order_by and order_by.startswith("-")))
+            page = list(islice(rows, offset, end))
+        return self._journals([pd.DataFrame(page)] if page else [], resultSet)
+
+    def _pageJournals(self, frames: List[pd.DataFrame], resultSet: bool = False, order_by: str = None,
+                      limit: int = None, offset: int = 0):
+        """
+        The journals of frames the engine already holds in full (client-side
+        joins, facet index), ordered and paged like _pagedJournals.
+        """
+        if order_by is None and limit is None and not offset:
+            return self._journals(frames, resultSet)
+        if limit is not None and limit < 0 or offset < 0:
+            raise ValueError("limit and offset cannot be negative")
+        field = (order_by or "id").lstrip("-")
+        if field not in ("id", "title", "publisher", "license"):
+            raise ValueError(f"Cannot order these journals by {field}")
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return self._journals([], resultSet)
+        df = pd.concat(frames, ignore_index=True)
+        # missing values sort as "", ties by id: the order of the handlers
+        df = df.sort_values(list(dict.fromkeys([field, "id"])), ascending=not (order_by or "").startswith("-"),
+                            key=lambda c: c.fillna("").astype(str), kind="stable")
+        return self._journals([df.iloc[offset:None if limit is None else offset + limit]], resultSet)
+
+    def _journals(self, frames: List[pd.DataFrame], resultSet: bool = False):
+        """The journals of the handler frames: a JournalResultSet, or Journal objects."""
+        frames = [df for df in frames if not df.empty]
+        if resultSet:
+            return JournalResultSet(pd.concat(frames, ignore_index=True) if frames else None)
+        result: List[Journal] = []
+        for df in frames:
+            result.extend(self._makeJournals(df))
+        return result
+
+    def _categories(self, frames: List[pd.DataFrame], resultSet: bool = False):
+        # some handler methods name the column "id" (getCategoriesAssignedToAreas)
+        frames = [df if "category_id" in df.columns else df.rename(columns={"id": "category_id"})
+                  for df in frames if not df.empty]
+        if resultSet:
+            return CategoryResultSet(pd.concat(frames, ignore_index=True) if frames else None)
+        return [Category(r["category_id"], r.get("quartile")) for df in frames for _, r in df.iterrows()]
+
+    def _areas(self, frames: List[pd.DataFrame], resultSet: bool = False):
+        # the handlers name the area column "id" (getAllAreas) or "area" (getAreasAssignedToCategories)
+        frames = [df if "area_id" in df.columns else df.rename(columns={"id": "area_id", "area": "area_id"})
+                  for df in frames if not df.empty]
+        if resultSet:
+            return AreaResultSet(pd.concat(frames, ignore_index=True) if frames else None)
+        return [Area(r["area_id"]) for df in frames for _, r in df.iterrows()]
+
     def _makeJournals(self, df: pd.DataFrame) -> List[Journal]:
         """Convert DataFrame rows into Journal objects."""
+        with span("convert.makeJournals", rows=len(df)):
+            return self._rowsToJournals(df)
+
+    def _rowsToJournals(self, df: pd.DataFrame) -> List[Journal]:
         if df.empty:
             return []
-
-        journals: List[Journal] = []
-        for _, r in df.iterrows():
-            identifiers = r["id"] if isinstance(r["id"], list) else [r["id"]]
-
-            seal_str = str(r.get("seal", "")).lower()
-            apc_str = str(r.get("apc", "")).lower()
-
-            seal = seal_str in ["true", "yes", "1", "y", "t"]
-            apc = apc_str in ["true", "yes", "1", "y", "t"]
-
-            journals.append(
-                Journal(
-                    id=identifiers,
-                    title=r.get("title", ""),
-                    languages=r.get("languages", []),
-                    publisher=r.get("publisher"),
-                    seal=seal,
-                    license=r.get("license"),
-                    apc=apc,
-                    hasCategory=r.get("hasCategory", []),
-                    hasArea=r.get("hasArea", []),
-                )
-            )
-        return journals
+        return [_journalFromRow(r) for _, r in df.iterrows()]
 
 
 # ============================
@@ -315,83 +540,251 @@ class FullQueryEngine(BasicQueryEngine):
     combining journals, categories and areas.
     """
 
+    def __init__(self):
+        super().__init__()
+        self.facetIndex = None
+        self.similarityIndex = None
+
+    # ---- Facet index ----
+
+    @traced("engine")
+    def refreshFacetIndex(self) -> bool:
+        """
+        (Re)build the in-process facet index from all the handlers.
+        Call it again after uploading new data.
+        """
+        index = FacetIndex()
+        for h in self.journalHandlers:
+            index.addJournals(self._query(h, "getAllJournals"))
+        for h in self.categoryHandlers:
+            index.addAssignments(self._query(h, "getAllAssignments"))
+        self.facetIndex = index
+        self.similarityIndex = None
+        return True
+
+    def _getFacetIndex(self) -> FacetIndex:
+        if self.facetIndex is None:
+            self.refreshFacetIndex()
+        return self.facetIndex
+
+    @traced("engine")
+    def getJournalsWithFacets(
+        self,
+        areas: Set[str] = None,
+        categories: Set[str] = None,
+        quartiles: Set[str] = None,
+        licenses: Set[str] = None,
+        apc: Optional[bool] = None,
+        seal: Optional[bool] = None,
+        resultSet: bool = False,
+        order_by: str = None,
+        limit: int = None,
+        offset: int = 0,
+    ) -> Union[List[Journal], JournalResultSet]:
+        """
+        Journals matching all the given facets (any of the values within a facet),
+        answered by the facet index, e.g. diamond Q1 journals in Computer Science
+        with a CC BY license:
+            getJournalsWithFacets(areas={"Computer Science"}, quartiles={"Q1"},
+                                  licenses={"CC BY"}, apc=False)
+        """
+        index = self._getFacetIndex()
+        bitmap = index.match(**self._facetFilters(area=areas, category=categories, quartile=quartiles,
+                                                  license=licenses, apc=apc, seal=seal))
+        return self._pageJournals([index.rows(bitmap)], resultSet, order_by, limit, offset)
+
+    def _getSimilarityIndex(self) -> SimilarityIndex:
+        index = self._getFacetIndex()
+        if self.similarityIndex is None or self.similarityIndex.facetIndex is not index:
+            with span("build.similarityIndex"):
+                self.similarityIndex = SimilarityIndex(index)
+        return self.similarityIndex
+
+    @traced("engine")
+    def getSimilarJournals(
+        self,
+        journal_id: str,
+        k: int = 10,
+        metric: str = "jaccard",
+        features: Set[str] = None,
+        resultSet: bool = False,
+        offset: int = 0,
+    ) -> Union[List[Journal], JournalResultSet]:
+        """
+        The k journals most similar to the journal with ISSN/EISSN `journal_id`,
+        most similar first: the ones sharing the most Scimago categories and areas,
+        and the same license and APC value. `metric` is "jaccard" or "cosine" (of
+        the feature sets); `features` restricts the comparison to some of
+        "category", "area", "license" and "apc". Answered by the facet index
+        (see refreshFacetIndex); with resultSet the rows have a "score" column.
+        `offset` skips the most similar ones: k journals from rank offset + 1.
+        """
+        if k < 0 or offset < 0:
+            raise ValueError("k and offset cannot be negative")
+        index = self._getSimilarityIndex()
+        df = index.similar(journal_id, offset + k, metric, tuple(features) if features else SimilarityIndex.FEATURES)
+        return self._journals([df.iloc[offset:]], resultSet)
+
+    @traced("engine")
+    def getFacetCounts(self, facet: str, **filters) -> pd.DataFrame:
+        """
+        Number of journals per value of `facet` ("area", "category", "quartile",
+        "license", "apc", "seal"), optionally restricted by the same filters
+        accepted by getJournalsWithFacets.
+        """
+        names = {"areas": "area", "categories": "category", "quartiles": "quartile",
+                 "licenses": "license", "apc": "apc", "seal": "seal"}
+        if facet not in FacetIndex.FACETS:
+            raise ValueError(f"Unknown facet: {facet} (one of {', '.join(FacetIndex.FACETS)})")
+        unknown = sorted(set(filters) - set(names))
+        if unknown:
+            raise ValueError(f"Unknown filters: {', '.join(unknown)} (any of {', '.join(names)})")
+        index = self._getFacetIndex()
+        bitmap = index.match(**self._facetFilters(**{names[k]: v for k, v in filters.items()}))
+        return index.counts(facet, bitmap)
+
+    def _facetFilters(self, **filters) -> dict:
+        # categories with quartiles mean a category *having* one of the quartiles
+        # (like getJournalsInCategoriesWithQuartile), not any category and any
+        # quartile of the journal: they are matched on the category_quartile facet
+        if filters.get("category") and filters.get("quartile"):
+            categories, quartiles = filters.pop("category"), filters.pop("quartile")
+            filters["category_quartile"] = {(c, q) for c in categories for q in quartiles}
+        return filters
+
+    def _graphHasAssignments(self) -> bool:
+        """
+        True when every journal handler holds the category/area edges
+        (JournalUploadHandler.pushAssignmentsToDb), so that the composite
+        queries can be answered by the graph alone, without a client-side join.
+        """
+        return bool(self.journalHandlers) and all(
+            getattr(h, "hasAssignments", lambda: False)() for h in self.journalHandlers)
+
+    # The composite queries take order_by/limit/offset like the journal queries:
+    # pushed down to the handlers when the graph holds the edges, otherwise the
+    # journals of the client-side join are paged by the engine (_pageJournals).
+
+    def _journalsByAssignment(self, resultSet: bool = False, order_by: str = None, limit: int = None,
+                              offset: int = 0, **filters):
+        return self._pagedJournals("getJournalsByAssignment", (), resultSet, order_by, limit, offset, **filters)
+
+    @traced("engine")
+    def getJournalsWithBestQuartile(
+        self,
+        quartiles: Set[str],
+        area_ids: Set[str] = None,
+        resultSet: bool = False,
+        order_by: str = None,
+        limit: int = None,
+        offset: int = 0,
+    ) -> Union[List[Journal], JournalResultSet]:
+        """
+        Journals whose best quartile over all their categories is one of the
+        given quartiles, e.g. {"Q1"}, optionally only those in the given areas.
+        """
+        all_ids: Set[str] = set()
+        for h in self.categoryHandlers:
+            df = self._query(h, "getJournalsWithBestQuartile", quartiles, area_ids)
+            all_ids.update(df["id"].dropna().tolist())
+
+        if not all_ids:
+            return self._journals([], resultSet)
+
+        frames = [self._query(h, "getJournalsByIds", all_ids) for h in self.journalHandlers]
+        return self._pageJournals(frames, resultSet, order_by, limit, offset)
+
+    @traced("engine")
     def getJournalsInCategoriesWithQuartile(
         self,
         category_ids: Set[str],
         quartiles: Set[str],
-    ) -> List[Journal]:
+        resultSet: bool = False,
+        order_by: str = None,
+        limit: int = None,
+        offset: int = 0,
+    ) -> Union[List[Journal], JournalResultSet]:
         """
         Journals that are assigned to (some of) the given categories
         and whose categories have one of the given quartiles.
         """
+        if self._graphHasAssignments():
+            return self._journalsByAssignment(resultSet, order_by, limit, offset,
+                                              category_ids=category_ids, quartiles=quartiles)
+
         all_ids: Set[str] = set()
 
         for h in self.categoryHandlers:
-            # This method must exist on CategoryDataQueryHandler
-            df = h.getAllAssignments()
+            # This method must exist on CategoryDataQueryHandler;
+            # the filters are applied by the handler on the materialized table
+            df = self._query(h, "getAllAssignments", category_ids=category_ids, quartiles=quartiles)
             if df.empty:
                 continue
 
-            if category_ids:
-                df = df[df["category_id"].isin(category_ids)]
-            if quartiles:
-                df = df[df["quartile"].isin(quartiles)]
-
             all_ids.update(df["id"].dropna().tolist())
 
         if not all_ids:
-            return []
-
-        result: List[Journal] = []
-        for h in self.journalHandlers:
-            df_journals = h.getAllJournals()
-            if df_journals.empty:
-                continue
+            return self._journals([], resultSet)
 
-            mask = df_journals["id"].isin(all_ids)
-            result.extend(self._makeJournals(df_journals[mask]))
-
-        return result
+        # only the matching journals are fetched (VALUES blocks / temporary table)
+        frames = [self._query(h, "getJournalsByIds", all_ids) for h in self.journalHandlers]
+        return self._pageJournals(frames, resultSet, order_by, limit, offset)
 
+    @traced("engine")
     def getJournalsInAreasWithLicense(
         self,
         areas: Set[str],
         licenses: Set[str],
-    ) -> List[Journal]:
+        resultSet: bool = False,
+        order_by: str = None,
+        limit: int = None,
+        offset: int = 0,
+    ) -> Union[List[Journal], JournalResultSet]:
         """
         Journals that are assigned to given areas and have
         one of the specified licenses.
         """
+        if areas and self._graphHasAssignments():
+            return self._journalsByAssignment(resultSet, order_by, limit, offset, area_ids=areas, licenses=licenses)
+
         all_ids: Set[str] = set()
 
         for h in self.categoryHandlers:
-            df = h.getAllAssignments()
-            if df.empty or not areas:
+            if not areas:
+                continue
+            df = self._query(h, "getAllAssignments", area_ids=areas)
+            if df.empty:
                 continue
 
-            df = df[df["area_id"].isin(areas)]
             all_ids.update(df["id"].dropna().tolist())
 
         if not all_ids:
-            return []
+            return self._journals([], resultSet)
 
-        result: List[Journal] = []
+        frames = []
         for h in self.journalHandlers:
-            df_journals = h.getJournalsWithLicense(licenses)
+            df_journals = self._query(h, "getJournalsByIds", all_ids)
             if df_journals.empty:
                 continue
 
-            mask = df_journals["id"].isin(all_ids)
-            result.extend(self._makeJournals(df_journals[mask]))
+            # the same rows as getJournalsWithLicense: any license when none is given
+            license = df_journals["license"].fillna("")
+            mask = license.isin(licenses) if licenses else license != ""
+            frames.append(df_journals[mask])
 
-        return result
+        return self._pageJournals(frames, resultSet, order_by, limit, offset)
 
+    @traced("engine")
     def getDiamondJournalsInAreasAndCategoriesWithQuartile(
         self,
         area_ids: Set[str],
         category_ids: Set[str],
         quartiles: Set[str],
-    ) -> List[Journal]:
+        resultSet: bool = False,
+        order_by: str = None,
+        limit: int = None,
+        offset: int = 0,
+    ) -> Union[List[Journal], JournalResultSet]:
         areas = area_ids
         categories = category_ids
         """
@@ -400,36 +793,30 @@ class FullQueryEngine(BasicQueryEngine):
         - in one of the given categories
         - whose categories have one of the given quartiles.
         """
+        if self._graphHasAssignments():
+            return self._journalsByAssignment(resultSet, order_by, limit, offset, category_ids=category_ids,
+                                              quartiles=quartiles, area_ids=areas, apc=False)
+
         all_ids: Set[str] = set()
 
         for h in self.categoryHandlers:
-            df = h.getAllAssignments()
+            df = self._query(h, "getAllAssignments", category_ids=category_ids, quartiles=quartiles, area_ids=areas)
             if df.empty:
                 continue
 
-            if areas:
-                df = df[df["area_id"].isin(areas)]
-            if category_ids:
-                df = df[df["category_id"].isin(category_ids)]
-            if quartiles:
-                df = df[df["quartile"].isin(quartiles)]
-
             all_ids.update(df["id"].dropna().tolist())
 
         if not all_ids:
-            return []
+            return self._journals([], resultSet)
 
-        result: List[Journal] = []
+        frames = []
         for h in self.journalHandlers:
-            df_journals = h.getAllJournals()
+            df_journals = self._query(h, "getJournalsByIds", all_ids)
             if df_journals.empty:
                 continue
 
-            mask_ids = df_journals["id"].isin(all_ids)
             apc_str = df_journals["apc"].astype(str).str.lower()
             mask_diamond = apc_str.isin(["no", "false", "0", "n"])
+            frames.append(df_journals[mask_diamond])
 
-            mask = mask_ids & mask_diamond
-            result.extend(self._makeJournals(df_journals[mask]))
-
-        return result
+        return self._pageJournals(frames, resultSet, order_by, limit, offset)
@@ -1,36 +1,265 @@
-from baseHandler import  UploadHandler 
-from rdflib import Graph, URIRef, Literal, Namespace
-from rdflib.namespace import RDF, XSD
+import os
+import re
+from urllib.parse import quote
+from hashlib import sha1
+from sqlite3 import connect
+from baseHandler import  UploadHandler, isEndpointUrl, vocabularyIri
+from searchIndex import JournalSearchIndex
 import pandas as pd
 
+#reading the CSV is separated from writing the graph, so that UploadHandler.pushDirectoryToDb
+#can parse many files in parallel processes
+def readDoajFile(path):
+    return pd.read_csv(path, sep=',', encoding='utf-8',
+                       keep_default_na=False,
+                       names=['title', 'issn', 'eissn', 
+                             #  'categories', 'areas',
+                              'languages', 'publisher', 'seal', 'license','apc'],
+                       header=0,
+                       dtype={
+                           "Journal title":str,
+                           "Journal ISSN (print version)":str,
+                           "Journal EISSN (online version)":str,
+                           "Languages in which the journal accepts manuscripts":str,
+                           "Publisher":str,
+                           "DOAJ Seal":bool,
+                           "Journal license":str,
+                           "APC":bool
+                           }) #Read the CSV file into a pandas DataFrame and change the columns' name
+
+#a journal of a dump is recognized by its ISSN/EISSN, and its content is summarized by a
+#hash stored in the graph (:contentHash), so that a new dump can be applied as a delta
+ID_COLUMNS = ['issn', 'eissn']
+CONTENT_COLUMNS = ['title', 'issn', 'eissn', 'languages', 'publisher', 'seal', 'license', 'apc']
+
+def journalKey(identifiers, fallback=''):
+    ids = sorted({str(i).strip().upper() for i in identifiers if str(i).strip()})
+    return ','.join(ids) if ids else fallback
+
+def journalHash(row):
+    return sha1('\x1f'.join(str(row[c]) for c in CONTENT_COLUMNS).encode('utf-8')).hexdigest()
+
+#the subject of a journal is derived from its ISSN (the print one if present, otherwise the
+#EISSN), so the same journal always gets the same URI whatever the order of the CSV rows,
+#and its local name is an identifier also used by the relational database.
+#Journals without any ISSN get a hash of title and publisher.
+def normalizeIssn(value):
+    issn = re.sub(r'[^0-9X]', '', str(value).strip().upper())
+    return issn[:4] + '-' + issn[4:] if len(issn) == 8 else str(value).strip().upper()
+
+def journalSubject(row):
+    for column in ID_COLUMNS:
+        if str(row[column]).strip():
+            return normalizeIssn(row[column])
+    content = str(row['title']).strip().lower() + '\x1f' + str(row['publisher']).strip().lower()
+    return 'journal-' + sha1(content.encode('utf-8')).hexdigest()[:16]
+
+#a Scimago category is a (name, quartile) pair, as in the relational database
+def categoryIri(name, quartile=''):
+    iri = vocabularyIri('category', name)
+    return iri + '/' + quote(str(quartile).strip(), safe='') if str(quartile).strip() else iri
+
+#rdflib is only needed to write a graph: it is imported by the methods that do it,
+#so that importing this module (or writing only the relational mirror) stays cheap
+
 #implements the method of the superclass to handle the specific scenario
 #JournalUploadHandler to handle CSV files in input and to store their data in a graph database
 class JournalUploadHandler(UploadHandler):
+    fileExtension = '.csv'
+    _readFile = staticmethod(readDoajFile)
+    batchSize = 50000  # triples per INSERT DATA request sent to an endpoint
+
     def __init__(self):
         super().__init__()
+        self.searchIndexPath = ''
+        self.relationalMirrorPath = ''
+        self.lastDelta = {}
+
+    # optional local full-text index of titles/publishers, built at upload time
+    def getSearchIndexPath(self):
+        return self.searchIndexPath
+
+    def setSearchIndexPath(self, path):
+        self.searchIndexPath = str(path)
+        return True
+
+    # optional SQLite copy of the journals (tables Journal, JournalIdentifier and
+    # JournalLanguage), queried by Yang.JournalSQLQueryHandler. It can be the same
+    # file as the relational database of CategoryUploadHandler; with a mirror,
+    # setDbPathOrUrl is optional (SQL-only deployments without a graph)
+    def getRelationalMirrorPath(self):
+        return self.relationalMirrorPath
+
+    def setRelationalMirrorPath(self, path):
+        self.relationalMirrorPath = str(path)
+        return True
+
+    def _supportsConcurrentWrites(self):
+        # a SPARQL endpoint can take several INSERT DATA batches at once (SQLite cannot)
+        return isEndpointUrl(self.getDbPathOrUrl()) and not self.getRelationalMirrorPath()
 
     def pushDataToDb(self, path):
+        return self._pushRecords(readDoajFile(path))
+
+    def getLastDelta(self):
+        # number of inserted/updated/deleted journals of the last pushDeltaToDb
+        return self.lastDelta
+
+    def pushDeltaToDb(self, path):
+        """
+        Apply a new full DOAJ dump as a delta: journals (recognized by ISSN/EISSN)
+        not yet in the graph are inserted, journals whose content hash changed are
+        replaced and journals missing from the dump are deleted; unchanged journals
+        are not touched.
+        """
+        if not self.getDbPathOrUrl() and not self.getRelationalMirrorPath():
+            print("Error: No database URL set. Call setDbPathOrUrl() first.")
+            return False
+        from Yang import JournalQueryHandler, JournalSQLQueryHandler
+        if self.getDbPathOrUrl():
+            reader = JournalQueryHandler()
+            reader.setDbPathOrUrl(self.getDbPathOrUrl())
+        else:
+            reader = JournalSQLQueryHandler()
+            reader.setDbPathOrUrl(self.getRelationalMirrorPath())
+        manifest = reader.getContentHashes()
+
+        old = {}
+        for subject, rows in manifest.groupby('id'):
+            # one hash per journal; several (a graph written before uploads replaced
+            # their journals) or none means unknown: the journal is rewritten
+            hashes = set(rows['hash']) - {''}
+            old[journalKey(rows['identifier'], subject)] = (hashes.pop() if len(hashes) == 1 else None, subject)
+
+        journal = readDoajFile(path)
+        keys = [journalKey([r['issn'], r['eissn']], journalSubject(r)) for _, r in journal.iterrows()]
+        hashes = [journalHash(r) for _, r in journal.iterrows()]
+        new = {key: n for n, key in enumerate(keys)}
+
+        inserted = [key for key in new if key not in old]
+        updated = [key for key in new if key in old and old[key][0] != hashes[new[key]]]
+        deleted = [key for key in old if key not in new]
+
+        # updated journals are replaced by _pushRecords, which keeps their
+        # category/area edges (_keptPredicates); only deleted journals lose them
+        self._deleteSubjects([old[key][1] for key in deleted])
+
+        changed = [new[key] for key in updated + inserted]
+        if changed:
+            self._pushRecords(journal.iloc[changed])
+
+        self.lastDelta = {'inserted': len(inserted), 'updated': len(updated), 'deleted': len(deleted)}
+        return True
+
+    def _deleteSubjects(self, subjects):
+        # remove every triple of the given journals (local names, e.g. 1983-9979)
+        if not subjects:
+            return
+        from rdflib import Graph, URIRef, Namespace
+        from rdflib.util import guess_format
+        base_url = Namespace("https://brigata.github.org/")
+        endpoint = self.getDbPathOrUrl()
+        if isEndpointUrl(endpoint):
+            from rdflib.plugins.stores.sparqlstore import SPARQLUpdateStore
+            store = SPARQLUpdateStore()
+            store.open((endpoint, endpoint))
+            for start in range(0, len(subjects), 500):
+                store.update(" ;\n".join("DELETE WHERE { <" + str(base_url[s]) + "> ?p ?o }"
+                                         for s in subjects[start:start + 500]))
+            store.close()
+        elif os.path.exists(endpoint):
+            file_format = guess_format(endpoint) or "nt"
+            stored = Graph()
+            stored.parse(endpoint, format=file_format)
+            for s in subjects:
+                stored.remove((URIRef(base_url[s]), None, None))
+            stored.serialize(destination=endpoint, format=file_format, encoding="utf-8")
+        if self.getSearchIndexPath():
+            JournalSearchIndex(self.getSearchIndexPath()).remove(subjects)
+        if self.getRelationalMirrorPath():
+            with connect(self.getRelationalMirrorPath()) as con:
+                self._createMirror(con)
+                for table in ['Journal', 'JournalIdentifier', 'JournalLanguage']:
+                    con.executemany(f"DELETE FROM {table} WHERE id = ?", [(s,) for s in subjects])
+                con.commit()
+
+    def pushAssignmentsToDb(self, relationalPath):
+        """
+        Copy the Scimago assignments of the relational database `relationalPath`
+        (built by CategoryUploadHandler) into the graph, as edges of the journals:
+            <journal> :hasCategory <category> .   <category> :categoryId "..." ; :quartile "Q1" .
+            <journal> :hasArea <area> .           <area> rdfs:label "..." .
+        Journals are matched on their ISSN/EISSN (:id). The edges already in the graph
+        are replaced, so call it again after uploading new data on either side.
+        """
+        endpoint = self.getDbPathOrUrl()
+        if not endpoint:
+            print("Error: No database URL set. Call setDbPathOrUrl() first.")
+            return False
+        from Yang import JournalQueryHandler, CategoryQueryHandler
+        journals = JournalQueryHandler()
+        journals.setDbPathOrUrl(endpoint)
+        subjects = {r['identifier'].strip().upper(): r['id'] for r in journals.getAllIdentifiers().to_dict('records')}
+        categories = CategoryQueryHandler()
+        categories.setDbPathOrUrl(relationalPath)
+        assignments = categories.getAllAssignments()
+
+        from rdflib import Graph, URIRef, Literal, Namespace
+        from rdflib.namespace import RDF, RDFS
+        base_url = Namespace("https://brigata.github.org/")
+        self.graph = Graph()
+        for r in assignments.to_dict('records'):
+            local_id = subjects.get(str(r['id']).strip().upper())
+            if local_id is None:
+                continue  # journal not in the graph
+            subject = URIRef(base_url[local_id])
+            quartile = r['quartile'] or ''
+            category = URIRef(categoryIri(r['category_id'], quartile))
+            area = URIRef(vocabularyIri('area', r['area_id']))
+            self.graph.add((subject, URIRef(base_url['hasCategory']), category))
+            self.graph.add((subject, URIRef(base_url['hasArea']), area))
+            self.graph.add((category, RDF.type, URIRef(base_url['Category'])))
+            self.graph.add((category, URIRef(base_url['categoryId']), Literal(r['category_id'])))
+            self.graph.add((category, URIRef(base_url['quartile']), Literal(quartile)))
+            self.graph.add((category, RDFS.label, Literal(r['category_id'])))
+            self.graph.add((area, RDF.type, URIRef(base_url['Area'])))
+            self.graph.add((area, RDFS.label, Literal(r['area_id'])))
+
+        self._deleteAssignments()
+        if isEndpointUrl(endpoint):
+            self._pushToEndpoint(endpoint)
+        else:
+            self._pushToLocalGraph(endpoint)
+        return True
+
+    def _deleteAssignments(self):
+        # remove the :hasCategory/:hasArea edges written by a previous pushAssignmentsToDb
+        from rdflib import Graph, URIRef, Namespace
+        from rdflib.util import guess_format
+        base_url = Namespace("https://brigata.github.org/")
+        endpoint = self.getDbPathOrUrl()
+        if isEndpointUrl(endpoint):
+            from rdflib.plugins.stores.sparqlstore import SPARQLUpdateStore
+            store = SPARQLUpdateStore()
+            store.open((endpoint, endpoint))
+            store.update("DELETE WHERE { ?journal <" + str(base_url['hasCategory']) + "> ?category } ;\n"
+                         "DELETE WHERE { ?journal <" + str(base_url['hasArea']) + "> ?area }")
+            store.close()
+        elif os.path.exists(endpoint):
+            file_format = guess_format(endpoint) or "nt"
+            stored = Graph()
+            stored.parse(endpoint, format=file_format)
+            stored.remove((None, URIRef(base_url['hasCategory']), None))
+            stored.remove((None, URIRef(base_url['hasArea']), None))
+            stored.serialize(destination=endpoint, format=file_format, encoding="utf-8")
+
+    def _pushRecords(self, journal):
+        from rdflib import Graph, URIRef, Literal, Namespace
+        from rdflib.namespace import RDF, RDFS, XSD
         base_url = Namespace("https://brigata.github.org/")  
         self.graph = Graph()  # Create a new RDF graph
         self.graph.bind("base_url", base_url)  # Bind the base URL to the graph
 
-        journal = pd.read_csv(path, sep=',', encoding='utf-8',
-                              keep_default_na=False,
-                              names=['title', 'issn', 'eissn', 
-                                    #  'categories', 'areas',
-                                     'languages', 'publisher', 'seal', 'license','apc'],
-                              header=0,
-                              dtype={
-                                  "Journal title":str,
-                                  "Journal ISSN (print version)":str,
-                                  "Journal EISSN (online version)":str,
-                                  "Languages in which the journal accepts manuscripts":str,
-                                  "Publisher":str,
-                                  "DOAJ Seal":bool,
-                                  "Journal license":str,
-                                  "APC":bool
-                                  }) #Read the CSV file into a pandas DataFrame and change the columns' name
-                            
         # print(journal)                       
         # subj wil be
         # id string [1..*]->Journal ISSN (print version),Journal EISSN (online version)
@@ -39,7 +268,7 @@ class JournalUploadHandler(UploadHandler):
         id_cols = ['issn','eissn']
         attribute_cols = ['title', 'languages', 'publisher', 'seal', 'license', 'apc']
         for idx, row in journal.iterrows():
-            local_id = "journal_" + str(idx)  # internalId??
+            local_id = journalSubject(row)  # stable: derived from the ISSN, not from the row number
             subject = URIRef(base_url[local_id]) # can automatically deal with the URL
             self.graph.add((subject, RDF.type, URIRef(base_url["Journal"]))) # add type
         # attributes will be:
@@ -51,76 +280,158 @@ class JournalUploadHandler(UploadHandler):
         # APC, apc : boolean [1]
             for column in attribute_cols:
                 attribute = str(row[column])
-                if attribute:
-                    predicate = URIRef(base_url[column])
-                    if column in ['seal', 'apc']:
-                        booleanvalue = attribute.lower() in ['true','yes']
-                        obj = Literal(booleanvalue, datatype=XSD.boolean)
-                        self.graph.add((subject, predicate, obj ))
-                    elif column == 'languages':
-                        languages = attribute.split(',')
-                        for language in languages:
-                            obje = Literal(language.strip())
-                            self.graph.add((subject, predicate, obje))
-                    else:
-                        objec = Literal(attribute)
-                        self.graph.add((subject, predicate, objec))
+                predicate = URIRef(base_url[column])
+                if column in ['seal', 'apc']:
+                    # always a typed boolean (an empty cell is false), so that queries
+                    # can use a plain triple pattern such as `?journal :apc false`
+                    booleanvalue = attribute.lower() in ['true','yes']
+                    obj = Literal(booleanvalue, datatype=XSD.boolean)
+                    self.graph.add((subject, predicate, obj ))
+                elif not attribute:
+                    continue
+                elif column in ['languages', 'license']:
+                    # controlled values are resources with a label
+                    values = attribute.split(',') if column == 'languages' else [attribute]
+                    for value in values:
+                        obje = URIRef(vocabularyIri({'languages': 'language', 'license': 'license'}[column], value))
+                        self.graph.add((subject, predicate, obje))
+                        self.graph.add((obje, RDFS.label, Literal(value.strip())))
+                else:
+                    objec = Literal(attribute)
+                    self.graph.add((subject, predicate, objec))
                     
             for column in id_cols:
                 id_value = str(row[column])
                 if id_value:
                     predicate = URIRef(base_url["id"])
                     self.graph.add((subject, predicate, Literal(id_value)))
-# do i need to add relations between Journal and Category\ Journal and Area?
-# Jounal - hasCategory -> Category (but Journal has Area?? what is area?)
+            # manifest entry used by pushDeltaToDb
+            self.graph.add((subject, URIRef(base_url["contentHash"]), Literal(journalHash(row))))
+# relations between Journal and Category / Journal and Area come from the relational
+# database: see pushAssignmentsToDb
         # return self.graph
 
         # Save the graph to a file or database - I don't know if it is necessary to do it
         # self.graph.serialize(destination="journal_data.rdf", format="xml")
 
         # store and populate a graph database
-        from rdflib.plugins.stores.sparqlstore import SPARQLUpdateStore
-
-        store = SPARQLUpdateStore()
         endpoint =self.getDbPathOrUrl()
         # endpoint = "http://127.0.0.1:9999/blazegraph/sparql"  # SPARQL endpoint URL
-        if not endpoint:
+        if not endpoint and not self.getRelationalMirrorPath():
             print("Error: No database URL set. Call setDbPathOrUrl() first.")
             return False
-        
+
+        # journals uploaded again replace their previous values, like in the mirror
+        subjects = set(self.graph.subjects(RDF.type, URIRef(base_url["Journal"])))
+        if not endpoint:
+            pass  # SQL-only: the journals go to the relational mirror only
+        elif isEndpointUrl(endpoint):
+            self._pushToEndpoint(endpoint, replace=subjects)
+        else:
+            self._pushToLocalGraph(endpoint, replace=subjects)
+
+        if self.getRelationalMirrorPath():
+            self._pushToMirror(journal)
+
+        # feed the search index with the same subjects used in the graph
+        if self.getSearchIndexPath():
+            indexed = journal[['title', 'publisher']].copy()
+            indexed.insert(0, 'id', [journalSubject(row) for _, row in journal.iterrows()])
+            JournalSearchIndex(self.getSearchIndexPath()).build(indexed)
+
+        return True
+
+    def _createMirror(self, con):
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS Journal (
+                id TEXT PRIMARY KEY, title TEXT, publisher TEXT, seal INTEGER,
+                license TEXT, apc INTEGER, contentHash TEXT
+            )""")
+        con.execute("CREATE TABLE IF NOT EXISTS JournalIdentifier (id TEXT, identifier TEXT)")
+        con.execute("CREATE TABLE IF NOT EXISTS JournalLanguage (id TEXT, language TEXT)")
+        for table, column in [('Journal', 'license'), ('Journal', 'apc'), ('Journal', 'seal'),
+                              ('Journal', 'publisher'), ('Journal', 'title'), ('JournalIdentifier', 'id'),
+                              ('JournalIdentifier', 'identifier'), ('JournalLanguage', 'id'),
+                              ('JournalLanguage', 'language')]:
+            con.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_{column} ON {table} ({column})")
+
+    def _pushToMirror(self, journal):
+        # the same journals as the graph, with the same ids (journalSubject); a journal
+        # uploaded again replaces its previous rows
+        journals = []
+        identifiers = []
+        languages = []
+        for _, row in journal.iterrows():
+            local_id = journalSubject(row)
+            journals.append((local_id, str(row['title']), str(row['publisher']),
+                             str(row['seal']).lower() in ['true', 'yes'], str(row['license']),
+                             str(row['apc']).lower() in ['true', 'yes'], journalHash(row)))
+            for column in ID_COLUMNS:
+                if str(row[column]).strip():
+                    identifiers.append((local_id, str(row[column]).strip().upper()))
+            for language in str(row['languages']).split(','):
+                if language.strip():
+                    languages.append((local_id, language.strip()))
+
+        with connect(self.getRelationalMirrorPath()) as con:
+            self._createMirror(con)
+            ids = [(j[0],) for j in journals]
+            con.executemany("DELETE FROM JournalIdentifier WHERE id = ?", ids)
+            con.executemany("DELETE FROM JournalLanguage WHERE id = ?", ids)
+            con.executemany("INSERT OR REPLACE INTO Journal VALUES (?, ?, ?, ?, ?, ?, ?)", journals)
+            con.executemany("INSERT INTO JournalIdentifier VALUES (?, ?)", identifiers)
+            con.executemany("INSERT INTO JournalLanguage VALUES (?, ?)", languages)
+            con.commit()
+
+    def _pushToEndpoint(self, endpoint, replace=()):
+        from rdflib.plugins.stores.sparqlstore import SPARQLUpdateStore
+
+        store = SPARQLUpdateStore()
         store.open((endpoint, endpoint))  # Open the SPARQL store
 
-        # instead of committing one by one (so slow), use SPARQL
-        insert_query = "INSERT DATA {\n"
-
-        for triple in self.graph.triples((None, None, None)):
-            subject = triple[0]
-            predicate = triple[1] 
-            object_value = triple[2]
-            
-
-            text_value = str(object_value)
-            
-            text_value = text_value.replace('\\', '\\\\')  # \
-            text_value = text_value.replace('"', '\\"')    # ""
-            text_value = text_value.replace('\n', '\\n')   # \n
-            text_value = text_value.replace('\r', '\\r')   # \r
-            
-            line = "<" + str(subject) + "> <" + str(predicate) + "> \"" + text_value + "\" .\n"
-            
-            insert_query = insert_query + line
-
-        # end the query
-        insert_query = insert_query + "}"
-
-        # store every triples once
-        if len(self.graph) > 0:
-            store.update(insert_query)
+        # remove the previous values of the `replace` subjects (see _keptPredicates)
+        subjects = sorted(replace)
+        kept = ", ".join(p.n3() for p in self._keptPredicates())
+        for start in range(0, len(subjects), 500):
+            values = " ".join(s.n3() for s in subjects[start:start + 500])
+            store.update("DELETE { ?s ?p ?o } WHERE { VALUES ?s { " + values + " } ?s ?p ?o "
+                         "FILTER (?p NOT IN (" + kept + ")) }")
+
+        # instead of committing one by one (so slow), use SPARQL;
+        # n3() keeps IRIs as IRIs and the datatype of the literals (e.g. xsd:boolean)
+        lines = [subject.n3() + " " + predicate.n3() + " " + object_value.n3() + " .\n"
+                 for subject, predicate, object_value in self.graph.triples((None, None, None))]
+
+        # store every triples once, in requests of at most batchSize triples
+        for start in range(0, len(lines), self.batchSize):
+            store.update("INSERT DATA {\n" + "".join(lines[start:start + self.batchSize]) + "}")
 
         # Close the store connection
         store.close()
 
-        return True
+    def _keptPredicates(self):
+        # the edges of pushAssignmentsToDb survive a new upload of their journal
+        from rdflib import URIRef, Namespace
+        base_url = Namespace("https://brigata.github.org/")
+        return [URIRef(base_url['hasCategory']), URIRef(base_url['hasArea'])]
+
+    def _pushToLocalGraph(self, path, replace=()):
+        # embedded store: the graph is kept in a local file (N-Triples unless the
+        # extension says otherwise) and JournalQueryHandler queries it in-process
+        from rdflib import Graph
+        from rdflib.util import guess_format
+        file_format = guess_format(path) or "nt"
+        stored = Graph()
+        if os.path.exists(path):
+            stored.parse(path, format=file_format)
+        # the `replace` subjects lose their previous values (title, hash, ...)
+        kept = set(self._keptPredicates())
+        for subject in replace:
+            for triple in list(stored.triples((subject, None, None))):
+                if triple[1] not in kept:
+                    stored.remove(triple)
+        stored += self.graph
+        stored.serialize(destination=path, format=file_format, encoding="utf-8")
 
 
 #11111test
@@ -44,15 +44,16 @@ def main():
     
     # query all journals
     print("1. get all journals (first 5):")
-    all_journals = engine.getAllJournals()
-    for i, journal in enumerate(all_journals[:5]):
+    # only the first page is fetched (ORDER BY/LIMIT in the databases), the total is a count
+    first_journals = engine.getAllJournals(order_by="title", limit=5)
+    for i, journal in enumerate(first_journals):
         print(f"   - {journal.getTitle()} (publisher: {journal.getPublisher()})")
-    print(f"   There are {len(all_journals)} journals in total")
+    print(f"   There are {engine.getJournalCounts('apc')['count'].sum()} journals in total")
     
     # query journals with title
     print("\n2. query journals with title 'Science' (first 3):")
-    science_journals = engine.getJournalsWithTitle("Science")
-    for journal in science_journals[:3]:
+    science_journals = engine.getJournalsWithTitle("Science", order_by="title", limit=3)
+    for journal in science_journals:
         print(f"   - {journal.getTitle()}")
     
     # query journals by publisher
@@ -138,14 +139,21 @@ def search_by_user_input():
         else:
             print("Invalid choice, please try again.")
 
+def run_query_server():
+    """Keep a warmed query engine in memory and answer queries over HTTP (see server.py)"""
+    from server import serve
+    serve(graph="http://127.0.0.1:9999/blazegraph/sparql", relational="my_journals.db", port=8765)
+
 if __name__ == "__main__":
     # choose the mode
-    mode = input("choose mode - 1: demonstration query, 2: interactive search: ").strip()
+    mode = input("choose mode - 1: demonstration query, 2: interactive search, 3: query server: ").strip()
     
     if mode == "1":
         main()
     elif mode == "2":
         search_by_user_input()
+    elif mode == "3":
+        run_query_server()
     else:
         print("running default demonstration...")
         main()
\ No newline at end of file
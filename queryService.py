@@ -0,0 +1,183 @@
+import inspect
+import time
+import typing
+from typing import Optional, Set
+import pandas as pd
+from laura import FullQueryEngine, Journal, Category, Area, ResultSet
+
+# Calling the query engine by method name, with JSON-compatible arguments and
+# results. Used by server.py (query daemon) and batch.py (batch mode): only the
+# read-only methods listed in METHODS can be called, lists in the arguments are
+# turned into the sets the engine expects, and Journal/Category/Area objects and
+# DataFrames are turned into plain dicts.
+
+METHODS = [
+    "getEntityById",
+    "getAllJournals", "getJournalsWithTitle", "getJournalsPublishedBy", "getJournalsWithLicense",
+    "getJournalsWithAPC", "getJournalsWithDOAJSeal",
+    "getAllCategories", "getCategoriesWithQuartile", "getAllAreas",
+    "getCategoriesAssignedToAreas", "getAreasAssignedToCategories", "getTopCategoriesInAreas",
+    "getJournalCounts", "getJournalCountsByLicense", "getJournalCountsByPublisher",
+    "getJournalCountsByArea", "getJournalCountsByQuartile",
+    "getJournalsInCategoriesWithQuartile", "getJournalsInAreasWithLicense", "getJournalsWithBestQuartile",
+    "getDiamondJournalsInAreasAndCategoriesWithQuartile",
+    "getJournalsWithFacets", "getFacetCounts", "getSimilarJournals",
+]
+
+
+# types of the keyword filters (**filters) of getJournalCounts, getJournalCountsBy*
+# and getFacetCounts, which have no annotation of their own
+FILTER_TYPES = {
+    "licenses": Set[str], "apc": Optional[bool], "seal": Optional[bool],
+    "category_ids": Set[str], "quartiles": Set[str], "area_ids": Set[str],
+    "areas": Set[str], "categories": Set[str],
+}
+
+
+def buildEngine(graph: str = "", relational: str = "", searchIndex: str = "",
+                sqlJournals: bool = False, readOnly: bool = False) -> FullQueryEngine:
+    """
+    A FullQueryEngine on one journal database and one category database.
+    `graph` is a SPARQL endpoint URL or local graph file (or, with sqlJournals,
+    a SQLite file with the relational mirror of the journals); `relational` is
+    the SQLite database of the categories. readOnly opens the category
+    database (and the SQL journals) in read-only mode, for servers.
+    """
+    from Yang import JournalQueryHandler, JournalSQLQueryHandler, CategoryQueryHandler
+
+    engine = FullQueryEngine()
+    if graph:
+        journal_handler = JournalSQLQueryHandler() if sqlJournals else JournalQueryHandler()
+        journal_handler.setDbPathOrUrl(graph)
+        if searchIndex:
+            journal_handler.setSearchIndexPath(searchIndex)
+        if sqlJournals and readOnly:
+            journal_handler.setReadOnly()
+        engine.addJournalHandler(journal_handler)
+    if relational:
+        category_handler = CategoryQueryHandler()
+        category_handler.setDbPathOrUrl(relational)
+        if readOnly:
+            category_handler.setReadOnly()
+        engine.addCategoryHandler(category_handler)
+    return engine
+
+
+def toJson(value):
+    """JSON-compatible version of what the engine returns."""
+    if isinstance(value, Journal):
+        return {
+            "id": value.getId(),
+            "identifiers": list(value.identifiers),
+            "title": value.getTitle(),
+            "languages": toJson(value.getLanguages()),
+            "publisher": value.getPublisher(),
+            "seal": value.hasSeal(),
+            "license": value.getLicense(),
+            "apc": value.hasAPC(),
+            "hasCategory": toJson(value.getHasCategory()),
+            "hasArea": toJson(value.getHasArea()),
+        }
+    if isinstance(value, Category):
+        return {"id": value.getId(), "quartile": value.getQuartile()}
+    if isinstance(value, Area):
+        return {"id": value.getId()}
+    if isinstance(value, ResultSet):  # resultSet=true: the columns, without building objects
+        return toJson(value.toPandas())
+    if isinstance(value, pd.DataFrame):
+        return [{k: toJson(v) for k, v in r.items()} for r in value.to_dict("records")]
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [toJson(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): toJson(v) for k, v in value.items()}
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    if isinstance(value, float) and value != value:  # NaN
+        return None
+    return value
+
+
+class QueryError(ValueError):
+    """A request that cannot be run (unknown method, wrong arguments)."""
+
+
+class QueryService:
+    def __init__(self, engine: FullQueryEngine):
+        self.engine = engine
+
+    def methods(self) -> list:
+        return list(METHODS)
+
+    def warm(self) -> bool:
+        """Open the connections and fill the caches before the first request:
+        the local graph file is parsed, the SQLite engines are created and the
+        facet and similarity indexes are built."""
+        self.engine.refreshFacetIndex()
+        self.engine._getSimilarityIndex()
+        return True
+
+    def call(self, method: str, params: dict = None):
+        """Run `method` with keyword arguments `params` and return its JSON-compatible result."""
+        if method not in METHODS:
+            raise QueryError(f"Unknown method: {method}")
+        if params is not None and not isinstance(params, dict):
+            raise QueryError("params must be an object")
+        kwargs = {k: set(v) if isinstance(v, list) else v for k, v in (params or {}).items()}
+        function = getattr(self.engine, method)
+        signature = inspect.signature(function)
+        try:
+            signature.bind(**kwargs)
+        except TypeError as e:
+            raise QueryError(f"Wrong arguments for {method}: {e}")
+        for name, value in kwargs.items():
+            parameter = signature.parameters.get(name)
+            if parameter is not None:
+                kwargs[name] = self._coerce(name, value, parameter.annotation)
+            elif name in FILTER_TYPES:
+                kwargs[name] = self._coerce(name, value, FILTER_TYPES[name])
+        return toJson(function(**kwargs))
+
+    def _coerce(self, name: str, value, annotation):
+        # the parameters of GET requests are strings: "5" for limit, "false" for
+        # apc, "CC BY" for licenses (a repeated parameter gives a list)
+        if value is None:
+            return None
+        if typing.get_origin(annotation) is typing.Union:  # Optional[bool]
+            types = [a for a in typing.get_args(annotation) if a is not type(None)]
+            annotation = types[0] if len(types) == 1 else annotation
+        if annotation is int and not isinstance(value, bool):
+            if isinstance(value, int):
+                return value
+            try:
+                return int(str(value).strip())
+            except ValueError:
+                raise QueryError(f"{name} must be an integer, not {value!r}")
+        if annotation is bool and not isinstance(value, bool):
+            if isinstance(value, str) and value.strip().lower() in ("true", "yes", "1"):
+                return True
+            if isinstance(value, str) and value.strip().lower() in ("false", "no", "0", ""):
+                return False
+            raise QueryError(f"{name} must be true or false, not {value!r}")
+        origin = typing.get_origin(annotation) or annotation
+        if origin in (set, list):
+            # a single value is a set of one value (names may contain commas)
+            if isinstance(value, (str, int, float)):
+                value = [value]
+            elif not isinstance(value, (set, frozenset, list, tuple)):
+                raise QueryError(f"{name} must be a list, not {value!r}")
+            return set(value) if origin is set else list(value)
+        return value
+
+    def request(self, request: dict) -> dict:
+        """Answer one request {"method": ..., "params": {...}} with
+        {"result": ..., "seconds": ...} or {"error": ...}."""
+        start = time.perf_counter()
+        try:
+            if not isinstance(request, dict):
+                raise QueryError("A request must be an object with method and params")
+            result = self.call(request.get("method"), request.get("params"))
+            return {"result": result, "seconds": round(time.perf_counter() - start, 6)}
+        except QueryError as e:
+            return {"error": str(e)}
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
@@ -0,0 +1,101 @@
+import sqlite3
+import pandas as pd
+
+# Local full-text index over journal titles and publishers.
+# It is a SQLite FTS5 table using the trigram tokenizer, so every substring of
+# three or more characters is answered by the index (same semantics as the
+# SPARQL FILTER CONTAINS(LCASE(...)) scan, but without touching Blazegraph).
+# The index is (re)built by JournalUploadHandler at upload time and read by
+# JournalQueryHandler when a search index path is set on it.
+
+
+class JournalSearchIndex:
+    def __init__(self, path: str):
+        self.path = path
+
+    def _connect(self, create: bool = False):
+        con = sqlite3.connect(self.path, timeout=30)  # uploads may write concurrently
+        if create:
+            # only the writers create the table, searches just read it
+            con.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS JournalSearch
+                USING fts5(id UNINDEXED, title, publisher, tokenize='trigram')
+            """)
+        return con
+
+    def _exists(self, con) -> bool:
+        return con.execute("SELECT 1 FROM sqlite_master WHERE name = 'JournalSearch'").fetchone() is not None
+
+    def build(self, journals: pd.DataFrame) -> bool:
+        """Add the journals (columns id, title, publisher) to the index.
+        Journals already indexed with the same id are replaced."""
+        rows = [
+            (str(r["id"]), str(r.get("title", "") or ""), str(r.get("publisher", "") or ""))
+            for _, r in journals.iterrows()
+        ]
+        with self._connect(create=True) as con:
+            con.executemany("DELETE FROM JournalSearch WHERE id = ?", [(r[0],) for r in rows])
+            con.executemany("INSERT INTO JournalSearch (id, title, publisher) VALUES (?, ?, ?)", rows)
+            con.commit()
+        con.close()
+        return True
+
+    def remove(self, ids) -> bool:
+        with self._connect(create=True) as con:
+            con.executemany("DELETE FROM JournalSearch WHERE id = ?", [(str(i),) for i in ids])
+            con.commit()
+        con.close()
+        return True
+
+    def clear(self) -> bool:
+        with self._connect(create=True) as con:
+            con.execute("DELETE FROM JournalSearch")
+            con.commit()
+        con.close()
+        return True
+
+    def search(self, column: str, text: str, limit: int = None, offset: int = 0,
+               order: tuple = None) -> pd.DataFrame:
+        """Return the journals whose `column` (title or publisher) contains `text`,
+        case-insensitively. Results are ranked: values starting with `text`
+        come first, then by bm25 relevance. `order` = (field, descending) sorts
+        them by id, title or publisher instead (ties by id); limit and offset
+        cut the page in SQLite."""
+        if column not in ("title", "publisher"):
+            raise ValueError("column must be 'title' or 'publisher'")
+        if order is not None and order[0] not in ("id", "title", "publisher"):
+            raise ValueError(f"Cannot order the search results by {order[0]}")
+        text = (text or "").strip()
+        # % and _ are searched as characters, like in the SPARQL CONTAINS filter
+        escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params = {"prefix": escaped + "%"}
+        if len(text) >= 3:
+            # phrase query restricted to the column: quotes inside are doubled
+            params["match"] = f'{column} : "' + text.replace('"', '""') + '"'
+            where = "JournalSearch MATCH :match"
+            rank = "bm25(JournalSearch), "
+        else:
+            # the trigram tokenizer cannot match fewer than 3 characters,
+            # fall back to a LIKE scan of the (local) index table
+            params["like"] = "%" + escaped + "%"
+            where = f"{column} LIKE :like ESCAPE '\\'"
+            rank = ""
+        if order is None:
+            ranking = f"({column} LIKE :prefix ESCAPE '\\') DESC, {rank}title"
+        else:
+            field, descending = order
+            ranking = ", ".join(f"{f} DESC" if descending else f for f in dict.fromkeys([field, "id"]))
+        query = f"""
+        SELECT id, title, publisher
+        FROM JournalSearch
+        WHERE {where}
+        ORDER BY {ranking}
+        """
+        if limit is not None or offset:
+            query += " LIMIT :limit OFFSET :offset"
+            params["limit"] = -1 if limit is None else int(limit)
+            params["offset"] = int(offset)
+        with self._connect() as con:
+            df = pd.read_sql(query, con, params=params) if self._exists(con) else pd.DataFrame()
+        con.close()
+        return df if not df.empty else pd.DataFrame(columns=["id", "title", "publisher"])
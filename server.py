@@ -0,0 +1,157 @@
+import json
+import os
+import socketserver
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from queryService import QueryService, QueryError, buildEngine
+
+# Query daemon: keeps one warmed FullQueryEngine (open connections, parsed local
+# graph, facet index) in memory and answers queries over HTTP, on a local port or
+# on a Unix socket, with JSON responses.
+#
+#   python server.py --graph journals.nt --relational my_journals.db --port 8765
+#   python server.py --graph http://127.0.0.1:9999/blazegraph/sparql --relational my_journals.db --socket /tmp/brigata.sock
+#
+#   GET  /health                          -> {"status": "ok"}
+#   GET  /methods                         -> the methods that can be called
+#   POST /query   {"method": "getJournalsWithLicense", "params": {"licenses": ["CC BY"]}}
+#   GET  /query/getJournalsWithTitle?title=science
+#   GET  /query/getJournalsWithFacets?licenses=CC BY&licenses=CC0&apc=false&limit=10
+#
+# A query answers {"result": ..., "seconds": ...}; errors answer {"error": ...}
+# with status 400 (bad request) or 500.
+#
+#   curl -s localhost:8765/query -d '{"method": "getJournalCountsByLicense"}'
+#   curl -s --unix-socket /tmp/brigata.sock http://localhost/query/getJournalsPublishedBy?publisher=MDPI
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    service = None  # set by makeServer
+    quiet = False
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _answer(self, method, params):
+        start = time.perf_counter()
+        try:
+            result = self.service.call(method, params)
+        except (QueryError, ValueError) as e:
+            # engine ValueErrors are bad arguments too (e.g. negative limit, unknown order_by)
+            self._send(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self._send(200, {"result": result, "seconds": round(time.perf_counter() - start, 6)})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif url.path == "/methods":
+            self._send(200, {"methods": self.service.methods()})
+        elif url.path.startswith("/query/"):
+            # a repeated parameter (?licenses=CC BY&licenses=CC0) is a list
+            params = {k: v if len(v) > 1 else v[0] for k, v in parse_qs(url.query).items()}
+            self._answer(url.path[len("/query/"):], params)
+        else:
+            self._send(404, {"error": f"Not found: {url.path}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/query":
+            self._send(404, {"error": f"Not found: {self.path}"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._send(400, {"error": f"Invalid JSON: {e}"})
+            return
+        if not isinstance(request, dict):
+            self._send(400, {"error": "A request must be an object with method and params"})
+            return
+        self._answer(request.get("method"), request.get("params"))
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+# socketserver listens with a backlog of 5: more clients connecting at once
+# were reset before a thread could accept them
+BACKLOG = 128
+
+
+class QueryHTTPServer(ThreadingHTTPServer):
+    request_queue_size = BACKLOG
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = BACKLOG
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)  # stale socket of a previous run
+        super().server_bind()
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def makeServer(service: QueryService, port: int = 8765, host: str = "127.0.0.1", socket: str = "", quiet=False):
+    """An HTTP server (not started yet) answering with `service`; on a Unix socket if `socket` is given."""
+    handler = type("BoundQueryRequestHandler", (QueryRequestHandler,), {"service": service, "quiet": quiet})
+    if socket:
+        return ThreadingUnixHTTPServer(socket, handler)
+    return QueryHTTPServer((host, port), handler)
+
+
+def serve(graph="", relational="", searchIndex="", sqlJournals=False, port=8765, host="127.0.0.1",
+          socket="", warm=True, quiet=False):
+    """Build and warm the engine, then answer queries until interrupted."""
+    service = QueryService(buildEngine(graph, relational, searchIndex, sqlJournals, readOnly=True))
+    if warm:
+        print("warming up the query engine...", file=sys.stderr)
+        service.warm()
+    server = makeServer(service, port, host, socket, quiet)
+    where = socket if socket else f"http://{host}:{server.server_port}"
+    print(f"serving queries on {where} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket and os.path.exists(socket):
+            os.remove(socket)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve FullQueryEngine queries over HTTP")
+    parser.add_argument("--graph", default="", help="SPARQL endpoint URL or local graph file of the journals")
+    parser.add_argument("--relational", default="", help="SQLite database of the categories and areas")
+    parser.add_argument("--search-index", default="", help="local search index of titles/publishers")
+    parser.add_argument("--sql-journals", action="store_true",
+                        help="--graph is the SQLite relational mirror of the journals")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", default="", help="Unix socket path (instead of host/port)")
+    parser.add_argument("--no-warm", action="store_true", help="do not build the caches before serving")
+    parser.add_argument("--quiet", action="store_true", help="do not log every request")
+    args = parser.parse_args()
+    serve(args.graph, args.relational, args.search_index, args.sql_journals, args.port, args.host,
+          args.socket, not args.no_warm, args.quiet)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+from facetIndex import FacetIndex
+
+# Journal x feature sparse matrix for "journals similar to this one".
+# The features of a journal are its Scimago categories and areas, its license and
+# its APC value, taken from a FacetIndex (which already joins the journals of both
+# databases). The matrix is kept twice, as plain numpy arrays:
+#   by feature (CSC): featurePtr / featureJournals, the journals having each feature
+#   by journal (CSR): journalPtr / journalFeatures, the features of each journal
+# The overlap of one journal with every other one is then a single bincount over
+# the journals of its features, and Jaccard/cosine scores and the top k are array
+# operations, without a Python loop over the journals.
+
+
+class SimilarityIndex:
+    FEATURES = ("category", "area", "license", "apc")
+    METRICS = ("jaccard", "cosine")
+
+    def __init__(self, facetIndex: FacetIndex):
+        self.facetIndex = facetIndex
+        self.size = len(facetIndex.keys)
+        self.featureFacets = []  # feature number -> facet
+        postings = []
+        for facet in self.FEATURES:
+            for value, numbers in facetIndex.postings[facet].items():
+                self.featureFacets.append(facet)
+                postings.append(np.unique(np.asarray(numbers, dtype=np.int64)))
+        self.featureFacets = np.array(self.featureFacets, dtype=object)
+        lengths = np.array([len(p) for p in postings], dtype=np.int64)
+        self.featurePtr = np.concatenate([[0], np.cumsum(lengths)])
+        self.featureJournals = np.concatenate(postings) if postings else np.zeros(0, dtype=np.int64)
+        entryFeatures = np.repeat(np.arange(len(postings)), lengths)
+        order = np.argsort(self.featureJournals, kind="stable")
+        self.journalFeatures = entryFeatures[order]
+        self.journalPtr = np.concatenate([[0], np.cumsum(np.bincount(self.featureJournals, minlength=self.size))])
+        self.sizes = {}  # features -> number of features of every journal
+
+    def _featureMask(self, features) -> np.ndarray:
+        unknown = set(features) - set(self.FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown features: {', '.join(sorted(unknown))}")
+        return np.isin(self.featureFacets, list(features))
+
+    def _sizes(self, features) -> np.ndarray:
+        key = tuple(sorted(features))
+        if key not in self.sizes:
+            used = self._featureMask(features)[self.journalFeatures]
+            owners = np.repeat(np.arange(self.size), np.diff(self.journalPtr))
+            self.sizes[key] = np.bincount(owners[used], minlength=self.size)
+        return self.sizes[key]
+
+    def number(self, journal_id: str):
+        """Journal number of an ISSN/EISSN (any identifier of the journal), or None."""
+        for key in (journal_id, str(journal_id).strip(), str(journal_id).strip().upper()):
+            if key in self.facetIndex.numbers:
+                return self.facetIndex.numbers[key]
+        return None
+
+    def scores(self, n: int, metric: str = "jaccard", features=FEATURES) -> np.ndarray:
+        """Similarity of journal number `n` with every journal (0 for itself)."""
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        mask = self._featureMask(features)
+        own = self.journalFeatures[self.journalPtr[n]:self.journalPtr[n + 1]]
+        own = own[mask[own]]
+        if len(own) == 0:
+            return np.zeros(self.size)
+        others = np.concatenate([self.featureJournals[self.featurePtr[f]:self.featurePtr[f + 1]] for f in own])
+        shared = np.bincount(others, minlength=self.size).astype(float)
+        sizes = self._sizes(features).astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if metric == "jaccard":
+                result = shared / (len(own) + sizes - shared)
+            else:
+                result = shared / np.sqrt(len(own) * sizes)
+        result = np.nan_to_num(result)
+        result[n] = 0.0
+        return result
+
+    def similar(self, journal_id: str, k: int = 10, metric: str = "jaccard", features=FEATURES) -> pd.DataFrame:
+        """
+        Journal handler rows of the k journals most similar to `journal_id`, best
+        first, with a "score" column; journals known only from the category
+        database are skipped. Empty when the journal is not in the index.
+        """
+        n = self.number(journal_id)
+        if n is None or k <= 0:
+            return pd.DataFrame()
+        scores = self.scores(n, metric, features)
+        # only journals that have a row (and a positive score) can be returned
+        candidates = np.flatnonzero(scores > 0)
+        candidates = candidates[[self.facetIndex.journals[c] is not None for c in candidates]]
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        # best score first, then the order of the index
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+        rows = []
+        for c in candidates:
+            row = dict(self.facetIndex.journals[c])
+            row["score"] = float(scores[c])
+            rows.append(row)
+        return pd.DataFrame(rows)
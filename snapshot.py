@@ -0,0 +1,339 @@
+import os
+import pandas as pd
+from Yang import JournalQueryHandler, CategoryQueryHandler
+from baseHandler import quartileRank
+
+# Columnar snapshots of both databases, for read-heavy replicas.
+#
+# exportSnapshot writes the journal catalogue (from a JournalQueryHandler) and the
+# category/area data (from a CategoryQueryHandler) into a directory, as Arrow IPC
+# files (uncompressed, so they can be memory-mapped) plus a Parquet copy of each
+# table for other tools. JournalSnapshotQueryHandler and CategorySnapshotQueryHandler
+# take that directory as dbPathOrUrl and answer the usual query methods from the
+# memory-mapped columns, without Blazegraph or SQLite.
+#
+# pyarrow is only needed by this module and is imported when it is used.
+#
+#   python snapshot.py --graph http://127.0.0.1:9999/blazegraph/sparql --relational my_journals.db --out snapshot/
+
+TABLES = ["journals", "identifiers", "assignments", "categories", "areas"]
+
+TRUE_VALUES = ["true", "yes"]
+FALSE_VALUES = ["none", "no", "false", "0", ""]
+
+# memory-mapped tables already opened, by path: (modification time, pyarrow Table)
+_tables = {}
+
+
+def exportSnapshot(journalHandler, categoryHandler, directory: str, parquet: bool = True) -> list:
+    """Write the snapshot files into `directory` and return their paths.
+    Either handler can be None to export only one of the two databases."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    frames = {}
+    if journalHandler is not None:
+        frames["journals"] = journalHandler.getAllJournals()
+        frames["identifiers"] = journalHandler.getAllIdentifiers()
+    if categoryHandler is not None:
+        frames["assignments"] = categoryHandler.getAllAssignments()
+        frames["categories"] = categoryHandler.getAllCategories()
+        frames["areas"] = categoryHandler.getAllAreas()
+
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for name, df in frames.items():
+        table = pa.Table.from_pandas(df.astype(object).where(df.notna(), None), preserve_index=False)
+        path = os.path.join(directory, name + ".arrow")
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        written.append(path)
+        if parquet:
+            path = os.path.join(directory, name + ".parquet")
+            pq.write_table(table, path)
+            written.append(path)
+    return written
+
+
+def loadSnapshotTable(directory: str, name: str):
+    """Return the memory-mapped pyarrow Table `name` of a snapshot directory
+    (columns are read from the mapped file without copying)."""
+    import pyarrow as pa
+
+    path = os.path.join(directory, name + ".arrow")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {name} table in the snapshot {directory}")
+    mtime = os.stat(path).st_mtime_ns
+    cached = _tables.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    _tables[path] = (mtime, table)
+    return table
+
+
+def _frame(table, columns) -> pd.DataFrame:
+    if table.num_rows == 0:
+        return pd.DataFrame(columns=columns)
+    return table.select(columns).to_pandas()
+
+
+def _isIn(column, values):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    return pc.fill_null(pc.is_in(column, value_set=pa.array(list(values), type=column.type)), False)
+
+
+def _flag(column, value: bool):
+    # the same truthiness rules as the SPARQL filters of JournalQueryHandler
+    import pyarrow.compute as pc
+
+    lowered = pc.fill_null(pc.utf8_lower(pc.cast(column, "string")), "")
+    return _isIn(lowered, TRUE_VALUES if value else FALSE_VALUES)
+
+
+def _hasLicense(column):
+    # like the other handlers, an empty license is no license
+    import pyarrow.compute as pc
+
+    return pc.fill_null(pc.not_equal(column, ""), False)
+
+
+class JournalSnapshotQueryHandler(JournalQueryHandler):
+    """JournalQueryHandler answering from a snapshot directory (dbPathOrUrl)."""
+
+    def _table(self, name: str = "journals"):
+        return loadSnapshotTable(self.getDbPathOrUrl(), name)
+
+    def hasAssignments(self) -> bool:
+        # the snapshot keeps the assignments in CategorySnapshotQueryHandler
+        return False
+
+    def getById(self, journal_id: str) -> pd.DataFrame:
+        import pyarrow.compute as pc
+
+        identifiers = self._table("identifiers")
+        subjects = identifiers.filter(pc.equal(identifiers["identifier"], journal_id))["id"]
+        journals = self._table()
+        df = _frame(journals.filter(_isIn(journals["id"], subjects.to_pylist())),
+                    ["title", "publisher", "license", "apc"])
+        df.insert(0, "id", journal_id)
+        return df
+
+    def _page(self, table, columns, order_by=None, limit=None, offset=0) -> pd.DataFrame:
+        # ORDER BY / LIMIT / OFFSET on the columns: only the page is converted to pandas
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        order = self._order(order_by, limit, offset, columns)
+        if order is not None:
+            field, descending = order
+            # missing values sort as "", like the unbound/empty values of the other handlers
+            fields = list(dict.fromkeys([field, "id"]))
+            keys = pa.table({f: pc.fill_null(pc.cast(table[f], "string"), "") for f in fields})
+            direction = "descending" if descending else "ascending"
+            indices = pc.sort_indices(keys, sort_keys=[(f, direction) for f in fields])
+            table = table.take(indices.slice(offset, limit))
+        return _frame(table, columns)
+
+    def getAllJournals(self, order_by: str = None, limit: int = None, offset: int = 0) -> pd.DataFrame:
+        return self._page(self._table(), ["id", "title", "publisher", "apc", "seal", "license"],
+                          order_by, limit, offset)
+
+    def getAllIdentifiers(self) -> pd.DataFrame:
+        return _frame(self._table("identifiers"), ["id", "identifier"])
+
+    def getJournalsByIds(self, ids: set[str], chunkSize: int = None, workers: int = None) -> pd.DataFrame:
+        identifiers = self._table("identifiers")
+        values = {v for i in (ids or set()) for v in (str(i).strip(), str(i).strip().upper()) if v}
+        subjects = identifiers.filter(_isIn(identifiers["identifier"], values))["id"]
+        journals = self._table()
+        return _frame(journals.filter(_isIn(journals["id"], subjects.to_pylist())),
+                      ["id", "title", "publisher", "apc", "seal", "license"])
+
+    def getJournalsWithTitle(self, partial_title: str, order_by: str = None, limit: int = None,
+                             offset: int = 0) -> pd.DataFrame:
+        import pyarrow.compute as pc
+
+        journals = self._table()
+        mask = pc.fill_null(pc.match_substring(journals["title"], partial_title, ignore_case=True), False)
+        return self._page(journals.filter(mask), ["id", "title", "publisher"], order_by, limit, offset)
+
+    def getJournalsPublishedBy(self, partial_name: str, order_by: str = None, limit: int = None,
+                               offset: int = 0) -> pd.DataFrame:
+        import pyarrow.compute as pc
+
+        journals = self._table()
+        mask = pc.fill_null(pc.match_substring(journals["publisher"], partial_name, ignore_case=True), False)
+        return self._page(journals.filter(mask), ["id", "title", "publisher"], order_by, limit, offset)
+
+    def getJournalsWithLicense(self, licenses: set[str], order_by: str = None, limit: int = None,
+                               offset: int = 0) -> pd.DataFrame:
+        import pyarrow.compute as pc
+
+        journals = self._table()
+        mask = _isIn(journals["license"], licenses) if licenses else _hasLicense(journals["license"])
+        return self._page(journals.filter(mask), ["id", "title", "license"], order_by, limit, offset)
+
+    def getJournalsWithAPC(self, apc: bool = True, order_by: str = None, limit: int = None,
+                           offset: int = 0) -> pd.DataFrame:
+        journals = self._table()
+        df = self._page(journals.filter(_flag(journals["apc"], apc)), ["id", "title", "publisher"],
+                        order_by, limit, offset)
+        df["apc"] = apc
+        return df
+
+    def getJournalsWithDOAJSeal(self, seal: bool = True, order_by: str = None, limit: int = None,
+                                offset: int = 0) -> pd.DataFrame:
+        journals = self._table()
+        df = self._page(journals.filter(_flag(journals["seal"], seal)), ["id", "title", "publisher"],
+                        order_by, limit, offset)
+        df["seal"] = seal
+        return df
+
+    def getJournalCounts(self, field: str, licenses: set[str] = None,
+                         apc: bool = None, seal: bool = None) -> pd.DataFrame:
+        if field not in ("license", "publisher", "apc", "seal"):
+            raise ValueError(f"Cannot count journals by {field}")
+        journals = self._table()
+        if licenses:
+            journals = journals.filter(_isIn(journals["license"], licenses))
+        if apc is not None:
+            journals = journals.filter(_flag(journals["apc"], apc))
+        if seal is not None:
+            journals = journals.filter(_flag(journals["seal"], seal))
+        if field == "license":
+            journals = journals.filter(_hasLicense(journals["license"]))
+        counts = journals.group_by(field).aggregate([("id", "count_distinct")])
+        df = _frame(counts, [field, "id_count_distinct"]).rename(columns={"id_count_distinct": "count"})
+        df = df[df[field].notna()]
+        return df.sort_values("count", ascending=False, ignore_index=True)
+
+
+class CategorySnapshotQueryHandler(CategoryQueryHandler):
+    """CategoryQueryHandler answering from a snapshot directory (dbPathOrUrl)."""
+
+    def _table(self, name: str = "assignments"):
+        return loadSnapshotTable(self.getDbPathOrUrl(), name)
+
+    def _assignments(self, category_ids=None, quartiles=None, area_ids=None):
+        table = self._table()
+        for column, values in (("category_id", category_ids), ("quartile", quartiles), ("area_id", area_ids)):
+            vals = [(v or "").strip() for v in (values or set()) if (v or "").strip()]
+            if vals:
+                table = table.filter(_isIn(table[column], vals))
+        return table
+
+    def getById(self, category_id: str) -> pd.DataFrame:
+        import pyarrow.compute as pc
+
+        categories = self._table("categories")
+        match = categories.filter(pc.equal(categories["category_id"], (category_id or "").strip()))
+        return _frame(match.slice(0, 1), ["category_id", "quartile"]).rename(columns={"category_id": "id"})
+
+    def getAllCategories(self) -> pd.DataFrame:
+        return _frame(self._table("categories"), ["category_id", "quartile"])
+
+    def getAllAreas(self) -> pd.DataFrame:
+        return _frame(self._table("areas"), ["id"])
+
+    def getCategoriesWithQuartile(self, quartiles: set[str]) -> pd.DataFrame:
+        import pyarrow.compute as pc
+
+        qs = [(q or "").strip().upper() for q in (quartiles or set()) if (q or "").strip()]
+        if not qs:
+            return pd.DataFrame(columns=["category_id", "quartile"])
+        categories = self._table("categories")
+        mask = _isIn(pc.utf8_upper(categories["quartile"]), qs)
+        return _frame(categories.filter(mask), ["category_id", "quartile"])
+
+    def getCategoriesAssignedToAreas(self, area_ids: set[str]) -> pd.DataFrame:
+        if not [a for a in (area_ids or set()) if (a or "").strip()]:
+            return pd.DataFrame(columns=["id", "quartile"])
+        df = _frame(self._assignments(area_ids=area_ids), ["category_id", "quartile"])
+        df = df.drop_duplicates().sort_values("category_id", ignore_index=True)
+        return df.rename(columns={"category_id": "id"})
+
+    def getAreasAssignedToCategories(self, category_ids: set[str]) -> pd.DataFrame:
+        if not [c for c in (category_ids or set()) if (c or "").strip()]:
+            return pd.DataFrame(columns=["area"])
+        df = _frame(self._assignments(category_ids=category_ids), ["area_id"])
+        return df.drop_duplicates().sort_values("area_id", ignore_index=True).rename(columns={"area_id": "area"})
+
+    def getAreaCategoryCounts(self, area_ids: set[str] = None) -> pd.DataFrame:
+        table = self._assignments(area_ids=area_ids)
+        counts = table.group_by(["area_id", "category_id"]).aggregate([("journalId", "count_distinct")])
+        df = _frame(counts, ["area_id", "category_id", "journalId_count_distinct"])
+        df = df.rename(columns={"journalId_count_distinct": "journals"})
+        return df.sort_values(["area_id", "journals", "category_id"], ascending=[True, False, True],
+                              ignore_index=True)
+
+    def getAllCategoryAssignments(self) -> pd.DataFrame:
+        df = _frame(self._table(), ["category_id", "quartile", "id"])
+        if df.empty:
+            return pd.DataFrame(columns=["category", "category_quartile", "identifiers"])
+        df = df.drop_duplicates().groupby(["category_id", "quartile"], as_index=False, dropna=False)["id"].agg(",".join)
+        return df.rename(columns={"category_id": "category", "quartile": "category_quartile", "id": "identifiers"})
+
+    def getAllAreaAssignments(self) -> pd.DataFrame:
+        df = _frame(self._table(), ["area_id", "id"])
+        if df.empty:
+            return pd.DataFrame(columns=["area", "identifiers"])
+        df = df.drop_duplicates().groupby("area_id", as_index=False)["id"].agg(",".join)
+        return df.rename(columns={"area_id": "area", "id": "identifiers"})
+
+    def getAllAssignments(self, category_ids: set[str] = None, quartiles: set[str] = None,
+                          area_ids: set[str] = None) -> pd.DataFrame:
+        return _frame(self._assignments(category_ids, quartiles, area_ids),
+                      ["id", "category_id", "quartile", "area_id", "journalId"])
+
+    def getJournalsWithBestQuartile(self, quartiles: set[str], area_ids: set[str] = None) -> pd.DataFrame:
+        columns = ["id", "journalId", "best_quartile"]
+        ranks = {r for r in (quartileRank(q) for q in (quartiles or set())) if r is not None}
+        df = _frame(self._table(), ["id", "journalId", "quartile", "area_id"])
+        if not ranks or df.empty:
+            return pd.DataFrame(columns=columns)
+        df["rank"] = df["quartile"].map(quartileRank)
+        best = df.dropna(subset=["rank"]).groupby("journalId")["rank"].min()
+        best = best[best.isin(ranks)]
+        areas = {(a or "").strip() for a in (area_ids or set()) if (a or "").strip()}
+        if areas:
+            df = df[df["area_id"].isin(areas)]
+        df = df[df["journalId"].isin(best.index)][["id", "journalId"]].drop_duplicates()
+        df["best_quartile"] = ["Q" + str(int(best[j])) for j in df["journalId"]]
+        return df.sort_values("id", ignore_index=True) if not df.empty else pd.DataFrame(columns=columns)
+
+    def getJournalCounts(self, field: str, category_ids: set[str] = None, quartiles: set[str] = None,
+                         area_ids: set[str] = None) -> pd.DataFrame:
+        columns = {"area": "area_id", "category": "category_id", "quartile": "quartile"}
+        if field not in columns:
+            raise ValueError(f"Cannot count journals by {field}")
+        table = self._assignments(category_ids, quartiles, area_ids)
+        counts = table.group_by(columns[field]).aggregate([("journalId", "count_distinct")])
+        df = _frame(counts, [columns[field], "journalId_count_distinct"])
+        df = df.rename(columns={columns[field]: field, "journalId_count_distinct": "count"})
+        return df.sort_values(["count", field], ascending=[False, True], ignore_index=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export a columnar snapshot of the journal and category databases")
+    parser.add_argument("--graph", help="SPARQL endpoint URL or local graph file of the journals")
+    parser.add_argument("--relational", help="SQLite database of the categories and areas")
+    parser.add_argument("--out", required=True, help="directory of the snapshot")
+    parser.add_argument("--no-parquet", action="store_true", help="write only the Arrow files")
+    args = parser.parse_args()
+
+    journal_handler = None
+    if args.graph:
+        journal_handler = JournalQueryHandler()
+        journal_handler.setDbPathOrUrl(args.graph)
+    category_handler = None
+    if args.relational:
+        category_handler = CategoryQueryHandler()
+        category_handler.setDbPathOrUrl(args.relational)
+    for path in exportSnapshot(journal_handler, category_handler, args.out, parquet=not args.no_parquet):
+        print("written", path)
@@ -0,0 +1,82 @@
+import os
+import sys
+import pytest
+
+# Tests on local databases only (no Blazegraph): the synthetic dumps of the
+# benchmarks are uploaded once per session into a local graph file, a SQLite file
+# holding both the relational mirror of the journals and the categories, and a
+# search index. Tests that write (delta uploads) work on their own copies.
+#
+#   python -m pytest -q tests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from generators import generate
+
+SIZE = 200  # journals of the synthetic pool
+
+
+@pytest.fixture(scope="session")
+def dumps(tmp_path_factory):
+    """(doaj.csv, scimago.json) of the synthetic pool; some journals have no license, as in DOAJ."""
+    import pandas as pd
+    doaj, scimago = generate(str(tmp_path_factory.mktemp("dumps")), SIZE)
+    df = pd.read_csv(doaj, dtype=str, keep_default_na=False)
+    df.loc[::25, "Journal license"] = ""
+    df.to_csv(doaj, index=False)
+    return doaj, scimago
+
+
+def uploadLocal(directory, doaj, scimago) -> dict:
+    """Upload the dumps into local databases in `directory` and return their paths."""
+    from li import JournalUploadHandler
+    from daniele import CategoryUploadHandler
+
+    paths = {
+        "graph": os.path.join(directory, "journals.nt"),
+        "relational": os.path.join(directory, "relational.db"),
+        "search": os.path.join(directory, "search.db"),
+    }
+    journals = JournalUploadHandler()
+    journals.setDbPathOrUrl(paths["graph"])
+    journals.setRelationalMirrorPath(paths["relational"])
+    journals.setSearchIndexPath(paths["search"])
+    assert journals.pushDataToDb(doaj)
+    categories = CategoryUploadHandler()
+    categories.setDbPathOrUrl(paths["relational"])
+    assert categories.pushDataToDb(scimago)
+    return paths
+
+
+@pytest.fixture(scope="session")
+def local(dumps, tmp_path_factory):
+    """Paths of the session databases: do not write to them."""
+    return uploadLocal(str(tmp_path_factory.mktemp("local")), *dumps)
+
+
+@pytest.fixture(scope="session")
+def graphEngine(local):
+    """FullQueryEngine on the local graph file and the category database."""
+    from queryService import buildEngine
+    return buildEngine(local["graph"], local["relational"])
+
+
+@pytest.fixture(scope="session")
+def sqlEngine(local):
+    """FullQueryEngine on the relational mirror and the category database."""
+    from queryService import buildEngine
+    return buildEngine(local["relational"], local["relational"], sqlJournals=True)
+
+
+@pytest.fixture(scope="session")
+def assignedEngine(dumps, tmp_path_factory):
+    """FullQueryEngine on a graph holding the category/area edges: the composite queries are pushed down."""
+    from li import JournalUploadHandler
+    from queryService import buildEngine
+    paths = uploadLocal(str(tmp_path_factory.mktemp("assigned")), *dumps)
+    journals = JournalUploadHandler()
+    journals.setDbPathOrUrl(paths["graph"])
+    assert journals.pushAssignmentsToDb(paths["relational"])
+    return buildEngine(paths["graph"], paths["relational"])
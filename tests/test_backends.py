@@ -0,0 +1,71 @@
+import pytest
+
+# The local graph file (rdflib) and the relational mirror are uploaded from the
+# same dump and must answer the same journals.
+
+QUERIES = [
+    ("getAllJournals", ()),
+    ("getJournalsWithTitle", ("review",)),
+    ("getJournalsPublishedBy", ("univ",)),
+    ("getJournalsWithLicense", ({"CC BY", "CC BY-SA"},)),
+    ("getJournalsWithLicense", (set(),)),
+    ("getJournalsWithAPC", ()),
+    ("getJournalsWithDOAJSeal", ()),
+]
+
+
+def ids(journals):
+    return sorted(j.getId() for j in journals)
+
+
+@pytest.mark.parametrize("method,args", QUERIES)
+def test_graph_and_mirror_return_the_same_journals(graphEngine, sqlEngine, method, args):
+    expected = ids(getattr(graphEngine, method)(*args))
+    assert expected
+    assert ids(getattr(sqlEngine, method)(*args)) == expected
+
+
+def test_journal_fields_match(graphEngine, sqlEngine):
+    graph = {j.getId(): j for j in graphEngine.getAllJournals()}
+    sql = {j.getId(): j for j in sqlEngine.getAllJournals()}
+    assert graph.keys() == sql.keys()
+    for id, journal in graph.items():
+        other = sql[id]
+        assert (journal.getTitle(), journal.getPublisher(), journal.getLicense(), journal.hasAPC(),
+                journal.hasSeal()) == (other.getTitle(), other.getPublisher(), other.getLicense(),
+                                       other.hasAPC(), other.hasSeal())
+
+
+def test_journal_counts_match(graphEngine, sqlEngine):
+    for field in ("license", "publisher", "apc", "seal"):
+        graph = graphEngine.getJournalCounts(field)
+        sql = sqlEngine.getJournalCounts(field)
+        assert dict(zip(graph[field], graph["count"])) == dict(zip(sql[field], sql["count"])), field
+
+
+@pytest.mark.parametrize("licenses", [set(), {"CC BY", "CC BY-SA"}])
+def test_composite_queries_match(graphEngine, sqlEngine, licenses):
+    # sqlEngine pushes the composite queries down to SQL, graphEngine joins in the engine
+    areas = sorted(a.getId() for a in graphEngine.getAllAreas())
+    assert areas and ids(sqlEngine.getAllAreas()) == areas
+    for area in areas:
+        assert ids(graphEngine.getJournalsInAreasWithLicense({area}, licenses)) == \
+            ids(sqlEngine.getJournalsInAreasWithLicense({area}, licenses)), area
+    assert ids(graphEngine.getJournalsInCategoriesWithQuartile(set(), {"Q1"})) == \
+        ids(sqlEngine.getJournalsInCategoriesWithQuartile(set(), {"Q1"}))
+
+
+@pytest.mark.parametrize("licenses", [set(), {"CC BY"}])
+def test_pushed_down_composite_queries_match_the_join(graphEngine, assignedEngine, licenses):
+    # assignedEngine answers from the graph edges, graphEngine joins in the engine
+    for area in sorted(a.getId() for a in graphEngine.getAllAreas()):
+        assert ids(assignedEngine.getJournalsInAreasWithLicense({area}, licenses)) == \
+            ids(graphEngine.getJournalsInAreasWithLicense({area}, licenses)), area
+
+
+@pytest.mark.parametrize("text", ["review", "%", "_", "a_b", "100%"])
+def test_wildcards_are_characters_in_the_mirror(graphEngine, sqlEngine, text):
+    # LIKE on the mirror matches like the SPARQL CONTAINS filter
+    assert ids(sqlEngine.getJournalsWithTitle(text)) == ids(graphEngine.getJournalsWithTitle(text))
+    assert ids(sqlEngine.getJournalsPublishedBy(text)) == ids(graphEngine.getJournalsPublishedBy(text))
+    assert sqlEngine.getJournalsWithTitle("\\") == [] and sqlEngine.getJournalsWithTitle("\\%") == []
@@ -0,0 +1,82 @@
+import io
+import json
+import time
+
+# batch.py: specs read from JSON Lines, deduplicated, run by a pool of workers
+# and written back in the order of the file.
+
+
+SPECS = [
+    '{"method": "getJournalsWithLicense", "params": {"licenses": ["CC BY", "CC BY-SA"]}, "id": "cc"}',
+    '{"method": "getAllJournals", "params": {"order_by": "title", "limit": 3}}',
+    '',
+    '# a comment',
+    '{"params": {"licenses": ["CC BY-SA", "CC BY"]}, "method": "getJournalsWithLicense"}',
+    'not json',
+    '[1, 2]',
+    '{"method": "noSuchMethod"}',
+    '{"method": "getAllJournals", "params": {"limit": 3, "order_by": "title"}}',
+]
+
+
+def run(service, specs, workers=4):
+    from batch import readSpecs, runBatch
+    out = io.StringIO()
+    counts = runBatch(service, readSpecs(specs), out, workers)
+    return counts, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_identical_specs_run_once(sqlEngine):
+    from queryService import QueryService
+    counts, records = run(QueryService(sqlEngine), SPECS)
+    assert [r["lines"] for r in records] == [[1, 5], [2, 9], [6], [7], [8]]
+    assert counts == {"ok": 2, "error": 3}
+    assert records[0]["id"] == "cc"
+    assert len(records[0]["result"]) == len(sqlEngine.getJournalsWithLicense({"CC BY", "CC BY-SA"}))
+    assert [j["id"] for j in records[1]["result"]] == \
+        [j.getId() for j in sqlEngine.getAllJournals(order_by="title", limit=3)]
+
+
+def test_bad_specs_are_error_lines(sqlEngine):
+    from queryService import QueryService
+    _, records = run(QueryService(sqlEngine), SPECS)
+    errors = {r["lines"][0]: r["error"] for r in records if "error" in r}
+    assert errors[6].startswith("Invalid JSON")
+    assert "object" in errors[7]
+    assert "Unknown method" in errors[8]
+    assert all("result" not in r for r in records if "error" in r)
+
+
+class SlowService:
+    """A QueryService whose first specs take the longest, so they finish last."""
+
+    def __init__(self, service):
+        self.service = service
+        self.started = 0
+        self.finished = []
+
+    def request(self, spec):
+        self.started += 1
+        time.sleep(0.05 * (5 - spec["params"]["limit"]))
+        self.finished.append(spec["params"]["limit"])
+        return self.service.request(spec)
+
+
+def test_output_is_streamed_in_order(sqlEngine):
+    from batch import readSpecs, runBatch
+    from queryService import QueryService
+    specs = [json.dumps({"method": "getAllJournals", "params": {"order_by": "id", "limit": n}}) for n in range(1, 6)]
+    service = SlowService(QueryService(sqlEngine))
+    started = []
+
+    class Out(io.StringIO):
+        def write(self, text):
+            started.append(service.started)  # requests started when this line is written
+            return super().write(text)
+
+    out = Out()
+    assert runBatch(service, readSpecs(specs), out, workers=2) == {"ok": 5, "error": 0}
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [len(r["result"]) for r in records] == [1, 2, 3, 4, 5]
+    assert service.finished != sorted(service.finished)  # the results came out of order
+    assert started[0] <= 2  # the first line is written before the other specs are submitted
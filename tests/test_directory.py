@@ -0,0 +1,51 @@
+import shutil
+import pandas as pd
+
+# UploadHandler.pushDirectoryToDb: the files of a folder, parsed in parallel,
+# with a report row per file.
+
+
+def splitDump(doaj, directory, parts=2):
+    df = pd.read_csv(doaj, dtype=str, keep_default_na=False)
+    size = -(-len(df) // parts)
+    for n in range(parts):
+        df.iloc[n * size:(n + 1) * size].to_csv(directory / f"doaj_{n}.csv", index=False)
+    return len(df)
+
+
+def test_journal_files(dumps, tmp_path):
+    from li import JournalUploadHandler
+    from queryService import buildEngine
+    data = tmp_path / "data"
+    data.mkdir()
+    total = splitDump(dumps[0], data)
+    journals = JournalUploadHandler()
+    journals.setDbPathOrUrl(str(tmp_path / "journals.nt"))
+    report = journals.pushDirectoryToDb(str(data), "*.csv", workers=2)
+    assert list(report["uploaded"]) == [True, True] and list(report["error"]) == ["", ""]
+    assert report["records"].sum() == total
+    assert len(buildEngine(str(tmp_path / "journals.nt")).getAllJournals()) == total
+
+
+def test_generic_handler_on_a_sqlite_file(dumps, tmp_path):
+    # the categories go to the SQLite file; the journals have no graph there and are reported
+    from baseHandler import UploadHandler
+    from queryService import buildEngine
+    data = tmp_path / "data"
+    data.mkdir()
+    shutil.copy(dumps[0], data / "doaj.csv")
+    shutil.copy(dumps[1], data / "scimago.json")
+    (data / "broken.json").write_text("[{")
+    (data / "notes.txt").write_text("skipped")
+    uploader = UploadHandler()
+    uploader.setDbPathOrUrl(str(tmp_path / "relational.db"))
+    report = uploader.pushDirectoryToDb(str(data), workers=2).set_index("file")
+    assert len(report) == 3
+    row = report.loc[str(data / "scimago.json")]
+    assert row["uploaded"] and row["error"] == "" and row["records"] > 0
+    row = report.loc[str(data / "doaj.csv")]
+    assert not row["uploaded"] and "SQLite" in row["error"]
+    row = report.loc[str(data / "broken.json")]
+    assert not row["uploaded"] and row["error"]
+    assert buildEngine(relational=str(tmp_path / "relational.db")).getAllAreas()
+    assert not uploader.pushDataToDb(str(data / "doaj.csv"))
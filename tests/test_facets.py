@@ -0,0 +1,35 @@
+import pytest
+
+# The facet index of FullQueryEngine against the queries of the handlers.
+
+
+def test_facet_counts_match_the_handlers(sqlEngine):
+    for facet in ("area", "license"):
+        facets = sqlEngine.getFacetCounts(facet)
+        counts = sqlEngine.getJournalCounts(facet)
+        assert dict(zip(facets[facet], facets["count"])) == dict(zip(counts[facet], counts["count"])), facet
+
+
+def test_facet_filters(sqlEngine):
+    counts = sqlEngine.getFacetCounts("license", apc=False)
+    journals = sqlEngine.getJournalsWithFacets(apc=False)
+    assert counts["count"].sum() == sum(1 for j in journals if j.getLicense())
+
+
+def test_unknown_facet_or_filter(sqlEngine):
+    with pytest.raises(ValueError, match="Unknown facet: colour"):
+        sqlEngine.getFacetCounts("colour")
+    with pytest.raises(ValueError, match="Unknown filters: area"):
+        sqlEngine.getFacetCounts("license", area={"Medicine"})
+
+
+def test_categories_with_quartiles(sqlEngine):
+    # the quartile is the one of the given category, not of any category of the journal
+    categories = sorted({c.getId() for c in sqlEngine.getAllCategories()})[:5]
+    for quartiles in ({"Q1"}, {"Q2", "Q3"}):
+        expected = sorted(j.getId() for j in sqlEngine.getJournalsInCategoriesWithQuartile(set(categories), quartiles))
+        assert expected
+        assert sorted(j.getId() for j in sqlEngine.getJournalsWithFacets(categories=set(categories),
+                                                                        quartiles=quartiles)) == expected
+        counts = sqlEngine.getFacetCounts("apc", categories=set(categories), quartiles=quartiles)
+        assert counts["count"].sum() == len(expected)
@@ -0,0 +1,84 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+# getJournalsByIds: the ids are sent in blocks of VALUES, several at a time on
+# an endpoint, over the pooled keep-alive connections of postSparqlQuery.
+
+
+class SparqlEndpoint(BaseHTTPRequestHandler):
+    """A SPARQL endpoint answering from a local graph file, counting its connections."""
+    protocol_version = "HTTP/1.1"  # keep-alive
+    graph = None
+    lock = threading.Lock()
+    connections = 0
+    queries = 0
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            type(self).connections += 1
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8"))
+        with self.lock:
+            type(self).queries += 1
+            body = self.graph.query(form["query"][0]).serialize(format="json")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/sparql-results+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def endpoint(local):
+    from rdflib import Graph
+    SparqlEndpoint.graph = Graph()
+    SparqlEndpoint.graph.parse(local["graph"])
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SparqlEndpoint)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/sparql"
+    server.shutdown()
+    server.server_close()
+
+
+def frame(df):
+    return df.sort_values("id").reset_index(drop=True)
+
+
+def allIds(sqlEngine):
+    return {j.getId() for j in sqlEngine.getAllJournals()}
+
+
+def test_several_blocks_match_one(local, sqlEngine):
+    from Yang import JournalQueryHandler
+    graph = JournalQueryHandler()
+    graph.setDbPathOrUrl(local["graph"])
+    ids = allIds(sqlEngine) | {"0000-0000"}
+    expected = frame(sqlEngine.journalHandlers[0].getJournalsByIds(ids))
+    assert len(expected) == len(ids) - 1
+    assert frame(graph.getJournalsByIds(ids)).equals(expected)
+    assert frame(graph.getJournalsByIds(ids, chunkSize=7)).equals(expected)  # more than one VALUES block
+
+
+def test_blocks_reuse_the_endpoint_connections(endpoint, sqlEngine):
+    from Yang import JournalQueryHandler
+    journals = JournalQueryHandler()
+    journals.setDbPathOrUrl(endpoint)
+    ids = allIds(sqlEngine)
+    expected = frame(sqlEngine.journalHandlers[0].getJournalsByIds(ids))
+    chunks = -(-len(ids) // 7)
+    assert chunks > 4
+
+    SparqlEndpoint.connections = SparqlEndpoint.queries = 0
+    for _ in range(3):
+        assert frame(journals.getJournalsByIds(ids, chunkSize=7, workers=4)).equals(expected)
+    assert SparqlEndpoint.queries == 3 * chunks
+    assert SparqlEndpoint.connections <= 4  # one per worker, kept across the blocks and the calls
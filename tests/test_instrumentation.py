@@ -0,0 +1,84 @@
+import pytest
+
+# instrumentation.py: the spans of one engine call and their nesting, and
+# nothing measured while no hook is installed.
+
+
+@pytest.fixture
+def recorded():
+    from instrumentation import RecordingHook, setInstrumentationHook
+    hook = RecordingHook()
+    setInstrumentationHook(hook)
+    try:
+        yield hook
+    finally:
+        setInstrumentationHook(None)
+
+
+def byName(hook):
+    spans = {}
+    for s in hook.spans:
+        spans.setdefault(s["name"], []).append(s)
+    return spans
+
+
+@pytest.mark.parametrize("engine,backend,query", [("graphEngine", "JournalQueryHandler", "sparql"),
+                                                  ("sqlEngine", "JournalSQLQueryHandler", "sql")])
+def test_spans_of_one_engine_call(request, recorded, engine, backend, query):
+    engine = request.getfixturevalue(engine)
+    journals = engine.getJournalsWithLicense({"CC BY"})
+    assert journals
+
+    top = "engine.BasicQueryEngine.getJournalsWithLicense"
+    handler = f"handler.{backend}.getJournalsWithLicense"
+    spans = byName(recorded)
+    assert set(spans) == {top, handler, query, "convert.makeJournals"}
+    assert [s["parent"] for s in spans[top]] == [None]
+    assert [s["parent"] for s in spans[handler]] == [top]
+    assert [s["parent"] for s in spans[query]] == [handler]
+    assert [s["parent"] for s in spans["convert.makeJournals"]] == [top]
+    # children end before their parents
+    assert [s["name"] for s in recorded.spans] == [query, handler, "convert.makeJournals", top]
+
+    assert spans[query][0]["rows"] == spans[handler][0]["rows"] == len(journals)
+    assert spans["convert.makeJournals"][0]["rows"] == len(journals)
+    assert spans[handler][0]["frame_bytes"] > 0
+    assert spans[top][0]["seconds"] >= spans[handler][0]["seconds"] >= spans[query][0]["seconds"]
+
+
+def test_errors_are_recorded(recorded, sqlEngine):
+    with pytest.raises(ValueError):
+        sqlEngine.getJournalsWithFacets(apc=False, order_by="apc", limit=6)
+    top = [s for s in recorded.spans if s["parent"] is None]
+    assert [s["name"] for s in top] == ["engine.FullQueryEngine.getJournalsWithFacets"]
+    assert "ValueError" in top[0]["error"]
+
+
+def test_nothing_is_measured_without_a_hook(sqlEngine, graphEngine, monkeypatch):
+    import instrumentation
+    import laura
+    assert instrumentation.getInstrumentationHook() is None and not instrumentation.isEnabled()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("measured without a hook")
+
+    monkeypatch.setattr(instrumentation, "Span", fail)
+    monkeypatch.setattr(laura, "frameBytes", fail)
+    for engine in (graphEngine, sqlEngine):
+        assert engine.getJournalsWithLicense({"CC BY"})
+        assert engine.getJournalsInAreasWithLicense({a.getId() for a in engine.getAllAreas()}, set())
+    assert instrumentation.span("sparql") is instrumentation._NOOP
+
+
+def test_spans_of_a_composite_query(recorded, graphEngine):
+    area = sorted(a.getId() for a in graphEngine.getAllAreas())[0]
+    recorded.clear()
+    journals = graphEngine.getJournalsInAreasWithLicense({area}, {"CC BY"})
+
+    top = "engine.FullQueryEngine.getJournalsInAreasWithLicense"
+    spans = byName(recorded)
+    assert [s["parent"] for s in spans[top]] == [None]
+    assert [s["parent"] for s in spans["handler.CategoryQueryHandler.getAllAssignments"]] == [top]
+    assert [s["parent"] for s in spans["handler.JournalQueryHandler.getJournalsByIds"]] == [top]
+    assert "handler.JournalQueryHandler.getJournalsByIds" in [s["parent"] for s in spans["sparql"]]
+    assert spans["convert.makeJournals"][0]["rows"] == len(journals)
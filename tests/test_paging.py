@@ -0,0 +1,108 @@
+import pytest
+
+# order_by / limit / offset of the journal queries: every backend returns the
+# same page, the pages of several handlers are merged, and the search index
+# keeps its ranking when no order_by is given.
+
+
+@pytest.fixture(scope="module")
+def indexedEngine(local):
+    from queryService import buildEngine
+    return buildEngine(local["graph"], local["relational"], searchIndex=local["search"])
+
+
+def ids(journals):
+    return [j.getId() for j in journals]
+
+
+def expectedPage(journals, field, descending, limit, offset):
+    rows = sorted(journals, key=lambda j: ((getattr(j, "get" + field.capitalize())() or "") if field != "id"
+                                           else j.getId(), j.getId()), reverse=descending)
+    return ids(rows)[offset:offset + limit]
+
+
+PAGES = [
+    ("getAllJournals", (), "title", 10, 0),
+    ("getAllJournals", (), "-publisher", 7, 30),
+    ("getAllJournals", (), None, 5, 12),
+    ("getJournalsWithLicense", ({"CC BY"},), "-id", 4, 2),
+    ("getJournalsPublishedBy", ("univ",), "title", 6, 3),
+]
+
+
+@pytest.mark.parametrize("method,args,order_by,limit,offset", PAGES)
+def test_backends_return_the_same_page(graphEngine, sqlEngine, method, args, order_by, limit, offset):
+    everything = getattr(sqlEngine, method)(*args)
+    field = (order_by or "id").lstrip("-")
+    expected = expectedPage(everything, field, bool(order_by and order_by.startswith("-")), limit, offset)
+    assert len(expected) == limit
+    for engine in (graphEngine, sqlEngine):
+        assert ids(getattr(engine, method)(*args, order_by=order_by, limit=limit, offset=offset)) == expected
+
+
+def test_pages_of_several_handlers_are_merged(local, sqlEngine):
+    from queryService import buildEngine
+    engine = buildEngine(local["graph"], local["relational"])
+    engine.addJournalHandler(sqlEngine.journalHandlers[0])  # every journal twice
+    everything = sqlEngine.getAllJournals()
+    doubled = [j for j in everything for _ in range(2)]
+    page = engine.getAllJournals(order_by="title", limit=9, offset=3)
+    assert ids(page) == expectedPage(doubled, "title", False, 9, 3)
+
+
+def test_search_index_keeps_its_ranking(local, indexedEngine):
+    from searchIndex import JournalSearchIndex
+    ranked = list(JournalSearchIndex(local["search"]).search("title", "review")["id"])
+    assert len(ranked) > 8
+    assert ids(indexedEngine.getJournalsWithTitle("review", limit=5)) == ranked[:5]
+    assert ids(indexedEngine.getJournalsWithTitle("review", limit=5, offset=3)) == ranked[3:8]
+
+
+def test_search_index_pages_in_order(graphEngine, indexedEngine):
+    for order_by in ("title", "-id"):
+        assert ids(indexedEngine.getJournalsWithTitle("review", order_by=order_by, limit=6, offset=2)) == \
+            ids(graphEngine.getJournalsWithTitle("review", order_by=order_by, limit=6, offset=2))
+    with pytest.raises(ValueError):
+        indexedEngine.getJournalsWithTitle("review", order_by="license", limit=5)
+
+
+def composite(engine):
+    area = sorted(a.getId() for a in engine.getAllAreas())[0]
+    return [
+        ("getJournalsInCategoriesWithQuartile", (set(), {"Q1", "Q2"})),
+        ("getJournalsInAreasWithLicense", ({area}, set())),
+        ("getDiamondJournalsInAreasAndCategoriesWithQuartile", ({area}, set(), {"Q1", "Q2", "Q3"})),
+        ("getJournalsWithBestQuartile", ({"Q1"},)),
+    ]
+
+
+@pytest.mark.parametrize("order_by,limit,offset", [("title", 5, 2), ("-license", 4, 0), (None, 3, 1)])
+def test_composite_queries_are_paged(graphEngine, sqlEngine, assignedEngine, order_by, limit, offset):
+    # graphEngine joins in the engine, sqlEngine and assignedEngine page in the handler
+    assert assignedEngine.journalHandlers[0].hasAssignments() and not graphEngine.journalHandlers[0].hasAssignments()
+    field = (order_by or "id").lstrip("-")
+    for method, args in composite(sqlEngine):
+        everything = getattr(sqlEngine, method)(*args)
+        expected = expectedPage(everything, field, bool(order_by and order_by.startswith("-")), limit, offset)
+        assert len(expected) == limit, method
+        for engine in (graphEngine, sqlEngine, assignedEngine):
+            page = getattr(engine, method)(*args, order_by=order_by, limit=limit, offset=offset)
+            assert ids(page) == expected, (method, engine)
+
+
+def test_facets_are_paged(sqlEngine):
+    everything = sqlEngine.getJournalsWithFacets(apc=False)
+    assert ids(sqlEngine.getJournalsWithFacets(apc=False, order_by="-title", limit=6, offset=4)) == \
+        expectedPage(everything, "title", True, 6, 4)
+    assert len(sqlEngine.getJournalsWithFacets(apc=False, limit=6, resultSet=True)) == 6
+    with pytest.raises(ValueError):
+        sqlEngine.getJournalsWithFacets(apc=False, order_by="apc", limit=6)
+
+
+def test_similar_journals_are_paged(sqlEngine):
+    journal = sqlEngine.getAllJournals(order_by="id", limit=1)[0].getId()
+    ranked = ids(sqlEngine.getSimilarJournals(journal, k=8))
+    assert len(ranked) == 8
+    assert ids(sqlEngine.getSimilarJournals(journal, k=5, offset=3)) == ranked[3:]
+    with pytest.raises(ValueError):
+        sqlEngine.getSimilarJournals(journal, k=5, offset=-1)
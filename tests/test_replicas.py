@@ -0,0 +1,98 @@
+import shutil
+
+import pytest
+
+# setReadOnly: the read-only and in-memory replicas answer like the database
+# file, and reject every write.
+
+MODES = [{"readOnly": True}, {"readOnly": True, "inMemory": True}]
+
+
+def handler(cls, path, **options):
+    import Yang
+    h = getattr(Yang, cls)()
+    h.setDbPathOrUrl(path)
+    if options:
+        h.setReadOnly(**options)
+    return h
+
+
+def frame(df):
+    return df.astype(str).sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def areaIds(path):
+    return set(handler("CategoryQueryHandler", path).getAllAreas()["id"])
+
+
+def queries(path):
+    area = sorted(areaIds(path))[0]
+    return [
+        ("CategoryQueryHandler", "getAllCategories", ()),
+        ("CategoryQueryHandler", "getAllAreas", ()),
+        ("CategoryQueryHandler", "getCategoriesWithQuartile", ({"Q1", "Q2"},)),
+        ("CategoryQueryHandler", "getCategoriesAssignedToAreas", ({area},)),
+        ("CategoryQueryHandler", "getAllAssignments", ()),
+        ("CategoryQueryHandler", "getJournalsWithBestQuartile", ({"Q1"},)),
+        ("JournalSQLQueryHandler", "getAllJournals", ()),
+        ("JournalSQLQueryHandler", "getJournalsWithLicense", ({"CC BY"},)),
+        ("JournalSQLQueryHandler", "getJournalsWithTitle", ("review",)),
+        ("JournalSQLQueryHandler", "getJournalsByAssignment", (None, {"Q1"}, {area})),
+    ]
+
+
+@pytest.mark.parametrize("options", MODES)
+def test_replicas_match_the_file(local, options):
+    path = local["relational"]
+    for cls, method, args in queries(path):
+        expected = frame(getattr(handler(cls, path), method)(*args))
+        assert not expected.empty, method
+        assert frame(getattr(handler(cls, path, **options), method)(*args)).equals(expected), (options, method)
+
+
+@pytest.mark.parametrize("options", MODES)
+@pytest.mark.parametrize("statement", ["INSERT INTO Journal (id, title) VALUES ('x', 'x')",
+                                       "DELETE FROM Journal",
+                                       "CREATE TABLE Extra (id TEXT)"])
+def test_writes_are_rejected(local, tmp_path, options, statement):
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    path = str(tmp_path / "replica.db")
+    shutil.copy(local["relational"], path)
+    with open(path, "rb") as f:
+        before = f.read()
+    journals = handler("JournalSQLQueryHandler", path, **options)
+    count = len(journals.getAllJournals())
+    with journals._getEngine().connect() as con:
+        with pytest.raises(OperationalError, match="readonly|read-only|query_only"):
+            con.execute(text(statement))
+            con.commit()
+    assert len(journals.getAllJournals()) == count
+    with open(path, "rb") as f:
+        assert f.read() == before
+
+
+def test_in_memory_replica_is_served_from_memory(local, tmp_path):
+    path = str(tmp_path / "replica.db")
+    shutil.copy(local["relational"], path)
+    categories = handler("CategoryQueryHandler", path, readOnly=True, inMemory=True)
+    journals = handler("JournalSQLQueryHandler", path, readOnly=True, inMemory=True)
+    expected = [frame(categories.getAllCategories()), frame(journals.getAllJournals())]
+    expected_areas = areaIds(path)
+
+    shutil.move(path, str(tmp_path / "moved.db"))
+    assert frame(categories.getAllCategories()).equals(expected[0])
+    assert frame(journals.getAllJournals()).equals(expected[1])
+    # several connections of the pool, each on the same in-memory copy
+    engine = journals._getEngine()
+    connections = [engine.connect() for _ in range(3)]
+    try:
+        for con in connections:
+            assert con.exec_driver_sql("SELECT COUNT(*) FROM Journal").scalar() == len(expected[1])
+    finally:
+        for con in connections:
+            con.close()
+    assert set(categories.getAllAreas()["id"]) == expected_areas
+    # the file-backed read-only mode cannot open the moved file
+    with pytest.raises(Exception):
+        handler("JournalSQLQueryHandler", path, readOnly=True).getAllJournals()
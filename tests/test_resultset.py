@@ -0,0 +1,67 @@
+import pytest
+
+# resultSet=True: the columnar results of the engine answer like the lists of objects.
+
+
+def journalTuple(j):
+    return (j.getId(), j.getTitle(), j.getPublisher(), j.getLicense(), j.hasAPC(), j.hasSeal())
+
+
+def test_journals_match_the_list(sqlEngine):
+    journals = sqlEngine.getAllJournals()
+    result = sqlEngine.getAllJournals(resultSet=True)
+    assert len(result) == len(journals) and bool(result)
+    assert [journalTuple(j) for j in result] == [journalTuple(j) for j in journals]
+    assert result.getIds() == [j.getId() for j in journals]
+    assert journalTuple(result[3]) == journalTuple(journals[3])
+    assert [journalTuple(j) for j in result.toList()] == [journalTuple(j) for j in journals]
+
+
+def test_slicing_and_filtering(sqlEngine):
+    journals = sqlEngine.getAllJournals()
+    result = sqlEngine.getAllJournals(resultSet=True)
+    assert type(result[5:10]) is type(result)
+    assert [j.getId() for j in result[5:10]] == [j.getId() for j in journals[5:10]]
+
+    licenses = {"CC BY", "CC BY-SA"}
+    expected = [j.getId() for j in journals if j.getLicense() in licenses and not j.hasAPC()]
+    assert expected
+    assert result.filter(license=licenses, apc=False).getIds() == expected
+    assert result.filter(lambda df: df["license"].isin(licenses), apc=False).getIds() == expected
+    assert result.filter([j.hasSeal() for j in journals]).getIds() == [j.getId() for j in journals if j.hasSeal()]
+    with pytest.raises(ValueError):
+        result.filter(colour="red")
+
+
+def test_export(sqlEngine):
+    result = sqlEngine.getJournalsWithAPC(resultSet=True)
+    df = result.toPandas()
+    assert list(df["id"]) == [j.getId() for j in sqlEngine.getJournalsWithAPC()]
+    assert df["apc"].dtype == bool and df["apc"].all()
+    df.loc[:, "title"] = ""
+    assert result.frame["title"].ne("").any()  # a copy
+    pyarrow = pytest.importorskip("pyarrow")
+    table = result.toArrow()
+    assert isinstance(table, pyarrow.Table)
+    assert table.column("id").to_pylist() == list(result.frame["id"])
+
+
+def test_objects_are_built_lazily(sqlEngine, monkeypatch):
+    import laura
+    built = []
+    original = laura._journalFromRow
+    monkeypatch.setattr(laura, "_journalFromRow", lambda r: built.append(r["id"]) or original(r))
+    result = sqlEngine.getAllJournals(resultSet=True)
+    assert built == []
+    assert len(result.filter(apc=True)[:3]) == 3 and built == []
+    first = result[0]
+    assert built == [first.getId()]
+
+
+def test_categories_and_areas(sqlEngine):
+    categories = sqlEngine.getCategoriesWithQuartile({"Q1"}, resultSet=True)
+    assert sorted((c.getId(), c.getQuartile()) for c in categories) == \
+        sorted((c.getId(), c.getQuartile()) for c in sqlEngine.getCategoriesWithQuartile({"Q1"}))
+    areas = sqlEngine.getAllAreas(resultSet=True)
+    assert areas.getIds() == [a.getId() for a in sqlEngine.getAllAreas()]
+    assert len(sqlEngine.getJournalsWithLicense({"no such license"}, resultSet=True)) == 0
@@ -0,0 +1,46 @@
+import sqlite3
+import pytest
+
+# The local search index must find the same journals as the SPARQL CONTAINS scan.
+
+
+@pytest.fixture(scope="module")
+def indexedEngine(local):
+    from queryService import buildEngine
+    return buildEngine(local["graph"], local["relational"], searchIndex=local["search"])
+
+
+TEXTS = ["review", "Review", "univ", "re", "a", "%", "_", "%%", "a_b", "100%"]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_search_index_matches_sparql(graphEngine, indexedEngine, text):
+    assert sorted(j.getId() for j in indexedEngine.getJournalsWithTitle(text)) == \
+        sorted(j.getId() for j in graphEngine.getJournalsWithTitle(text))
+    assert sorted(j.getId() for j in indexedEngine.getJournalsPublishedBy(text)) == \
+        sorted(j.getId() for j in graphEngine.getJournalsPublishedBy(text))
+
+
+def test_wildcards_are_characters(local):
+    from searchIndex import JournalSearchIndex
+    index = JournalSearchIndex(local["search"])
+    assert len(index.search("title", "%")) == 0
+    assert len(index.search("title", "_")) == 0
+    assert len(index.search("title", "a")) > 0
+
+
+def test_prefix_matches_come_first(local):
+    from searchIndex import JournalSearchIndex
+    titles = list(JournalSearchIndex(local["search"]).search("title", "review")["title"])
+    starts = [t.lower().startswith("review") for t in titles]
+    assert any(starts) and not all(starts)
+    assert starts == sorted(starts, reverse=True)
+
+
+def test_search_does_not_create_the_index(tmp_path):
+    from searchIndex import JournalSearchIndex
+    path = str(tmp_path / "empty.db")
+    assert JournalSearchIndex(path).search("title", "review").empty
+    with sqlite3.connect(path) as con:
+        assert con.execute("SELECT name FROM sqlite_master").fetchall() == []
+    con.close()
@@ -0,0 +1,101 @@
+import json
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+# The query daemon on read-only SQLite databases, as server.py runs it.
+
+
+@pytest.fixture(scope="module")
+def server(local):
+    from queryService import QueryService, buildEngine
+    from server import makeServer
+
+    service = QueryService(buildEngine(local["relational"], local["relational"], sqlJournals=True,
+                                       readOnly=True))
+    httpd = makeServer(service, port=0, quiet=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=60) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def post(url, body):
+    request = urllib.request.Request(url + "/query", data=json.dumps(body).encode("utf-8"), method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_concurrent_clients_on_read_only_databases(server, sqlEngine):
+    area = sqlEngine.getAllAreas()[0].getId()
+    requests = [
+        {"method": "getJournalsInAreasWithLicense", "params": {"areas": [area], "licenses": []}},
+        {"method": "getJournalsInCategoriesWithQuartile", "params": {"category_ids": [], "quartiles": ["Q1"]}},
+        {"method": "getCategoriesWithQuartile", "params": {"quartiles": ["Q1", "Q2"]}},
+        {"method": "getAllJournals", "params": {"order_by": "title", "limit": 5}},
+        {"method": "getJournalCountsByArea"},
+    ]
+    answers = [post(server, r) for r in requests]
+    assert all(status == 200 for status, _ in answers)
+    expected = [body["result"] for _, body in answers]
+
+    def client(n):
+        return [post(server, r)[1].get("result") for r in requests] == expected
+
+    # more clients than the pool keeps open connections
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(client, range(64)))
+    assert all(results)
+
+
+def test_get_parameters_are_coerced(server):
+    status, body = get(server + "/query/getAllJournals?order_by=title&limit=5&offset=2")
+    assert status == 200
+    assert len(body["result"]) == 5
+    status, body = get(server + "/query/getAllJournals?resultSet=true&limit=3")
+    assert status == 200 and len(body["result"]) == 3
+
+
+def test_bad_parameters_are_bad_requests(server):
+    assert get(server + "/query/getAllJournals?limit=five")[0] == 400
+    assert get(server + "/query/getAllJournals?limit=-1")[0] == 400
+    assert get(server + "/query/getAllJournals?order_by=apc")[0] == 400
+    assert get(server + "/query/getAllJournals?resultSet=maybe")[0] == 400
+    assert post(server, {"method": "noSuchMethod"})[0] == 400
+
+
+def test_get_filters_are_coerced(server, sqlEngine):
+    def query(method, **params):
+        status, body = get(server + f"/query/{method}?" + urllib.parse.urlencode(params, doseq=True))
+        assert status == 200, body
+        return body["result"]
+
+    # Optional[bool] parameters and **filters
+    for apc in (False, True):
+        expected = len(sqlEngine.getJournalsWithFacets(apc=apc))
+        assert expected and len(query("getJournalsWithFacets", apc=str(apc).lower())) == expected
+    counts = query("getFacetCounts", facet="license", apc="false")
+    assert sum(c["count"] for c in counts) == sqlEngine.getFacetCounts("license", apc=False)["count"].sum()
+    counts = query("getJournalCountsByLicense", apc="false")
+    assert sum(c["count"] for c in counts) == sqlEngine.getJournalCountsByLicense(apc=False)["count"].sum()
+    # set parameters: one value, or the parameter repeated
+    assert len(query("getJournalsWithLicense", licenses="CC BY")) == len(sqlEngine.getJournalsWithLicense({"CC BY"}))
+    assert len(query("getJournalsWithLicense", licenses=["CC BY", "CC0"])) == \
+        len(sqlEngine.getJournalsWithLicense({"CC BY", "CC0"}))
+    assert get(server + "/query/getJournalsWithFacets?apc=maybe")[0] == 400
+    assert get(server + "/query/getFacetCounts?facet=license&seal=perhaps")[0] == 400
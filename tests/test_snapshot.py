@@ -0,0 +1,75 @@
+import pytest
+
+# A snapshot exported from the local databases must answer like them.
+
+
+@pytest.fixture(scope="module")
+def snapshotEngine(local, tmp_path_factory):
+    from Yang import JournalSQLQueryHandler, CategoryQueryHandler
+    from snapshot import exportSnapshot, JournalSnapshotQueryHandler, CategorySnapshotQueryHandler
+    from laura import FullQueryEngine
+
+    journals = JournalSQLQueryHandler()
+    journals.setDbPathOrUrl(local["relational"])
+    categories = CategoryQueryHandler()
+    categories.setDbPathOrUrl(local["relational"])
+    directory = str(tmp_path_factory.mktemp("snapshot"))
+    exportSnapshot(journals, categories, directory)
+
+    engine = FullQueryEngine()
+    journal_handler = JournalSnapshotQueryHandler()
+    journal_handler.setDbPathOrUrl(directory)
+    category_handler = CategorySnapshotQueryHandler()
+    category_handler.setDbPathOrUrl(directory)
+    engine.addJournalHandler(journal_handler)
+    engine.addCategoryHandler(category_handler)
+    return engine
+
+
+def ids(entities):
+    return sorted(e.getId() for e in entities)
+
+
+@pytest.mark.parametrize("method,args", [
+    ("getAllJournals", ()),
+    ("getJournalsWithTitle", ("review",)),
+    ("getJournalsPublishedBy", ("univ",)),
+    ("getJournalsWithLicense", ({"CC BY"},)),
+    ("getJournalsWithLicense", (set(),)),
+    ("getJournalsWithAPC", ()),
+    ("getJournalsWithDOAJSeal", ()),
+])
+def test_journal_queries(sqlEngine, snapshotEngine, method, args):
+    assert ids(getattr(snapshotEngine, method)(*args)) == ids(getattr(sqlEngine, method)(*args))
+
+
+def test_journals_without_license_are_excluded(sqlEngine, snapshotEngine):
+    everything = ids(sqlEngine.getAllJournals())
+    licensed = ids(snapshotEngine.getJournalsWithLicense(set()))
+    assert len(licensed) < len(everything)  # the dumps have journals without license
+    assert all(j.getLicense() for j in snapshotEngine.getJournalsWithLicense(set()))
+
+
+@pytest.mark.parametrize("field", ["license", "publisher", "apc", "seal", "area", "category", "quartile"])
+def test_journal_counts(sqlEngine, snapshotEngine, field):
+    sql = sqlEngine.getJournalCounts(field)
+    snapshot = snapshotEngine.getJournalCounts(field)
+    assert dict(zip(snapshot[field].astype(str), snapshot["count"])) == \
+        dict(zip(sql[field].astype(str), sql["count"]))
+
+
+def test_category_queries(sqlEngine, snapshotEngine):
+    area = sqlEngine.getAllAreas()[0].getId()
+    category = sqlEngine.getAllCategories()[0].getId()
+    assert ids(snapshotEngine.getAllCategories()) == ids(sqlEngine.getAllCategories())
+    assert ids(snapshotEngine.getAllAreas()) == ids(sqlEngine.getAllAreas())
+    assert sorted((c.getId(), c.getQuartile()) for c in snapshotEngine.getCategoriesWithQuartile({"Q1"})) == \
+        sorted((c.getId(), c.getQuartile()) for c in sqlEngine.getCategoriesWithQuartile({"Q1"}))
+    assert ids(snapshotEngine.getCategoriesAssignedToAreas({area})) == \
+        ids(sqlEngine.getCategoriesAssignedToAreas({area}))
+    assert ids(snapshotEngine.getAreasAssignedToCategories({category})) == \
+        ids(sqlEngine.getAreasAssignedToCategories({category}))
+    assert snapshotEngine.getTopCategoriesInAreas({area}).to_dict("records") == \
+        sqlEngine.getTopCategoriesInAreas({area}).to_dict("records")
+    assert ids(snapshotEngine.getJournalsWithBestQuartile({"Q1"}, {area})) == \
+        ids(sqlEngine.getJournalsWithBestQuartile({"Q1"}, {area}))
@@ -0,0 +1,199 @@
+import pandas as pd
+import pytest
+from conftest import uploadLocal
+
+# Uploading a dump again (pushDataToDb) or as a delta (pushDeltaToDb) on a
+# local graph with a relational mirror: every test works on its own databases.
+
+
+def editDump(doaj, path, retitle=0, drop=0):
+    """Copy of the DOAJ dump with the first `retitle` titles changed and the last `drop` rows removed."""
+    df = pd.read_csv(doaj, dtype=str, keep_default_na=False)
+    df.loc[:retitle - 1, "Journal title"] = df.loc[:retitle - 1, "Journal title"] + " (new series)"
+    if drop:
+        df = df.iloc[:-drop]
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def uploader(paths):
+    from li import JournalUploadHandler
+    journals = JournalUploadHandler()
+    journals.setDbPathOrUrl(paths["graph"])
+    journals.setRelationalMirrorPath(paths["relational"])
+    journals.setSearchIndexPath(paths["search"])
+    return journals
+
+
+def engines(paths):
+    from queryService import buildEngine
+    return (buildEngine(paths["graph"], paths["relational"]),
+            buildEngine(paths["relational"], paths["relational"], sqlJournals=True))
+
+
+def titles(engine):
+    return {j.getId(): j.getTitle() for j in engine.getAllJournals()}
+
+
+def assertOneHashPerJournal(paths):
+    from Yang import JournalQueryHandler
+    reader = JournalQueryHandler()
+    reader.setDbPathOrUrl(paths["graph"])
+    hashes = reader.getContentHashes().groupby("id")["hash"].nunique()
+    assert (hashes == 1).all(), hashes[hashes != 1]
+
+
+@pytest.fixture
+def paths(dumps, tmp_path):
+    return uploadLocal(str(tmp_path), *dumps)
+
+
+def test_reupload_replaces_the_journals(dumps, paths, tmp_path):
+    before = titles(engines(paths)[1])
+    changed = editDump(dumps[0], tmp_path / "changed.csv", retitle=10)
+    assert uploader(paths).pushDataToDb(changed)
+    graph, sql = engines(paths)
+    assert titles(graph) == titles(sql)
+    assert len(titles(graph)) == len(before)
+    assert sum(t.endswith("(new series)") for t in titles(graph).values()) == 10
+    assertOneHashPerJournal(paths)
+
+
+def test_reupload_keeps_the_assignment_edges(dumps, paths, tmp_path):
+    from Yang import JournalQueryHandler
+    journals = uploader(paths)
+    assert journals.pushAssignmentsToDb(paths["relational"])
+    assert journals.pushDataToDb(editDump(dumps[0], tmp_path / "changed.csv", retitle=10))
+    reader = JournalQueryHandler()
+    reader.setDbPathOrUrl(paths["graph"])
+    assert reader.hasAssignments()
+
+
+def test_delta_upload(dumps, paths, tmp_path):
+    journals = uploader(paths)
+    assert journals.pushDeltaToDb(dumps[0])
+    assert journals.getLastDelta() == {"inserted": 0, "updated": 0, "deleted": 0}
+
+    assert journals.pushDeltaToDb(editDump(dumps[0], tmp_path / "delta.csv", retitle=5, drop=3))
+    assert journals.getLastDelta() == {"inserted": 0, "updated": 5, "deleted": 3}
+    graph, sql = engines(paths)
+    assert titles(graph) == titles(sql)
+    assertOneHashPerJournal(paths)
+
+    # the journals of the original dump come back
+    assert journals.pushDeltaToDb(dumps[0])
+    assert journals.getLastDelta() == {"inserted": 3, "updated": 5, "deleted": 0}
+
+
+def test_delta_after_reupload(dumps, paths, tmp_path):
+    # a plain re-upload must leave a manifest the next delta can trust
+    journals = uploader(paths)
+    changed = editDump(dumps[0], tmp_path / "changed.csv", retitle=10)
+    assert journals.pushDataToDb(changed)
+    assert journals.pushDeltaToDb(changed)
+    assert journals.getLastDelta() == {"inserted": 0, "updated": 0, "deleted": 0}
+
+
+def test_delta_rewrites_journals_with_several_hashes(dumps, paths):
+    # a graph written before uploads replaced their journals: two hashes on one subject
+    from rdflib import Graph, Literal, Namespace
+    base_url = Namespace("https://brigata.github.org/")
+    graph = Graph()
+    graph.parse(paths["graph"], format="nt")
+    subjects = sorted(set(graph.subjects(base_url["contentHash"], None)))[:2]
+    for subject in subjects:
+        graph.add((subject, base_url["contentHash"], Literal("stale")))
+    graph.serialize(destination=paths["graph"], format="nt", encoding="utf-8")
+
+    journals = uploader(paths)
+    assert journals.pushDeltaToDb(dumps[0])
+    assert journals.getLastDelta() == {"inserted": 0, "updated": 2, "deleted": 0}
+    assertOneHashPerJournal(paths)
+    assert journals.pushDeltaToDb(dumps[0])
+    assert journals.getLastDelta() == {"inserted": 0, "updated": 0, "deleted": 0}
+
+
+def test_delta_keeps_the_assignment_edges(dumps, paths, tmp_path):
+    from queryService import buildEngine
+    journals = uploader(paths)
+    assert journals.pushAssignmentsToDb(paths["relational"])
+    assert journals.pushDeltaToDb(editDump(dumps[0], tmp_path / "delta.csv", retitle=20, drop=3))
+    assert journals.getLastDelta() == {"inserted": 0, "updated": 20, "deleted": 3}
+    graph = buildEngine(paths["graph"], paths["relational"])
+    sql = buildEngine(paths["relational"], paths["relational"], sqlJournals=True)
+    assert graph.journalHandlers[0].hasAssignments()
+    # the pushed-down composite query of the graph finds the journals of the join
+    quartiles = {"Q1", "Q2", "Q3", "Q4"}
+    expected = sorted(j.getId() for j in sql.getJournalsInCategoriesWithQuartile(set(), quartiles))
+    assert expected
+    assert sorted(j.getId() for j in graph.getJournalsInCategoriesWithQuartile(set(), quartiles)) == expected
+
+
+def editScimago(scimago, path, requartile=0, drop=0):
+    """Copy of the Scimago dump with the quartiles of the first `requartile` journals changed
+    and the last `drop` journals removed."""
+    import json
+    with open(scimago, encoding="utf-8") as f:
+        records = json.load(f)
+    for record in records[:requartile]:
+        for category in record["categories"]:
+            category["quartile"] = "Q4" if category.get("quartile") != "Q4" else "Q1"
+    if drop:
+        records = records[:-drop]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f)
+    return str(path)
+
+
+def categoryUploader(path):
+    from daniele import CategoryUploadHandler
+    categories = CategoryUploadHandler()
+    categories.setDbPathOrUrl(path)
+    return categories
+
+
+def assignments(path):
+    import sqlite3
+    with sqlite3.connect(path) as con:
+        rows = con.execute("""SELECT j.id, c.id, c.quartile, a.id FROM HasCategory hc
+                              JOIN IdentifiableEntity j ON j.internalId = hc.journalId
+                              JOIN IdentifiableEntity c ON c.internalId = hc.categoryId
+                              JOIN HasArea ha ON ha.journalId = hc.journalId
+                              JOIN IdentifiableEntity a ON a.internalId = ha.areaId""").fetchall()
+    con.close()
+    return sorted(rows)
+
+
+def test_scimago_delta(dumps, tmp_path):
+    scimago = dumps[1]
+    path = str(tmp_path / "categories.db")
+    categories = categoryUploader(path)
+    assert categories.pushDataToDb(scimago)
+    assert categories.pushDeltaToDb(scimago)
+    assert categories.getLastDelta() == {"inserted": 0, "updated": 0, "deleted": 0}
+
+    changed = editScimago(scimago, tmp_path / "changed.json", requartile=5, drop=3)
+    assert categories.pushDeltaToDb(changed)
+    assert categories.getLastDelta() == {"inserted": 0, "updated": 5, "deleted": 3}
+    # the same rows as a fresh upload of the changed dump
+    fresh = str(tmp_path / "fresh.db")
+    assert categoryUploader(fresh).pushDataToDb(changed)
+    assert assignments(path) == assignments(fresh)
+
+    assert categories.pushDeltaToDb(scimago)
+    assert categories.getLastDelta() == {"inserted": 3, "updated": 5, "deleted": 0}
+
+
+def test_scimago_delta_without_manifest(dumps, tmp_path):
+    # a database uploaded before the manifest existed: its journals are not inserted again
+    import sqlite3
+    path = str(tmp_path / "categories.db")
+    categories = categoryUploader(path)
+    assert categories.pushDataToDb(dumps[1])
+    before = assignments(path)
+    with sqlite3.connect(path) as con:
+        con.execute("DROP TABLE JournalManifest")
+    con.close()
+    assert categories.pushDeltaToDb(dumps[1])
+    assert categories.getLastDelta() == {"inserted": 0, "updated": 0, "deleted": 0}
+    assert assignments(path) == before
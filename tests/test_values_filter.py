@@ -0,0 +1,38 @@
+import pytest
+
+# _valuesFilter: sets above tempTableThreshold go through a temporary table (or
+# json_each on the in-memory replicas) and must match the inline IN list.
+
+
+def handler(path, threshold, **options):
+    from Yang import JournalSQLQueryHandler
+    journals = JournalSQLQueryHandler()
+    journals.setDbPathOrUrl(path)
+    if options:
+        journals.setReadOnly(**options)
+    journals.tempTableThreshold = threshold
+    return journals
+
+
+def frame(df):
+    return df.sort_values("id").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("options", [{}, {"readOnly": True}, {"readOnly": True, "inMemory": True}])
+def test_large_sets_match_the_inline_in_list(local, options):
+    inline = handler(local["relational"], 100000)
+    identifiers = sorted(inline.getAllIdentifiers()["identifier"])
+    # every other identifier, and unknown ones, to go past the threshold
+    ids = set(identifiers[::2]) | {f"0000-{n:04d}" for n in range(600)}
+    assert len(ids) > 500
+    expected = frame(inline.getJournalsByIds(ids))
+    assert len(expected) > 50
+
+    large = handler(local["relational"], 500, **options)
+    with large._getEngine().connect() as con:
+        condition, _ = large._valuesFilter(con, "x", "i", sorted(ids))
+    assert "IN (SELECT" in condition  # not the inline list
+    assert frame(large.getJournalsByIds(ids)).equals(expected)
+    # the same handler again: the temporary table of the connection is refilled
+    assert frame(large.getJournalsByIds(set(identifiers[1::2]) | ids - set(identifiers))).equals(
+        frame(inline.getJournalsByIds(set(identifiers[1::2]))))